@@ -2,19 +2,18 @@ import os
 from typing import Any, Annotated
 from dotenv import load_dotenv
 
-from langchain.chat_models import init_chat_model
 from langgraph.prebuilt import create_react_agent
 from langgraph.prebuilt import InjectedState
-from langgraph_supervisor import create_supervisor
 from langchain_core.tools import tool, InjectedToolCallId
-from langchain_community.graphs import Neo4jGraph
 from langgraph.store.memory import InMemoryStore
-from langchain.embeddings import init_embeddings
+from common.get_models import get_chat_model, get_embeddings_model
+from common.message_compactor import create_compaction_hook
+from common.prefetch import get_prefetcher
 from langgraph.types import Command, Send
-from langmem import create_manage_memory_tool, create_search_memory_tool
 from langgraph.graph import StateGraph, START, MessagesState, END
 
-from custom_tools import get_neo4j_tools, get_report_tools
+from custom_tools import get_neo4j_tools, get_report_tools, govern_tools, get_artifact_tools
+from custom_tools.neo4j_tools import speculate_vector_search, warm_vector_retrievers
 from common.prompt import neo4j_analysis_prompt
 from .search.mapReduce import MapReduceSearchAgent
 from common.memory_state import MapReduceState, CustomState
@@ -53,21 +52,17 @@ class AnalysisAgent:
         self.store = self._init_memory_store()
         self.tools = self._init_tools()
         self.supervisor = self._init_supervisor()
+        # 用户消息到达时以问题原文预取一次向量检索
+        get_prefetcher().register("neo4j_vector_search", speculate_vector_search)
+        # 后台预热向量检索器，首次 vector_search 不再承担连接、探测索引与加载模型的开销
+        warm_vector_retrievers()
 
     def _init_memory_store(self):
         """初始化长期记忆存储"""
-        embedding_model = os.getenv("EMBEDDING_MODEL")
-        embedding_provider = os.getenv("EMBEDDING_PROVIDER")
         embedding_dim = int(os.getenv("EMBEDDING_DIM", "768"))
 
-        embeddings = init_embeddings(
-            model=embedding_model,
-            provider=embedding_provider,
-            model_kwargs={
-                "device": "cpu",
-                "local_files_only": True,
-            }
-        )
+        # 与其他智能体共享同一个 embedding 实例，首次写入/检索记忆时才加载
+        embeddings = get_embeddings_model(lazy=True)
 
         return InMemoryStore(
             index={
@@ -82,18 +77,15 @@ class AnalysisAgent:
         tools.extend(get_neo4j_tools())
         tools.extend(get_report_tools())
         tools.append(map_reduce_search_tool)
+        tools = govern_tools(tools)  # 超大输出落盘，只返回预览
+        tools.extend(get_artifact_tools())
 
         return tools
     
 
     def _init_llm(self):
         """初始化大语言模型"""
-        return init_chat_model(
-            model=os.getenv("OPENAI_LLM_MODEL"),
-            api_key=os.getenv("OPENAI_API_KEY"),
-            base_url=os.getenv("OPENAI_BASE_URL"),
-            temperature=0.3,
-        )
+        return get_chat_model(temperature=0.3)
 
     def _init_supervisor(self) -> Any:
         """构建分析智能体"""
@@ -102,6 +94,8 @@ class AnalysisAgent:
             tools=self.tools,
             prompt=neo4j_analysis_prompt,
             name="analysis_agent",
+            # 按 token 预算压缩送入 LLM 的历史消息，图状态中仍保留完整历史
+            pre_model_hook=create_compaction_hook(),
         )
 
         return supervisor
@@ -3,70 +3,218 @@ from langgraph.graph import StateGraph, START, END
 from langgraph.types import Send
 from typing_extensions import TypedDict, Annotated
 import operator, os
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from tqdm import tqdm
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain.chat_models import init_chat_model
 from langgraph.prebuilt import create_react_agent
 
 from common.prompt import MAP_SYSTEM_PROMPT, REDUCE_SYSTEM_PROMPT
 from common import get_neo4j_db_manager
+from common.get_models import get_chat_model, get_embeddings_model
+from common.cypher_templates import register_template, run_template
 from common.memory_state import MapReduceState
+from common.token_counter import get_token_counter
 
 load_dotenv()
 
+COMMUNITIES_BY_LEVEL = register_template(
+    "map_reduce.communities_by_level",
+    """
+    MATCH (c:__Community__)
+    WHERE c.level = $level
+    RETURN {communityId:c.id, full_content:c.full_content} AS output
+    """,
+    warm_params={"level": 0},
+).name
+
+# 按问题与社区摘要向量（生成社区摘要时写入）的余弦相似度排序，只取前 $topK 个社区做 Map；
+# 还没有摘要向量的社区无法排序，score 为 null，全部参与 Map
+RELEVANT_COMMUNITIES = register_template(
+    "map_reduce.relevant_communities",
+    """
+    CALL {
+        MATCH (c:__Community__)
+        WHERE c.level = $level AND c.summary_embedding IS NOT NULL
+        WITH c, vector.similarity.cosine(c.summary_embedding, $embedding) AS score
+        ORDER BY score DESC
+        LIMIT $topK
+        RETURN c, score
+        UNION ALL
+        MATCH (c:__Community__)
+        WHERE c.level = $level AND c.summary_embedding IS NULL
+        RETURN c, null AS score
+    }
+    RETURN {communityId:c.id, full_content:c.full_content} AS output, score
+    """,
+    warm_params={"level": 0, "embedding": [0.0], "topK": 20},
+).name
+
+MAP_HUMAN_PROMPT = "---数据表格---\n{context_data}\n用户的问题是：{question}"
+# 一次 Map 调用包含多个社区时追加的要求，保证 Reduce 阶段的要点仍能对应到来源社区
+MAP_PACKED_INSTRUCTION = (
+    "\n\n数据表格包含多个社区，每个社区以「[社区 communityId]」开头。"
+    "每个要点只能依据一个社区的数据，并在 communityId 中填写该社区的 communityId。"
+)
+
+
+def community_text(community: dict) -> str:
+    """单个社区在 Map 提示中的文本，与未打包时传入的内容相同"""
+    return str(community["output"])
+
+
+def community_block(community: dict) -> str:
+    """打包时单个社区的文本块，以社区编号开头"""
+    output = community["output"]
+    return f"[社区 {output.get('communityId')}]\n{output.get('full_content')}"
+
+
+def pack_communities(sizes: List[int], budget: int) -> List[List[int]]:
+    """
+    按 token 预算把社区装箱（First-Fit Decreasing），返回每次 Map 调用包含的社区下标。
+
+    超过预算的社区单独一箱；箱内与箱间都保持社区原有的顺序（按相关度排序时，最相关的社区在前）。
+    budget<=0 时不打包，每个社区一次调用。
+    """
+    if budget <= 0:
+        return [[i] for i in range(len(sizes))]
+    bins: List[List[int]] = []
+    loads: List[int] = []
+    for i in sorted(range(len(sizes)), key=lambda i: (-sizes[i], i)):
+        for b, load in enumerate(loads):
+            if load + sizes[i] <= budget:
+                bins[b].append(i)
+                loads[b] += sizes[i]
+                break
+        else:
+            bins.append([i])
+            loads.append(sizes[i])
+    return sorted((sorted(b) for b in bins), key=lambda b: b[0])
+
+
+def plan_map_calls(query: str, communities: List[dict], budget: int) -> Tuple[List[List[dict]], Dict[str, Any]]:
+    """
+    规划 Map 调用：按社区文本的 token 数装箱，并估算打包前后的提示 token 数。
+
+    Returns:
+        (每次 Map 调用的社区列表, 统计信息)
+    """
+    counter = get_token_counter()
+    system_tokens, human_tokens, instruction_tokens, *sizes = counter.count_batch(
+        [MAP_SYSTEM_PROMPT, MAP_HUMAN_PROMPT.format(context_data="", question=query), MAP_PACKED_INSTRUCTION]
+        + [community_text(c) for c in communities]
+    )
+    packs = [[communities[i] for i in b] for b in pack_communities(sizes, budget)]
+
+    # 固定开销：系统提示与问题，每次 Map 调用都要重复发送
+    overhead = system_tokens + human_tokens
+    packed_tokens = 0
+    for pack in packs:
+        if len(pack) == 1:
+            packed_tokens += overhead + counter.count(community_text(pack[0]))
+        else:
+            packed_tokens += overhead + instruction_tokens + sum(counter.count_batch([community_block(c) for c in pack]))
+    stats = {
+        "communities": len(communities),
+        "map_calls": len(packs),
+        "prompt_tokens": packed_tokens,
+        "unpacked_prompt_tokens": overhead * len(communities) + sum(sizes),
+        "budget": budget,
+    }
+    return packs, stats
+
+
 class MapReduceSearchAgent:
-    """基于LangGraph的Map-Reduce检索Agent"""
+    """
+    基于LangGraph的Map-Reduce检索Agent
+
+    参数:
+        top_k: 只对与问题最相关的前 top_k 个社区做 Map，<=0（默认）时对该层级全部社区做 Map；
+            没有摘要向量的社区无法排序，始终参与 Map
+        min_score: 前 top_k 个社区中相似度低于该值的也不做 Map（最相关的一个始终保留）
+        pack_tokens: 把小社区合并进同一次 Map 调用时，每次调用社区文本的 token 预算，<=0 时每个社区单独调用
+    前两者共同决定召回与 LLM 调用次数的取舍，默认取 MAP_REDUCE_TOP_K / MAP_REDUCE_MIN_SCORE / MAP_REDUCE_PACK_TOKENS。
+    最近一次检索的 Map 调用次数与提示 token 估算见 map_stats。
+    """
     
-    def __init__(self, response_type: str = "多个段落"):
+    def __init__(
+        self,
+        response_type: str = "多个段落",
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None,
+        pack_tokens: Optional[int] = None,
+    ):
         self.llm = self._init_llm()
         self.response_type = response_type
+        self.top_k = int(top_k if top_k is not None else os.getenv("MAP_REDUCE_TOP_K", "0"))
+        self.min_score = float(min_score if min_score is not None else os.getenv("MAP_REDUCE_MIN_SCORE", "0.0"))
+        self.pack_tokens = int(pack_tokens if pack_tokens is not None else os.getenv("MAP_REDUCE_PACK_TOKENS", "4000"))
+        self.map_stats: Dict[str, Any] = {}
         self.db_manager = get_neo4j_db_manager()
         self.graph = self.db_manager.get_graph()
         self.workflow = self._build_workflow()
 
     def _init_llm(self):
         """初始化大语言模型"""
-        return init_chat_model(
-            model=os.getenv("OPENAI_LLM_MODEL"),
-            api_key=os.getenv("OPENAI_API_KEY"),
-            base_url=os.getenv("OPENAI_BASE_URL"),
+        # 同一社区 + 同一问题的 map/reduce 提示完全相同，显式标记为可缓存
+        return get_chat_model(
             temperature=0.3,  # 降低随机性，确保报告严谨性
+            cache_responses=True,
         )
 
     # ------------------------------
     # 节点函数：工作流中的各个处理步骤
     # ------------------------------
     def fetch_communities(self, state: MapReduceState) -> dict:
-        """获取指定层级的社区数据"""
-        communities = self.graph.query(
-            """
-            MATCH (c:__Community__)
-            WHERE c.level = $level
-            RETURN {communityId:c.id, full_content:c.full_content} AS output
-            """,
-            params={"level": state["level"]},
-        )
+        """获取指定层级的社区数据；开启相关度筛选时只取与问题最相关的社区及尚无摘要向量的社区"""
+        level = int(state["level"])
+        if self.top_k > 0:
+            return {"communities": self._relevant_communities(state["query"], level)}
+        communities = run_template(COMMUNITIES_BY_LEVEL, level=level)
         return {"communities": communities}
 
+    def _relevant_communities(self, query: str, level: int) -> List[dict]:
+        """
+        按问题与社区摘要的相似度取前 top_k 个社区，丢弃低于 min_score 的（至少保留最相关的一个）；
+        没有摘要向量的社区全部保留，该层级都没有向量时即为全量 Map
+        """
+        embedding = get_embeddings_model().embed_query(query)
+        rows = run_template(RELEVANT_COMMUNITIES, level=level, embedding=embedding, topK=self.top_k)
+        ranked = [row for row in rows if row["score"] is not None]
+        unembedded = [row for row in rows if row["score"] is None]
+        if unembedded:
+            print(f"层级 {level} 有 {len(unembedded)} 个社区缺少摘要向量，全部参与 Map")
+        return [row for i, row in enumerate(ranked) if i == 0 or row["score"] >= self.min_score] + unembedded
+
     def map_process(self, state: MapReduceState) -> dict:
-        """Map阶段：处理单个社区数据"""
-        current_community = state["communities"][0] if state["communities"] else None
-        if not current_community:
+        """Map阶段：处理一个社区，或按 token 预算打包在一起的多个小社区"""
+        communities = state["communities"]
+        if not communities:
             return {"intermediate_results": ["未获取到有效社区数据"]}
 
+        if len(communities) == 1:
+            # 单个社区的提示与打包前完全相同，仍可命中 LLM 响应缓存
+            human_prompt = MAP_HUMAN_PROMPT
+            context_data = community_text(communities[0])
+        else:
+            human_prompt = MAP_HUMAN_PROMPT + MAP_PACKED_INSTRUCTION
+            context_data = "\n\n".join(community_block(c) for c in communities)
+
         # 构建Map提示
         map_prompt = ChatPromptTemplate.from_messages([
             ("system", MAP_SYSTEM_PROMPT),
-            ("human", "---数据表格---\n{context_data}\n用户的问题是：{question}"),
+            ("human", human_prompt),
         ])
 
         map_chain = map_prompt | self.llm | StrOutputParser()
         result = map_chain.invoke({
             "question": state["query"],
-            "context_data": current_community["output"]  # 正确读取社区数据
+            "context_data": context_data,
         })
+        if len(communities) > 1:
+            # 标注本次调用覆盖的社区，Reduce 阶段按要点中的 communityId 引用来源
+            ids = "、".join(str(c["output"].get("communityId")) for c in communities)
+            result = f"[社区 {ids}]\n{result}"
         return {"intermediate_results": [result]}
 
     def reduce_process(self, state: MapReduceState) -> dict:
@@ -98,10 +246,11 @@ class MapReduceSearchAgent:
     # 条件边函数：控制工作流走向
     # ------------------------------
     def route_to_map(self, state: MapReduceState) -> List[Send]:
-        """根据社区列表生成Map任务分发"""
+        """根据社区列表生成Map任务分发，小社区按 token 预算合并到同一个任务"""
+        packs, self.map_stats = plan_map_calls(state["query"], state["communities"], self.pack_tokens)
         return [
-            Send("map_process", {"communities": [community], "query": state["query"], "intermediate_results": []})
-            for community in state["communities"]
+            Send("map_process", {"communities": pack, "query": state["query"], "intermediate_results": []})
+            for pack in packs
         ]
 
     # ------------------------------
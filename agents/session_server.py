@@ -0,0 +1,164 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from common.concurrency import LLMConcurrencyLimiter
+from common.prefetch import get_prefetcher
+from common.token_counter import TokenLedger
+
+
+class ServerBusyError(RuntimeError):
+    """等待中的请求数已达上限，拒绝新请求（背压）"""
+
+
+@dataclass
+class TurnResult:
+    session_id: str
+    answer: str
+    latency: float        # 从提交到完成的总耗时（秒），包含排队时间
+    queued: float         # 等待执行槽位的耗时（秒）
+    tokens: Dict[str, Dict[str, int]] = field(default_factory=dict)  # 按节点路径统计的 token 账本
+
+
+class SessionServer:
+    """
+    多会话异步服务入口。
+
+    所有会话共享同一个编译好的主管智能体图（以及其背后的模型、连接池），
+    每个会话的对话状态独立保存，同一会话的多轮请求串行执行，不同会话并发执行。
+    通过执行槽位限制同时运行的轮次，通过等待上限拒绝过载请求，
+    并通过 LLMConcurrencyLimiter 限制全局在途 LLM 调用数。
+    """
+
+    def __init__(
+        self,
+        graph: Any = None,
+        max_concurrent_turns: int = 32,
+        max_pending_turns: int = 256,
+        max_in_flight_llm: int = 8,
+        recursion_limit: int = 50,
+        persistent: bool = False,
+    ) -> None:
+        if graph is None:
+            # 延迟导入，避免 agents 包内的循环依赖
+            from agents.supervisor import SupervisorAgent
+            checkpointer = None
+            if persistent:
+                from common.checkpointer import get_checkpointer
+                checkpointer = get_checkpointer()
+            graph = SupervisorAgent(checkpointer=checkpointer).get_agent()
+        self.graph = graph
+        # 图带有 checkpointer 时会话状态由其持久化（按 thread_id=session_id），进程重启后可直接续聊
+        self.persistent = getattr(graph, "checkpointer", None) is not None
+        self.max_concurrent_turns = max_concurrent_turns
+        self.max_pending_turns = max_pending_turns
+        self.recursion_limit = recursion_limit
+        self.llm_limiter = LLMConcurrencyLimiter(max_in_flight=max_in_flight_llm)
+        self._turn_slots: Optional[asyncio.Semaphore] = None
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        self._pending = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def _slots(self) -> asyncio.Semaphore:
+        if self._turn_slots is None:
+            self._turn_slots = asyncio.Semaphore(self.max_concurrent_turns)
+        return self._turn_slots
+
+    async def chat(self, session_id: str, message: str, user_id: Optional[str] = None) -> TurnResult:
+        """在指定会话中处理一轮用户消息，返回最终回答"""
+        if self._pending >= self.max_pending_turns:
+            self.rejected += 1
+            raise ServerBusyError(f"pending turns exceeded {self.max_pending_turns}")
+
+        submitted = time.perf_counter()
+        self._pending += 1
+        admitted = False
+        try:
+            lock = self._session_locks.setdefault(session_id, asyncio.Lock())
+            async with lock, self._slots():
+                admitted = True
+                self._pending -= 1
+                self._running += 1
+                started = time.perf_counter()
+                ledger = TokenLedger()
+                try:
+                    state = await self._run_turn(session_id, message, user_id, ledger)
+                except Exception:
+                    self.failed += 1
+                    raise
+                finally:
+                    self._running -= 1
+        finally:
+            if not admitted:
+                # 排队期间被取消
+                self._pending -= 1
+
+        if not self.persistent:
+            self._sessions[session_id] = state
+        self.completed += 1
+        finished = time.perf_counter()
+        return TurnResult(
+            session_id=session_id,
+            answer=self._final_answer(state),
+            latency=finished - submitted,
+            queued=started - submitted,
+            tokens=ledger.by_node(),
+        )
+
+    async def _run_turn(
+        self, session_id: str, message: str, user_id: Optional[str], ledger: TokenLedger
+    ) -> Dict[str, Any]:
+        if self.persistent:
+            # 历史由 checkpointer 恢复，只需传入本轮新增的消息
+            graph_input: Dict[str, Any] = {
+                "messages": [HumanMessage(content=message)],
+                "user_id": user_id or session_id,
+            }
+        else:
+            previous = self._sessions.get(session_id, {})
+            graph_input = {
+                **previous,
+                "messages": [*previous.get("messages", []), HumanMessage(content=message)],
+                "user_id": user_id or previous.get("user_id") or session_id,
+            }
+        config = {
+            "callbacks": [self.llm_limiter, ledger],
+            "configurable": {"thread_id": session_id},
+            "recursion_limit": self.recursion_limit,
+        }
+        state: Dict[str, Any] = graph_input
+        async for chunk in self.graph.astream(graph_input, config=config, stream_mode="values"):
+            state = chunk
+        return state
+
+    def _final_answer(self, state: Dict[str, Any]) -> str:
+        messages: List[Any] = state.get("messages", [])
+        for message in reversed(messages):
+            if isinstance(message, AIMessage) and message.content:
+                return message.content if isinstance(message.content, str) else str(message.content)
+        return ""
+
+    def end_session(self, session_id: str) -> None:
+        """释放会话状态"""
+        self._sessions.pop(session_id, None)
+        self._session_locks.pop(session_id, None)
+        get_prefetcher().end_turn(session_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._session_locks),
+            "pending_turns": self._pending,
+            "running_turns": self._running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "llm": self.llm_limiter.metrics(),
+            "prefetch": get_prefetcher().stats(),
+        }
@@ -2,17 +2,23 @@ import os
 from typing import Any, List
 from dotenv import load_dotenv
 
-from langchain.chat_models import init_chat_model
 from langgraph.prebuilt import create_react_agent
+from langchain_core.tools import BaseTool, StructuredTool
+from langchain_core.messages import HumanMessage, SystemMessage
 
 from langchain_community.utilities import SQLDatabase
 from langchain_community.agent_toolkits import SQLDatabaseToolkit
 from langgraph.store.memory import InMemoryStore
-from langchain.embeddings import init_embeddings
-
-from custom_tools import get_mysql_tools
+from common.get_models import get_chat_model, get_embeddings_model
+from common.message_compactor import create_compaction_hook
+from common.prefetch import PrefetchTurn, get_prefetcher
+from common.schema_pruner import get_schema_pruner
+
+from custom_tools import get_mysql_tools, govern_tools, get_artifact_tools
+from custom_tools.mysql_tools import speculate_schema_catalog
+from custom_tools.schema_tools import create_schema_speculator, create_schema_tools
 from common.memory_state import CustomState
-from common.prompt import sql_prompt
+from common.prompt import sql_prompt, sql_prompt_stepwise, sql_pruned_schema_prompt
 
 load_dotenv()
 
@@ -21,12 +27,28 @@ class Text2SQLAgent:
     负责根据用户输入的自然语言，生成对应的 SQL 查询语句，并将对应sql查询结果以csv样式保存。
     """
 
-    def __init__(self) -> None:
+    def __init__(self, composite_schema: bool = True, schema_pruning: bool = True) -> None:
+        """
+        参数:
+            composite_schema: 提供 get_relevant_schema 工具，一次调用返回相关表的精简 DDL 与样例数据；
+                为 False 时沿用逐步查看表清单、表结构的流程
+            schema_pruning: 配置了 SIC_MODEL_PATH 时，用 SIC 分类器按问题裁剪表结构并直接注入提示词
+        """
+        self.composite_schema = composite_schema
         self.db = self._init_db()
+        self.pruner = get_schema_pruner(self.db._engine, self.db.get_usable_table_names()) if schema_pruning else None
         self.llm = self._init_llm()
         self.store = self._init_memory_store()
         self.tools = self._init_tools()
         self.agent = self._init_agent()
+        # 用户消息到达时预取表清单与表结构，本智能体前几次工具调用可直接命中
+        prefetcher = get_prefetcher()
+        prefetcher.register("mysql_schema_catalog", speculate_schema_catalog)
+        prefetcher.register("sql_db_catalog", self._speculate_catalog)
+        if self.composite_schema:
+            prefetcher.register("relevant_schema", create_schema_speculator(self.db))
+        if self.pruner is not None:
+            prefetcher.register("sic_schema", self._speculate_pruned_schema)
 
     def _init_db(self):
         """初始化数据库连接"""
@@ -42,18 +64,10 @@ class Text2SQLAgent:
 
     def _init_memory_store(self):
         """初始化长期记忆存储"""
-        embedding_model = os.getenv("EMBEDDING_MODEL")
-        embedding_provider = os.getenv("EMBEDDING_PROVIDER")
         embedding_dim = int(os.getenv("EMBEDDING_DIM", "768"))
 
-        embeddings = init_embeddings(
-            model=embedding_model,
-            provider=embedding_provider,
-            model_kwargs={
-                "device": "cpu",
-                "local_files_only": True,
-            }
-        )
+        # 与其他智能体共享同一个 embedding 实例，首次写入/检索记忆时才加载
+        embeddings = get_embeddings_model(lazy=True)
 
         return InMemoryStore(
             index={
@@ -66,18 +80,81 @@ class Text2SQLAgent:
     def _init_tools(self):
         """初始化工具集"""
         toolkit = SQLDatabaseToolkit(db=self.db, llm=self.llm)
-        tools = toolkit.get_tools()   # langgraph中提供的工具
+        tools = self._with_prefetched_catalog(toolkit.get_tools())   # langgraph中提供的工具
         tools.extend(get_mysql_tools())  # 自定义工具
+        tools = govern_tools(tools)  # 超大输出落盘，只返回预览
+        tools.extend(get_artifact_tools())
+        if self.composite_schema:
+            # 表结构输出本身已按相关度裁剪，不经落盘包装
+            tools.extend(create_schema_tools(self.db))
         return tools
 
+    def _list_tables(self) -> str:
+        return ", ".join(self.db.get_usable_table_names())
+
+    def _table_info(self, table_name: str) -> str:
+        return self.db.get_table_info_no_throw([table_name])
+
+    def _speculate_catalog(self, turn: PrefetchTurn) -> None:
+        max_tables = int(os.getenv("PREFETCH_MAX_TABLES", "20"))
+
+        def load_tables() -> str:
+            tables = self._list_tables()
+            for table in [t.strip() for t in tables.split(",") if t.strip()][:max_tables]:
+                turn.submit(("sql_db_schema", table), lambda table=table: self._table_info(table))
+            return tables
+
+        turn.submit(("sql_db_list_tables",), load_tables)
+
+    def _with_prefetched_catalog(self, tools: List[BaseTool]) -> List[BaseTool]:
+        """表清单与表结构工具改为先查预取结果；多表结构按表分别取用后拼接"""
+        prefetcher = get_prefetcher()
+
+        def list_tables(tool_input: str = "") -> str:
+            return prefetcher.take(("sql_db_list_tables",), self._list_tables)
+
+        def table_schema(table_names: str) -> str:
+            names = [t.strip() for t in table_names.split(",") if t.strip()]
+            return "\n\n".join(
+                prefetcher.take(("sql_db_schema", name), lambda name=name: self._table_info(name))
+                for name in names
+            )
+
+        replacements = {"sql_db_list_tables": list_tables, "sql_db_schema": table_schema}
+        return [
+            StructuredTool.from_function(
+                func=replacements[t.name], name=t.name, description=t.description, args_schema=t.args_schema,
+            ) if t.name in replacements else t
+            for t in tools
+        ]
+
+    def _pruned_schema(self, question: str) -> str:
+        return get_prefetcher().take(("sic_schema", question.strip()), lambda: self.pruner.render(question))
+
+    def _speculate_pruned_schema(self, turn: PrefetchTurn) -> None:
+        turn.submit(("sic_schema", turn.question.strip()), lambda: self.pruner.render(turn.question))
+
+    def _build_prompt(self, system_prompt: str):
+        """系统提示之后追加按最近一条用户问题裁剪的表结构；同一问题的多轮 LLM 调用命中缓存"""
+        system_message = SystemMessage(content=system_prompt)
+
+        def prompt(state) -> list:
+            messages = state["messages"]
+            question = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+            if not isinstance(question, str) or not question.strip():
+                return [system_message] + messages
+            try:
+                schema = self._pruned_schema(question)
+            except Exception as e:
+                print(f"表结构裁剪失败，回退为完整流程: {e}")
+                return [system_message] + messages
+            return [system_message, SystemMessage(content=sql_pruned_schema_prompt.format(schema=schema))] + messages
+
+        return prompt
+
     def _init_llm(self):
         """初始化大语言模型"""
-        return init_chat_model(
-            model=os.getenv("OPENAI_LLM_MODEL"),
-            api_key=os.getenv("OPENAI_API_KEY"),
-            base_url=os.getenv("OPENAI_BASE_URL"),
-            temperature=0.5,
-        )
+        return get_chat_model(temperature=0.5)
 
     def _init_agent(self) -> Any:
         """
@@ -85,16 +162,18 @@ class Text2SQLAgent:
         
         每次调用都会创建一个新的智能体实例，确保状态隔离。
         """
-        system_prompt = sql_prompt.format(
+        system_prompt = (sql_prompt if self.composite_schema else sql_prompt_stepwise).format(
                             dialect=self.db.dialect,  # 自动填充数据库类型
                             top_k=5  # 默认返回前 5 条结果
                         )
         return create_react_agent(
             model=self.llm,
             tools=self.tools,
-            prompt=system_prompt,
+            prompt=self._build_prompt(system_prompt) if self.pruner is not None else system_prompt,
             # state_schema=CustomState,
             name="text2sql_agent",
+            # 按 token 预算压缩送入 LLM 的历史消息，图状态中仍保留完整历史
+            pre_model_hook=create_compaction_hook(),
             store=self.store,
         )
     
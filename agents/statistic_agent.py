@@ -2,15 +2,17 @@ import os
 from typing import Any, List
 from dotenv import load_dotenv
 
-from langchain.chat_models import init_chat_model
 from langgraph.prebuilt import create_react_agent
 
 from langgraph.store.memory import InMemoryStore
-from langchain.embeddings import init_embeddings
+from common.get_models import get_chat_model, get_embeddings_model
+from common.message_compactor import create_compaction_hook
+from common.prefetch import get_prefetcher
 from langmem import create_memory_store_manager, ReflectionExecutor
 from langmem import create_manage_memory_tool, create_search_memory_tool
 
-from custom_tools import get_csv_tools, get_math_tools, get_neo4j_tools
+from custom_tools import get_csv_tools, get_math_tools, get_neo4j_tools, govern_tools, get_artifact_tools
+from custom_tools.neo4j_tools import speculate_vector_search, warm_vector_retrievers
 from common.prompt import statistic_prompt
 from common.memory_state import CustomState, AnalysisMemory
 
@@ -26,21 +28,17 @@ class StatisticsAgent:
         self.store = self._init_memory_store()
         self.tools = self._init_tools()
         self.agent = self._init_agent()
+        # 用户消息到达时以问题原文预取一次向量检索
+        get_prefetcher().register("neo4j_vector_search", speculate_vector_search)
+        # 后台预热向量检索器，首次 vector_search 不再承担连接、探测索引与加载模型的开销
+        warm_vector_retrievers()
 
     def _init_memory_store(self):
         """初始化长期记忆存储"""
-        embedding_model = os.getenv("EMBEDDING_MODEL")
-        embedding_provider = os.getenv("EMBEDDING_PROVIDER")
         embedding_dim = int(os.getenv("EMBEDDING_DIM", "768"))
 
-        embeddings = init_embeddings(
-            model=embedding_model,
-            provider=embedding_provider,
-            model_kwargs={
-                "device": "cpu",
-                "local_files_only": True,
-            }
-        )
+        # 与其他智能体共享同一个 embedding 实例，首次写入/检索记忆时才加载
+        embeddings = get_embeddings_model(lazy=True)
 
         return InMemoryStore(
             index={
@@ -71,6 +69,8 @@ class StatisticsAgent:
         tools = get_math_tools()
         tools.extend(get_csv_tools())  # 自定义CSV工具
         tools.extend(get_neo4j_tools())  # 允许直接访问 Neo4j 进行轻量查询/聚合
+        tools = govern_tools(tools)  # 超大输出落盘，只返回预览
+        tools.extend(get_artifact_tools())
         tools.extend([
             create_manage_memory_tool(namespace=("statistic_memories", "{langgraph_user_id}")),
             create_search_memory_tool(namespace=("statistic_memories", "{langgraph_user_id}")),
@@ -79,12 +79,7 @@ class StatisticsAgent:
 
     def _init_llm(self):
         """初始化大语言模型"""
-        return init_chat_model(
-            model=os.getenv("OPENAI_LLM_MODEL"),
-            api_key=os.getenv("OPENAI_API_KEY"),
-            base_url=os.getenv("OPENAI_BASE_URL"),
-            temperature=0.5,
-        )
+        return get_chat_model(temperature=0.5)
 
     def _init_agent(self) -> Any:
         return create_react_agent(
@@ -92,6 +87,8 @@ class StatisticsAgent:
             tools=self.tools,
             prompt=statistic_prompt,
             name="statistic_agent",
+            # 按 token 预算压缩送入 LLM 的历史消息，图状态中仍保留完整历史
+            pre_model_hook=create_compaction_hook(),
             store=self.store,
         )
     
@@ -1,34 +1,70 @@
-from langchain.chat_models import init_chat_model
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langchain_core.tools import tool
 from langgraph.graph import END, START, MessagesState, StateGraph
 from langgraph.prebuilt import InjectedState, create_react_agent
 from langgraph.types import Command, Send
+from pydantic import BaseModel, Field
 
 from dotenv import load_dotenv
-import json
 import os
-import re
-from typing import Annotated, Any, Dict, List, Optional
+from typing import Annotated, Any, Dict, List, Literal, Optional
 
 from agents import AnalysisAgent, StatisticsAgent, Text2SQLAgent
+from common.get_models import get_chat_model
+from common.message_compactor import (
+    MEMORY_INJECTION_CONTEXT,
+    MEMORY_INJECTION_KEY,
+    MEMORY_INJECTION_WRITE_REMINDER,
+    create_compaction_hook,
+)
 from common.memory_backend import init_memory_backend
+from common.memory_gate import MemoryWriteGate
 from common.memory_state import CustomState
+from common.memory_write_queue import MemoryWriteJob, MemoryWriteQueue
+from common.prefetch import PrefetchTurn, get_prefetcher
 from common.prompt import supervisor_prompt
-from custom_tools.memory_tools import create_supervisor_memory_tools
+from custom_tools.memory_tools import create_supervisor_memory_tools, memory_search_key
 
 load_dotenv()
 
+SUB_AGENT_NAMES = ("text2sql_agent", "statistic_agent", "analysis_agent")
+
+
+class ParallelSubtask(BaseModel):
+    agent_name: Literal["text2sql_agent", "statistic_agent", "analysis_agent"] = Field(
+        description="Name of the agent that handles this subtask."
+    )
+    task_description: str = Field(
+        description="Description of what the agent should do, including all of the relevant context."
+    )
+
+
 class SupervisorAgent:
     """
     协调多个智能体的智能体。
     """
-    def __init__(self) -> None:
+    def __init__(self, checkpointer: Any = None) -> None:
+        """
+        参数:
+            checkpointer: 图的检查点存储，如 common.checkpointer.get_checkpointer()；
+                子智能体作为子图自动沿用。为 None 时不持久化会话状态。
+        """
         self.memory_namespace_prefix = "supervisor_memories"
+        self.checkpointer = checkpointer
         self.memory_backend = init_memory_backend()
+        # 用户消息到达时投机预取，子智能体初始化时各自注册其工具的预取项
+        self.prefetcher = get_prefetcher()
+        self.prefetcher.register("supervisor_memory", self._speculate_memory)
         # 按顺序初始化各组件
         self.tools = self._init_tools()
         self.llm = self._init_llm()
+        self.memory_write_queue = MemoryWriteQueue(
+            # 写入判断是分类任务，使用 temperature=0 以便命中本地响应缓存
+            llm=get_chat_model(temperature=0),
+            backend=self.memory_backend,
+            gate=MemoryWriteGate(),
+        )
         self.agent = self._init_agent()
 
     def _create_handoff_tool(
@@ -56,6 +92,41 @@ class SupervisorAgent:
 
         return handoff_tool
 
+    def _create_parallel_dispatch_tool(self):
+        """
+        并行分派工具：一次发出多个 Send，各子任务在同一步内并行执行，
+        全部完成后统一回到 memory_router，再由主管智能体汇总。
+        """
+
+        @tool(
+            "parallel_dispatch",
+            description=(
+                "Assign several independent subtasks to different agents at once. "
+                "Use it only when the subtasks do not depend on each other's results, "
+                "e.g. a SQL extract plus a knowledge-graph lookup. Each agent may appear at most once."
+            ),
+        )
+        def parallel_dispatch(
+            tasks: Annotated[
+                List[ParallelSubtask],
+                "Independent subtasks, each assigned to a different agent.",
+            ],
+            state: Annotated[MessagesState, InjectedState],
+        ) -> Command | str:
+            agent_names = [task.agent_name for task in tasks]
+            if len(tasks) < 2:
+                return "parallel_dispatch 至少需要两个子任务，单个子任务请使用对应的 transfer_to_* 工具。"
+            if len(set(agent_names)) != len(agent_names):
+                return "parallel_dispatch 中每个智能体只能出现一次，请合并同一智能体的子任务。"
+
+            sends = []
+            for task in tasks:
+                agent_input = {**state, "messages": [{"role": "user", "content": task.task_description}]}
+                sends.append(Send("parallel_worker", {"agent_name": task.agent_name, "agent_input": agent_input}))
+            return Command(goto=sends, graph=Command.PARENT)
+
+        return parallel_dispatch
+
     def _init_tools(self):
         """初始化智能体集"""
         assign_to_sql_agent = self._create_handoff_tool(
@@ -78,16 +149,19 @@ class SupervisorAgent:
             backend=self.memory_backend,
         )
 
-        return [assign_to_sql_agent, assign_to_statistic_agent, assign_to_analysis_agent, *memory_tools]
+        parallel_dispatch = self._create_parallel_dispatch_tool()
+
+        return [
+            assign_to_sql_agent,
+            assign_to_statistic_agent,
+            assign_to_analysis_agent,
+            parallel_dispatch,
+            *memory_tools,
+        ]
 
     def _init_llm(self):
         """初始化大语言模型"""
-        return init_chat_model(
-            model=os.getenv("OPENAI_LLM_MODEL"),
-            api_key=os.getenv("OPENAI_API_KEY"),
-            base_url=os.getenv("OPENAI_BASE_URL"),
-            temperature=0.5,
-        )
+        return get_chat_model(temperature=0.5)
 
     def _get_state_value(self, state: CustomState, key: str, default: Optional[Any] = None) -> Optional[Any]:
         if isinstance(state, dict):
@@ -146,103 +220,26 @@ class SupervisorAgent:
         )
         return f"{self.memory_namespace_prefix}/{user_id}"
 
-    def _parse_json_from_text(self, text: str) -> Optional[Dict[str, Any]]:
-        cleaned = text.strip()
-        if not cleaned:
-            return None
-        # Handle fenced code blocks like ```json {...}```
-        if cleaned.startswith("```"):
-            cleaned = re.sub(r"^```(?:json)?", "", cleaned, count=1, flags=re.IGNORECASE).strip()
-            cleaned = re.sub(r"```$", "", cleaned).strip()
-        try:
-            data = json.loads(cleaned)
-            if isinstance(data, dict):
-                return data
-        except json.JSONDecodeError:
-            pass
-
-        match = re.search(r"\{.*\}", cleaned, re.DOTALL)
-        if match:
-            try:
-                data = json.loads(match.group(0))
-                if isinstance(data, dict):
-                    return data
-            except json.JSONDecodeError:
-                return None
-        return None
-
-    def _decide_memory_write(
+    def _build_memory_context_messages(
         self,
-        user_message: str,
-        retrieved_items: List[Dict[str, Any]],
-    ) -> Dict[str, Any]:
-        context_lines = "\n".join(
-            f"- {item.get('content', '')}" for item in retrieved_items[:5]
-        ) or "（无相关记忆）"
-        prompt = (
-            "你是一个长期记忆管理助手，需要判断用户最新的输入是否包含值得长期保存的偏好、"
-            "背景信息或其他对未来对话有帮助的事实。\n"
-            "请以 JSON 格式回答，包含字段：\n"
-            '  - "should_write": 布尔值，是否应写入记忆。\n'
-            '  - "memory_summary": 如果需要写入，请给出一到两句中文描述，概括核心要点；否则为空字符串。\n'
-            '  - "reason": 简要说明判断依据。\n'
-            "只保存会在未来多次使用、对用户画像重要或能指导后续行为的信息；临时性问题或一次性的请求不要写入。"
-        )
-
-        llm_messages = [
-            SystemMessage(content=prompt),
-            HumanMessage(
-                content=(
-                    "用户最新消息：\n"
-                    f"{user_message.strip()}\n\n"
-                    "已存在的相关记忆：\n"
-                    f"{context_lines}\n"
-                )
-            ),
-        ]
-
-        try:
-            response = self.llm.invoke(llm_messages)
-        except Exception:
-            return {"should_write": False, "memory_summary": "", "reason": "llm_failure"}
-
-        decision_text = self._normalize_message_content(getattr(response, "content", ""))
-        parsed = self._parse_json_from_text(decision_text)
-        if not parsed:
-            return {"should_write": False, "memory_summary": "", "reason": "parse_failure"}
-
-        should_write = bool(parsed.get("should_write", False))
-        memory_summary = str(parsed.get("memory_summary", "") or "").strip()
-        reason = str(parsed.get("reason", "") or "").strip()
-        return {
-            "should_write": should_write,
-            "memory_summary": memory_summary,
-            "reason": reason,
-        }
-
-    def _memory_router_node(self, state: CustomState) -> Dict[str, Any]:
-        user_message = self._extract_last_user_message_text(state)
-        if not user_message:
-            return {}
-
-        last_routed = self._get_state_value(state, "last_memory_routed_message")
-        if last_routed == user_message:
-            return {}
-
-        namespace = self._namespace_from_state(state)
-
-        updates: Dict[str, Any] = {"last_memory_routed_message": user_message}
+        namespace: str,
+        results: List[Dict[str, Any]],
+    ) -> List[SystemMessage]:
         injected_messages: List[SystemMessage] = []
-
-        results = self.memory_backend.search(namespace, user_message, top_k=5, min_score=0.3)
         if results:
             lines = "\n".join(f"- {item['content']}" for item in results)
             injected_messages.append(
-                SystemMessage(content=f"相关长期记忆（命名空间：{namespace}）：\n{lines}")
+                SystemMessage(
+                    content=f"相关长期记忆（命名空间：{namespace}）：\n{lines}",
+                    additional_kwargs={MEMORY_INJECTION_KEY: MEMORY_INJECTION_CONTEXT},
+                )
             )
         else:
             injected_messages.append(
-                SystemMessage(content="未在长期记忆中检索到相关内容，如有需要可以调用 memory_search。")
+                SystemMessage(
+                    content="未在长期记忆中检索到相关内容，如有需要可以调用 memory_search。",
+                    additional_kwargs={MEMORY_INJECTION_KEY: MEMORY_INJECTION_CONTEXT},
+                )
             )
 
         injected_messages.append(
@@ -250,77 +247,144 @@ class SupervisorAgent:
                 content=(
                     "请评估当前对话是否包含值得写入长期记忆的偏好或事实。"
                     "如需保存，请在最终回答前调用 memory_write 工具写入简洁要点。"
-                )
+                ),
+                # 标记为记忆注入消息，多轮对话中压缩阶段只保留每种类型的最新一条
+                additional_kwargs={MEMORY_INJECTION_KEY: MEMORY_INJECTION_WRITE_REMINDER},
             )
         )
+        return injected_messages
 
-        decision = self._decide_memory_write(user_message, results or [])
-
-        if decision.get("should_write"):
-            summary = decision.get("memory_summary", "")
-            reason = decision.get("reason", "")
-            updates["pending_memory_write"] = {
-                "namespace": namespace,
-                "query": user_message,
-                "summary": summary,
-                "reason": reason,
-            }
-            injected_messages.append(
-                SystemMessage(
-                    content=(
-                        "记忆助手建议写入长期记忆。\n"
-                        f"摘要：{summary or '（助手未提供摘要，请自行概括）'}\n"
-                        f"理由：{reason or '（无）'}\n"
-                        "请在最终答案前使用 memory_write 工具保存关键要点，或在回答中说明无需写入。"
-                    )
-                )
+    def _build_pending_memory_write(
+        self,
+        namespace: str,
+        user_message: str,
+        results: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        # 写入判断推迟到回答之后由后台队列批量完成，这里只记录判断所需的上下文
+        return {
+            "namespace": namespace,
+            "query": user_message,
+            "context": [item.get("content", "") for item in (results or [])[:5]],
+        }
+
+    def _speculate_memory(self, turn: PrefetchTurn) -> None:
+        if turn.namespace:
+            turn.submit(
+                memory_search_key(turn.namespace, turn.question),
+                lambda: self.memory_backend.search(turn.namespace, turn.question, top_k=5, min_score=0.3),
             )
 
-        if injected_messages:
-            updates["messages"] = injected_messages
+    def _prefetch_session_key(self, config: Optional[RunnableConfig], namespace: str) -> str:
+        return str(((config or {}).get("configurable") or {}).get("thread_id") or namespace)
+
+    def _turn_start_node(self, state: CustomState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+        """
+        用户输入进入图时（START）发起本轮预取：与记忆检索并行发起表结构、向量检索等查询，供随后的子智能体工具调用直接取用。
+        子智能体交回的任务消息也会以新的用户消息回到 memory_router，不能在那里开启新一轮，否则会结束真实的一轮并做无人取用的预取。
+        """
+        user_message = self._extract_last_user_message_text(state)
+        if user_message:
+            namespace = self._namespace_from_state(state)
+            self.prefetcher.start_turn(self._prefetch_session_key(config, namespace), user_message, namespace)
+        return {}
+
+    def _memory_router_node(self, state: CustomState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+        user_message = self._extract_last_user_message_text(state)
+        if not user_message:
+            return {}
 
-        return updates
+        last_routed = self._get_state_value(state, "last_memory_routed_message")
+        if last_routed == user_message:
+            return {}
 
-    def _memory_persist_node(self, state: CustomState) -> Dict[str, Any]:
-        pending = self._get_state_value(state, "pending_memory_write")
-        if not pending:
+        namespace = self._namespace_from_state(state)
+        results = self.prefetcher.take(
+            memory_search_key(namespace, user_message),
+            lambda: self.memory_backend.search(namespace, user_message, top_k=5, min_score=0.3),
+        )
+
+        return {
+            "last_memory_routed_message": user_message,
+            "pending_memory_write": self._build_pending_memory_write(namespace, user_message, results),
+            "messages": self._build_memory_context_messages(namespace, results),
+        }
+
+    async def _amemory_router_node(self, state: CustomState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+        """记忆路由的异步版本，检索不阻塞事件循环"""
+        user_message = self._extract_last_user_message_text(state)
+        if not user_message:
             return {}
 
+        last_routed = self._get_state_value(state, "last_memory_routed_message")
+        if last_routed == user_message:
+            return {}
+
+        namespace = self._namespace_from_state(state)
+        results = await self.prefetcher.atake(
+            memory_search_key(namespace, user_message),
+            lambda: self.memory_backend.asearch(namespace, user_message, top_k=5, min_score=0.3),
+        )
+
+        return {
+            "last_memory_routed_message": user_message,
+            "pending_memory_write": self._build_pending_memory_write(namespace, user_message, results),
+            "messages": self._build_memory_context_messages(namespace, results),
+        }
+
+    def _extract_final_answer(self, state: CustomState) -> str:
         ai_info = self._extract_last_ai_message_info(state)
         if not ai_info:
-            return {}
+            return ""
 
         name = ai_info.get("name")
         if name and name != "supervisor":
             # 仅在主管智能体输出最终答案时写入记忆
+            return ""
+
+        return (ai_info.get("content") or "").strip()
+
+    def _memory_persist_node(self, state: CustomState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+        """将本轮问答交给后台记忆写入队列，不等待判断与写入完成"""
+        # 本轮结束，未被取用的预取结果计为浪费
+        self.prefetcher.end_turn(self._prefetch_session_key(config, self._namespace_from_state(state)))
+        pending = self._get_state_value(state, "pending_memory_write")
+        if not pending:
             return {}
 
-        content = (ai_info.get("content") or "").strip()
+        content = self._extract_final_answer(state)
         if not content:
             return {}
 
-        namespace = pending.get("namespace") or self._namespace_from_state(state)
-        query = pending.get("query", "")
-        summary = (pending.get("summary") or "").strip()
-        reason = (pending.get("reason") or "").strip()
-
-        sections: List[str] = []
-        if summary:
-            sections.append(f"【记忆要点】\n{summary}")
-        if reason:
-            sections.append(f"【判断依据】\n{reason}")
-        sections.append(f"【用户问题】\n{query}")
-        sections.append(f"【最终回答】\n{content}")
-        memory_entry = "\n\n".join(sections)
-
-        try:
-            self.memory_backend.write(namespace, memory_entry, metadata={"source": "supervisor"})
-        except Exception:
-            # 写入失败不应阻断流程，记录失败后清理状态以避免无限重试
-            return {"pending_memory_write": None}
-
+        self.memory_write_queue.submit(
+            MemoryWriteJob(
+                namespace=pending.get("namespace") or self._namespace_from_state(state),
+                query=pending.get("query", ""),
+                answer=content,
+                context=list(pending.get("context") or []),
+            )
+        )
         return {"pending_memory_write": None}
 
+    def _parallel_worker_output(self, agent_name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        # 并行分支在同一步内写回父图，只回传消息与该智能体产出的 CSV 信息，
+        # 其余键由父图保留，避免多个分支同时写同一个键
+        output: Dict[str, Any] = {"messages": result.get("messages", [])}
+        if agent_name == "text2sql_agent":
+            for key in ("csv_local_path", "csv_meta"):
+                if result.get(key):
+                    output[key] = result[key]
+        return output
+
+    def _parallel_worker_node(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        agent_name = payload["agent_name"]
+        result = self.sub_agents[agent_name].invoke(payload["agent_input"])
+        return self._parallel_worker_output(agent_name, result)
+
+    async def _aparallel_worker_node(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        agent_name = payload["agent_name"]
+        result = await self.sub_agents[agent_name].ainvoke(payload["agent_input"])
+        return self._parallel_worker_output(agent_name, result)
+
     def _init_agent(self) -> Any:
         """
         构建并返回 ReAct 智能体图
@@ -333,30 +397,40 @@ class SupervisorAgent:
             prompt=supervisor_prompt,
             state_schema=CustomState,
             name="supervisor",
+            # 按 token 预算压缩送入 LLM 的历史消息，图状态中仍保留完整历史
+            pre_model_hook=create_compaction_hook(),
         )
 
         sql_agent = Text2SQLAgent().get_agent()
         statistic_agent = StatisticsAgent().get_agent()
         analysis_agent = AnalysisAgent().get_agent()
+        self.sub_agents = dict(zip(SUB_AGENT_NAMES, (sql_agent, statistic_agent, analysis_agent)))
 
         supervisor = (
             StateGraph(CustomState)
             # NOTE: `destinations` is only needed for visualization and doesn't affect runtime behavior
-            .add_node("memory_router", self._memory_router_node)
-            .add_node(supervisor_agent, destinations=("text2sql_agent", "statistic_agent", "analysis_agent", END))
+            # 同时提供同步与异步实现：stream 走同步路径，astream 走非阻塞路径
+            .add_node("turn_start", self._turn_start_node)
+            .add_node("memory_router", RunnableLambda(self._memory_router_node, afunc=self._amemory_router_node))
+            .add_node(supervisor_agent, destinations=(*SUB_AGENT_NAMES, "parallel_worker", END))
             .add_node(sql_agent)
             .add_node(statistic_agent)
             .add_node(analysis_agent)
+            # parallel_dispatch 的每个 Send 对应一个 parallel_worker 任务，同一步内并行执行
+            .add_node("parallel_worker", RunnableLambda(self._parallel_worker_node, afunc=self._aparallel_worker_node))
             .add_node("memory_persist", self._memory_persist_node)
-            .add_edge(START, "memory_router")
+            .add_edge(START, "turn_start")
+            .add_edge("turn_start", "memory_router")
             .add_edge("memory_router", "supervisor")
             # always return back to the supervisor
             .add_edge("text2sql_agent", "memory_router")
             .add_edge("statistic_agent", "memory_router")
             .add_edge("analysis_agent", "memory_router")
+            # 所有并行分支完成后 memory_router 只触发一次，即为汇合点
+            .add_edge("parallel_worker", "memory_router")
             .add_edge("supervisor", "memory_persist")
             .add_edge("memory_persist", END)
-            .compile()
+            .compile(checkpointer=self.checkpointer)
         )
         
         return supervisor
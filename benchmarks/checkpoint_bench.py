@@ -0,0 +1,106 @@
+"""
+SQLite 增量 checkpointer 基准。
+
+用本地桩节点模拟多轮对话（每轮一条用户消息 + 一条较长的回答），统计：
+每一步检查点写入耗时（put + put_writes）、数据库体积、清理效果以及新进程恢复会话的耗时。
+
+用法：
+    python -m benchmarks.checkpoint_bench --turns 200 --answer-chars 2000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from common.checkpointer import SQLiteDeltaSaver
+
+
+class TimedSaver(SQLiteDeltaSaver):
+    """记录每次写入耗时的 checkpointer"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.put_ms = []
+
+    def put(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().put(*args, **kwargs)
+        finally:
+            self.put_ms.append((time.perf_counter() - start) * 1000)
+
+    def put_writes(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().put_writes(*args, **kwargs)
+        finally:
+            self.put_ms.append((time.perf_counter() - start) * 1000)
+
+
+def build_graph(checkpointer, answer_chars: int):
+    def answer(state: MessagesState):
+        question = state["messages"][-1].content
+        return {"messages": [AIMessage(content=f"关于「{question}」的回答：" + "数" * answer_chars)]}
+
+    def persist(state: MessagesState):
+        return {}
+
+    return (
+        StateGraph(MessagesState)
+        .add_node("answer", answer)
+        .add_node("persist", persist)
+        .add_edge(START, "answer")
+        .add_edge("answer", "persist")
+        .add_edge("persist", END)
+        .compile(checkpointer=checkpointer)
+    )
+
+
+def _db_size(path: str) -> int:
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 增量 checkpointer 基准。")
+    parser.add_argument('--turns', type=int, default=200, help='对话轮数。')
+    parser.add_argument('--answer-chars', type=int, default=2000, help='每轮回答的字符数。')
+    parser.add_argument('--keep-last', type=int, default=20, help='清理时每个会话保留的检查点数。')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "checkpoints.sqlite")
+        saver = TimedSaver(path=path, keep_last=args.keep_last, prune_interval=0)
+        graph = build_graph(saver, args.answer_chars)
+        config = {"configurable": {"thread_id": "bench"}}
+        for turn in range(args.turns):
+            graph.invoke({"messages": [HumanMessage(content=f"第 {turn} 个问题")]}, config)
+
+        saver._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        size_before = _db_size(path)
+        start = time.perf_counter()
+        pruned = saver.prune()
+        prune_ms = (time.perf_counter() - start) * 1000
+        saver.close()
+
+        # 模拟新进程恢复会话：全新的 saver，没有任何内存缓存
+        resumed = SQLiteDeltaSaver(path=path, prune_interval=0)
+        start = time.perf_counter()
+        checkpoint = resumed.get_tuple(config)
+        resume_ms = (time.perf_counter() - start) * 1000
+        messages = len(checkpoint.checkpoint["channel_values"]["messages"])
+        resumed.close()
+
+        put_ms = saver.put_ms
+        print(f"写入次数            {len(put_ms)}")
+        print(f"单次写入 p50/p95    {statistics.median(put_ms):.2f} / {statistics.quantiles(put_ms, n=20)[-1]:.2f} ms")
+        print(f"数据库体积          {size_before / 1024:.0f} KB（{args.turns} 轮）")
+        print(f"清理                {pruned}，耗时 {prune_ms:.1f} ms")
+        print(f"恢复会话            {resume_ms:.2f} ms（{messages} 条消息）")
+
+
+if __name__ == "__main__":
+    main()
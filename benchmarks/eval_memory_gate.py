@@ -0,0 +1,89 @@
+"""
+记忆写入预分类器的离线评估脚本。
+
+回放一份已标注的对话日志，统计预分类器的精确率、召回率以及可省去的 LLM 判断调用占比。
+日志为 jsonl，每行格式：{"text": "用户消息", "should_write": true}
+
+用法：
+    python -m benchmarks.eval_memory_gate --log cache/memory_turns.jsonl
+    python -m benchmarks.eval_memory_gate --log cache/memory_turns.jsonl --train cache/labelled_turns.jsonl
+"""
+import argparse
+import time
+
+from common.memory_gate import (
+    DEFAULT_LABELLED_TURNS,
+    GATE_AMBIGUOUS,
+    GATE_SKIP,
+    GATE_WRITE,
+    MemoryWriteGate,
+    load_labelled_turns,
+)
+
+
+def _ratio(numerator: int, denominator: int) -> float:
+    return numerator / denominator if denominator else 0.0
+
+
+def evaluate(gate: MemoryWriteGate, turns, batch_size: int = 64) -> dict:
+    counts = {GATE_WRITE: 0, GATE_SKIP: 0, GATE_AMBIGUOUS: 0}
+    tp = fp = missed = ambiguous_pos = 0
+    positives = sum(1 for _, label in turns if label)
+
+    start = time.perf_counter()
+    for offset in range(0, len(turns), batch_size):
+        batch = turns[offset:offset + batch_size]
+        verdicts = gate.classify_batch([text for text, _ in batch])
+        for (_, label), verdict in zip(batch, verdicts):
+            counts[verdict["label"]] += 1
+            if verdict["label"] == GATE_WRITE:
+                tp += label
+                fp += not label
+            elif verdict["label"] == GATE_SKIP:
+                missed += label
+            else:
+                ambiguous_pos += label
+    elapsed = time.perf_counter() - start
+
+    total = len(turns)
+    return {
+        "turns": total,
+        "positives": positives,
+        "gated_write": counts[GATE_WRITE],
+        "gated_skip": counts[GATE_SKIP],
+        "llm_routed": counts[GATE_AMBIGUOUS],
+        "llm_calls_avoided": _ratio(counts[GATE_WRITE] + counts[GATE_SKIP], total),
+        # 只看预分类器自身给出确定结论的部分
+        "gate_precision": _ratio(tp, tp + fp),
+        "gate_recall": _ratio(tp, positives),
+        # 假设送往 LLM 的对话都被正确判断，衡量整条流水线会漏掉多少应写入的对话
+        "pipeline_precision": _ratio(tp + ambiguous_pos, tp + fp + ambiguous_pos),
+        "pipeline_recall": _ratio(tp + ambiguous_pos, positives),
+        "missed_positives": missed,
+        "ms_per_turn": _ratio(elapsed * 1000, total),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="记忆写入预分类器离线评估。")
+    parser.add_argument('--log', required=True, help='回放的标注对话日志（jsonl）。')
+    parser.add_argument('--train', help='预分类器使用的标注样本（jsonl），默认使用内置样本。')
+    parser.add_argument('--write-margin', type=float, default=0.08, help='判定写入的最小相似度差。')
+    parser.add_argument('--skip-margin', type=float, default=0.05, help='判定跳过的最小相似度差。')
+    args = parser.parse_args()
+
+    labelled = load_labelled_turns(args.train) if args.train else DEFAULT_LABELLED_TURNS
+    gate = MemoryWriteGate(
+        labelled_turns=labelled,
+        write_margin=args.write_margin,
+        skip_margin=args.skip_margin,
+    )
+    report = evaluate(gate, load_labelled_turns(args.log))
+
+    print("记忆写入预分类器评估结果：")
+    for key, value in report.items():
+        print(f"  {key:<20} {value:.4f}" if isinstance(value, float) else f"  {key:<20} {value}")
+
+
+if __name__ == "__main__":
+    main()
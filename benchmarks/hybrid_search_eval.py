@@ -0,0 +1,98 @@
+"""
+全文 + 向量混合检索的本地评估。
+
+对同一组问题分别执行纯向量检索（vector_search.structured）与混合检索（vector_search.hybrid），统计：
+    recall@k        期望命中的名称出现在前 k 个实体 id 中的比例（子串匹配，忽略大小写）
+    chunk_recall    期望命中的名称出现在返回文本块中的比例
+    延迟            中位数 / p90（含问题编码与一次 Cypher 往返）
+
+问题集为 jsonl，每行格式：{"question": "...", "expected": ["攀撑计划", "创新创业学院"]}；
+默认使用内置问题，期望名称取自 database/neo4j_setup/files 下的源文档。需要已建好图谱、向量索引与全文索引。
+
+用法：
+    python -m benchmarks.hybrid_search_eval
+    python -m benchmarks.hybrid_search_eval --fixture cache/hybrid_eval.jsonl --k 5 10 20
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Dict, List
+
+from custom_tools.neo4j_tools import HYBRID_SEARCH_TEMPLATE, VECTOR_SEARCH_TEMPLATE, get_vector_retriever
+
+DEFAULT_FIXTURE = [
+    {"question": "攀撑计划项目编外人员签订什么合同？", "expected": ["攀撑计划", "第三方人才服务公司"]},
+    {"question": "创新创业学院招聘科研助理的年龄要求", "expected": ["创新创业学院", "科研助理"]},
+    {"question": "被列为失信联合惩戒对象还能报考吗", "expected": ["失信联合惩戒对象"]},
+    {"question": "计算机学院研究生学业奖学金需要提交哪些材料", "expected": ["学业奖学金", "计算机学院"]},
+    {"question": "2025年硕士研究生招生复试怎么安排", "expected": ["复试", "硕士研究生"]},
+    {"question": "国家奖学金和学业奖学金能同时获得吗", "expected": ["国家奖学金", "学业奖学金"]},
+]
+
+PARAMS = {"topChunks": 3, "topCommunities": 3, "topOutsideRels": 10, "topInsideRels": 10}
+
+
+def _found(term: str, texts: List[str]) -> bool:
+    term = term.lower()
+    return any(term in (text or "").lower() for text in texts)
+
+
+def evaluate(template: str, fixture: List[Dict], ks: List[int]) -> Dict[str, object]:
+    retriever = get_vector_retriever("vector", template)
+    retriever.embedding.embed_query(fixture[0]["question"])  # 预热模型与连接
+    max_k = max(ks)
+    recalls: Dict[int, List[float]] = {k: [] for k in ks}
+    chunk_recalls: List[float] = []
+    latencies: List[float] = []
+
+    for item in fixture:
+        started = time.perf_counter()
+        record = retriever.query(item["question"], max_k, **PARAMS)
+        latencies.append((time.perf_counter() - started) * 1000)
+        expected = item["expected"]
+        entity_ids = [str(e) for e in record.get("entity_ids") or []]
+        for k in ks:
+            recalls[k].append(sum(_found(t, entity_ids[:k]) for t in expected) / len(expected))
+        chunks = [str(c) for c in record.get("chunks") or []]
+        chunk_recalls.append(sum(_found(t, chunks) for t in expected) / len(expected))
+
+    ordered = sorted(latencies)
+    report = {f"recall@{k}": statistics.mean(v) for k, v in recalls.items()}
+    report.update({
+        "chunk_recall": statistics.mean(chunk_recalls),
+        "median_ms": statistics.median(latencies),
+        "p90_ms": ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))],
+    })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比纯向量检索与全文 + 向量混合检索的召回率与延迟。")
+    parser.add_argument('--fixture', help='问题集 jsonl；默认使用内置问题。')
+    parser.add_argument('--k', type=int, nargs='+', default=[5, 10], help='统计 recall@k 的 k 值。')
+    parser.add_argument('--output', help='将结果以 JSON 写入该文件。')
+    args = parser.parse_args()
+
+    fixture = DEFAULT_FIXTURE
+    if args.fixture:
+        with open(args.fixture, "r", encoding="utf-8") as f:
+            fixture = [json.loads(line) for line in f if line.strip()]
+
+    reports = {
+        "vector": evaluate(VECTOR_SEARCH_TEMPLATE, fixture, args.k),
+        "hybrid": evaluate(HYBRID_SEARCH_TEMPLATE, fixture, args.k),
+    }
+    print(f"问题数 {len(fixture)}")
+    for name, report in reports.items():
+        print(f"[{name}]")
+        for key, value in report.items():
+            print(f"  {key:<14} {value:.3f}" if "recall" in key else f"  {key:<14} {value:.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+冷启动导入耗时基准。
+
+基于 `python -X importtime` 在独立子进程中导入各入口模块，检查三件事：
+1. 导入耗时（多次运行取中位数）相对基线的回退是否超过容忍度；
+2. 入口模块是否把不该在导入期出现的重量级依赖拉了进来；
+3. 导入过程是否在工作目录下留下了副作用（如创建 cache 目录）。
+任一检查失败时以非零状态码退出，可直接作为本地 CI 检查使用。
+
+用法：
+    python -m benchmarks.import_time                     # 与基线比较
+    python -m benchmarks.import_time --update-baseline   # 重新记录基线
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = PROJECT_ROOT / "benchmarks" / "import_time_baseline.json"
+
+DEFAULT_TARGETS = ["common", "custom_tools", "agents", "main"]
+
+# 各入口在导入期不应加载的模块（只在真正使用时才按需导入）
+FORBIDDEN_IMPORTS: Dict[str, List[str]] = {
+    "common": [
+        "neo4j", "langchain_neo4j", "mysql.connector", "langchain_huggingface",
+        "sentence_transformers", "torch", "langchain_openai", "hanlp",
+    ],
+    "custom_tools": [
+        "langchain_mcp_adapters", "langchain_neo4j", "langchain_huggingface",
+        "sentence_transformers", "torch", "hanlp",
+    ],
+    "agents": ["langchain_mcp_adapters", "langchain_huggingface", "sentence_transformers", "torch", "hanlp"],
+    "main": ["langchain_mcp_adapters", "langchain_huggingface", "sentence_transformers", "torch", "hanlp"],
+}
+
+
+def measure_once(target: str) -> Tuple[float, Set[str], List[Tuple[str, int]], List[str]]:
+    """
+    在干净的子进程中导入一次 target。
+
+    返回:
+        (累计耗时ms, 已导入模块集合, [(模块, 自身耗时us)], 导入后工作目录新增的文件)
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        env = {**os.environ, "PYTHONPATH": str(PROJECT_ROOT)}
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+            cwd=workdir,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"导入 {target} 失败：\n{proc.stderr[-2000:]}")
+        side_effects = sorted(os.listdir(workdir))
+
+    modules: Set[str] = set()
+    self_times: List[Tuple[str, int]] = []
+    cumulative_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) != 3 or not parts[0].isdigit():
+            continue  # 表头
+        self_us, cum_us, name = int(parts[0]), int(parts[1]), parts[2]
+        module = name.strip()
+        modules.add(module)
+        self_times.append((module, self_us))
+        if module == target:
+            cumulative_us = cum_us
+    return cumulative_us / 1000, modules, self_times, side_effects
+
+
+def find_forbidden(target: str, modules: Set[str]) -> List[str]:
+    found = []
+    for forbidden in FORBIDDEN_IMPORTS.get(target, []):
+        if any(m == forbidden or m.startswith(forbidden + ".") for m in modules):
+            found.append(forbidden)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动导入耗时基准与回退检查。")
+    parser.add_argument('targets', nargs='*', default=DEFAULT_TARGETS, help='要检查的入口模块。')
+    parser.add_argument('--repeat', type=int, default=5, help='每个入口重复导入的次数，取中位数。')
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='基线文件路径。')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许相对基线变慢的比例。')
+    parser.add_argument('--update-baseline', action='store_true', help='用本次结果覆盖基线。')
+    parser.add_argument('--top', type=int, default=10, help='打印自身耗时最高的模块数量。')
+    args = parser.parse_args()
+
+    baseline_path = Path(args.baseline)
+    baseline: Dict[str, float] = {}
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+
+    results: Dict[str, float] = {}
+    failures: List[str] = []
+    for target in args.targets:
+        runs = [measure_once(target) for _ in range(args.repeat)]
+        median_ms = statistics.median(r[0] for r in runs)
+        results[target] = round(median_ms, 1)
+        _, modules, self_times, side_effects = runs[-1]
+
+        print(f"\n== {target}: {median_ms:.1f} ms（{args.repeat} 次中位数，共 {len(modules)} 个模块）")
+        for module, self_us in sorted(self_times, key=lambda x: x[1], reverse=True)[:args.top]:
+            print(f"   {self_us / 1000:8.1f} ms  {module}")
+
+        forbidden = find_forbidden(target, modules)
+        if forbidden:
+            failures.append(f"{target} 在导入期加载了重量级依赖：{', '.join(forbidden)}")
+        if side_effects:
+            failures.append(f"{target} 导入时在工作目录产生了文件：{', '.join(side_effects)}")
+
+        budget = baseline.get(target)
+        if budget is not None and not args.update_baseline and median_ms > budget * (1 + args.tolerance):
+            failures.append(
+                f"{target} 导入耗时 {median_ms:.1f} ms 超过基线 {budget:.1f} ms 的 {args.tolerance:.0%} 容忍度"
+            )
+
+    if args.update_baseline:
+        baseline.update(results)
+        baseline_path.write_text(json.dumps(baseline, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\n基线已写入 {baseline_path}")
+    elif not baseline:
+        print(f"\n未找到基线文件 {baseline_path}，仅执行依赖与副作用检查；可使用 --update-baseline 记录基线。")
+
+    if failures:
+        print("\n检查未通过：")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n检查通过。")
+
+
+if __name__ == "__main__":
+    main()
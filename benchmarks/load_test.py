@@ -0,0 +1,180 @@
+"""
+多会话服务压测：按目标 QPS 回放问题集，统计延迟分位数与吞吐。
+
+默认使用本地桩 LLM 构建与主管智能体同构的最小图（记忆路由 -> 主管 -> 记忆持久化），
+只衡量编排、会话隔离、背压与 LLM 并发上限本身的开销；加 --real 则使用完整的 SupervisorAgent。
+--cancel-ratio 按比例在请求执行中途取消（模拟客户端断开），压测结束后在途 LLM 许可数必须回到 0，否则以非零状态退出。
+
+用法：
+    python -m benchmarks.load_test --qps 20 --requests 400 --sessions 50
+    python -m benchmarks.load_test --questions cache/questions.txt --qps 5 --real
+    python -m benchmarks.load_test --qps 20 --requests 400 --cancel-ratio 0.2
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from typing import List
+
+from langgraph.graph import END, START, StateGraph
+from langgraph.prebuilt import create_react_agent
+
+from agents.session_server import ServerBusyError, SessionServer
+from common.memory_state import CustomState
+from benchmarks.stub_llm import StubChatModel
+
+DEFAULT_QUESTIONS = [
+    "我想知道在数据库的data_test表中有多少订单是超期的？",
+    "各个超期类别分别有多少订单？",
+    "申请奖学金需要满足什么条件？",
+    "你都具备什么和‘奖学金评选’相关的知识？",
+    "帮我统计各部门的订单完成率",
+]
+
+
+def build_stub_graph(latency_ms: float, jitter_ms: float):
+    """与主管智能体同构的最小图，LLM 替换为桩模型"""
+    supervisor = create_react_agent(
+        model=StubChatModel(latency_ms=latency_ms, jitter_ms=jitter_ms),
+        tools=[],
+        state_schema=CustomState,
+        name="supervisor",
+    )
+
+    async def memory_router(state: CustomState):
+        await asyncio.sleep(0.005)  # 模拟一次本地记忆检索
+        return {}
+
+    def memory_persist(state: CustomState):
+        return {}
+
+    return (
+        StateGraph(CustomState)
+        .add_node("memory_router", memory_router)
+        .add_node(supervisor)
+        .add_node("memory_persist", memory_persist)
+        .add_edge(START, "memory_router")
+        .add_edge("memory_router", "supervisor")
+        .add_edge("supervisor", "memory_persist")
+        .add_edge("memory_persist", END)
+        .compile()
+    )
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+async def run_load(
+    server: SessionServer, questions: List[str], qps: float, requests: int, sessions: int,
+    cancel_ratio: float = 0.0, cancel_after_ms: float = 300.0,
+) -> dict:
+    latencies: List[float] = []
+    queued: List[float] = []
+    errors = 0
+    cancelled = 0
+    rng = random.Random(0)
+
+    async def one(idx: int):
+        nonlocal errors, cancelled
+        session_id = f"session-{idx % sessions}"
+        try:
+            result = await server.chat(session_id, questions[idx % len(questions)])
+            latencies.append(result.latency)
+            queued.append(result.queued)
+        except ServerBusyError:
+            pass
+        except asyncio.CancelledError:
+            cancelled += 1
+        except Exception:
+            errors += 1
+
+    async def cancel_later(task: asyncio.Task):
+        await asyncio.sleep(rng.uniform(0, cancel_after_ms) / 1000)
+        task.cancel()
+
+    # 开环发压：按固定间隔提交请求，不等待上一个请求完成
+    interval = 1.0 / qps
+    started = time.perf_counter()
+    tasks = []
+    for idx in range(requests):
+        target = started + idx * interval
+        delay = target - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(one(idx))
+        tasks.append(task)
+        if rng.random() < cancel_ratio:
+            tasks.append(asyncio.create_task(cancel_later(task)))
+    await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    # 被取消任务的许可在任务结束回调中释放
+    await asyncio.sleep(0)
+
+    return {
+        "requests": requests,
+        "completed": len(latencies),
+        "rejected": server.rejected,
+        "errors": errors,
+        "cancelled": cancelled,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_queue_ms": statistics.mean(queued) * 1000 if queued else 0.0,
+        "llm_peak_in_flight": server.llm_limiter.peak_in_flight,
+        "llm_waited_calls": server.llm_limiter.waited_calls,
+        # 所有请求结束后应为 0，否则说明有许可泄漏
+        "llm_in_flight_after": server.llm_limiter.in_flight,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多会话服务压测。")
+    parser.add_argument('--questions', help='问题集文件，每行一个问题；默认使用内置问题。')
+    parser.add_argument('--qps', type=float, default=10.0, help='目标请求速率。')
+    parser.add_argument('--requests', type=int, default=200, help='总请求数。')
+    parser.add_argument('--sessions', type=int, default=20, help='并发会话数，请求按轮询分配到会话。')
+    parser.add_argument('--max-concurrent-turns', type=int, default=32, help='同时执行的轮次上限。')
+    parser.add_argument('--max-pending-turns', type=int, default=256, help='排队轮次上限，超出即拒绝。')
+    parser.add_argument('--max-in-flight-llm', type=int, default=8, help='同时在途的 LLM 调用上限。')
+    parser.add_argument('--latency-ms', type=float, default=300.0, help='桩 LLM 的平均延迟。')
+    parser.add_argument('--jitter-ms', type=float, default=100.0, help='桩 LLM 的延迟抖动。')
+    parser.add_argument('--real', action='store_true', help='使用完整的 SupervisorAgent 与真实 LLM。')
+    parser.add_argument('--cancel-ratio', type=float, default=0.0, help='执行中途被取消的请求比例，模拟客户端断开。')
+    parser.add_argument('--cancel-after-ms', type=float, default=300.0, help='被取消的请求在提交后 [0, 该值] 毫秒内随机取消。')
+    args = parser.parse_args()
+
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, "r", encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    graph = None if args.real else build_stub_graph(args.latency_ms, args.jitter_ms)
+    server = SessionServer(
+        graph=graph,
+        max_concurrent_turns=args.max_concurrent_turns,
+        max_pending_turns=args.max_pending_turns,
+        max_in_flight_llm=args.max_in_flight_llm,
+    )
+    report = asyncio.run(run_load(
+        server, questions, args.qps, args.requests, args.sessions, args.cancel_ratio, args.cancel_after_ms,
+    ))
+
+    print("压测结果：")
+    for key, value in report.items():
+        print(f"  {key:<20} {value:.2f}" if isinstance(value, float) else f"  {key:<20} {value}")
+    if report["llm_in_flight_after"]:
+        print(f"LLM 并发许可泄漏：压测结束后仍有 {report['llm_in_flight_after']} 个在途许可")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
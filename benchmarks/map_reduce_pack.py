@@ -0,0 +1,55 @@
+"""
+MapReduce 社区打包基准。
+
+按 token 预算把小社区合并进同一次 Map 调用后，统计 Map 调用次数与提示 token 数（含每次调用重复发送的系统提示）
+相对每个社区单独调用时的变化。只做规划与 token 计数，不调用 LLM。
+
+用法：
+    python -m benchmarks.map_reduce_pack --communities 200 --budgets 0 2000 4000 8000
+    python -m benchmarks.map_reduce_pack --live --level 0
+"""
+import argparse
+import random
+
+from agents.search.mapReduce import COMMUNITIES_BY_LEVEL, plan_map_calls
+from common.cypher_templates import run_template
+
+QUESTION = "申请奖学金需要满足什么条件？"
+
+
+def synthetic_communities(n: int, seed: int = 0):
+    """模拟真实图谱的社区大小分布：大多数社区只有几个节点，少数社区很大"""
+    rng = random.Random(seed)
+    communities = []
+    for idx in range(n):
+        nodes = max(1, int(rng.paretovariate(1.2)))
+        lines = [f"节点 {idx}-{i}：奖学金评定细则第 {rng.randint(1, 99)} 条的相关描述" for i in range(nodes)]
+        communities.append({"output": {"communityId": f"0-{idx}", "full_content": "\n".join(lines)}})
+    return communities
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MapReduce 社区打包基准。")
+    parser.add_argument('--communities', type=int, default=200, help='模拟社区数量。')
+    parser.add_argument('--budgets', type=int, nargs='+', default=[0, 2000, 4000, 8000], help='每次 Map 调用的社区 token 预算，0 表示不打包。')
+    parser.add_argument('--live', action='store_true', help='读取真实 Neo4j 库中指定层级的社区。')
+    parser.add_argument('--level', type=int, default=0, help='--live 时读取的社区层级。')
+    parser.add_argument('--query', default=QUESTION, help='用户问题。')
+    args = parser.parse_args()
+
+    if args.live:
+        communities = run_template(COMMUNITIES_BY_LEVEL, level=args.level)
+    else:
+        communities = synthetic_communities(args.communities)
+    print(f"社区数: {len(communities)}")
+
+    print(f"{'预算':>8} {'Map 调用':>10} {'提示 token':>12} {'不打包 token':>14} {'节省':>8}")
+    for budget in args.budgets:
+        _, stats = plan_map_calls(args.query, communities, budget)
+        saved = 1 - stats["prompt_tokens"] / stats["unpacked_prompt_tokens"] if stats["unpacked_prompt_tokens"] else 0.0
+        print(f"{budget:>8} {stats['map_calls']:>10} {stats['prompt_tokens']:>12} "
+              f"{stats['unpacked_prompt_tokens']:>14} {saved:>8.1%}")
+
+
+if __name__ == '__main__':
+    main()
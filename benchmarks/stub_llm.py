@@ -0,0 +1,41 @@
+"""本地桩 LLM：不访问任何服务，按设定延迟返回固定格式的回答，用于压测编排层本身的开销。"""
+import asyncio
+import random
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class StubChatModel(BaseChatModel):
+    """延迟服从 [latency_ms - jitter_ms, latency_ms + jitter_ms] 均匀分布，永远直接给出最终答案"""
+
+    latency_ms: float = 300.0
+    jitter_ms: float = 100.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "StubChatModel":
+        return self
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        question = next(
+            (m.content for m in reversed(messages) if getattr(m, "type", "") == "human"), ""
+        )
+        message = AIMessage(content=f"[stub] 已处理：{question}", name="supervisor")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._delay())
+        return self._result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return self._result(messages)
@@ -0,0 +1,117 @@
+"""
+Text2SQL 问题集回放：对比两种获取表结构的流程下，每个问题所需的 LLM 轮次、工具调用与耗时。
+
+    composite  提供 get_relevant_schema 组合工具，一次调用返回相关表的精简 DDL 与样例数据
+    stepwise   逐步调用 sql_db_list_tables、sql_db_schema / get_table_columns、sql_db_query_checker
+    pruned     SIC 分类器按问题裁剪表结构后直接注入提示词（需配置 SIC_MODEL_PATH）
+
+需要 .env 中可用的 MySQL 与 LLM 配置。composite / stepwise 两种模式不启用 SIC 裁剪。
+
+用法：
+    python -m benchmarks.text2sql_replay
+    python -m benchmarks.text2sql_replay --questions cache/sql_questions.txt --mode composite
+    python -m benchmarks.text2sql_replay --mode all
+"""
+import argparse
+import json
+import statistics
+import time
+from collections import Counter
+from typing import Dict, List
+
+from langchain_core.messages import AIMessage
+
+from agents.sql_agent import Text2SQLAgent
+from benchmarks.load_test import percentile
+from common.token_counter import TokenLedger
+
+DEFAULT_QUESTIONS = [
+    "我想知道在数据库的data_test表中有多少订单是超期的？",
+    "data_test表中各个超期类别分别有多少订单？",
+    "帮我统计各部门的订单完成率",
+    "最近一个月每天新增的订单数量是多少？",
+    "实际完成时间晚于预期时间的订单有哪些，按部门汇总",
+]
+
+
+def replay(mode: str, questions: List[str], recursion_limit: int) -> Dict[str, object]:
+    sql_agent = Text2SQLAgent(composite_schema=(mode == "composite"), schema_pruning=(mode == "pruned"))
+    if mode == "pruned" and sql_agent.pruner is None:
+        raise SystemExit("pruned 模式需要在 .env 中配置 SIC_MODEL_PATH")
+    agent = sql_agent.get_agent()
+    turns: List[int] = []
+    latencies: List[float] = []
+    prompt_tokens: List[int] = []
+    tool_calls: Counter = Counter()
+    failed = 0
+
+    for idx, question in enumerate(questions, 1):
+        ledger = TokenLedger()
+        started = time.perf_counter()
+        try:
+            result = agent.invoke(
+                {"messages": [{"role": "user", "content": question}]},
+                config={"callbacks": [ledger], "recursion_limit": recursion_limit},
+            )
+        except Exception as e:
+            failed += 1
+            print(f"  [{mode}] #{idx} 失败: {e}")
+            continue
+        latencies.append(time.perf_counter() - started)
+        ai_messages = [m for m in result["messages"] if isinstance(m, AIMessage)]
+        turns.append(len(ai_messages))
+        prompt_tokens.append(ledger.totals()["prompt_tokens_est"])
+        for message in ai_messages:
+            tool_calls.update(call["name"] for call in message.tool_calls)
+        print(f"  [{mode}] #{idx} LLM 轮次 {turns[-1]}，耗时 {latencies[-1]:.1f}s")
+
+    report = {
+        "questions": len(questions),
+        "failed": failed,
+        "median_turns": statistics.median(turns) if turns else 0,
+        "mean_turns": statistics.mean(turns) if turns else 0.0,
+        "p90_turns": percentile(turns, 90),
+        "median_latency_s": statistics.median(latencies) if latencies else 0.0,
+        "mean_prompt_tokens": statistics.mean(prompt_tokens) if prompt_tokens else 0.0,
+        "tool_calls": dict(tool_calls.most_common()),
+    }
+    if sql_agent.pruner is not None:
+        report["pruner_cache"] = dict(sql_agent.pruner.stats)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text2SQL 问题集回放，对比组合表结构工具与逐步流程的 LLM 轮次。")
+    parser.add_argument('--questions', help='问题集文件，每行一个问题；默认使用内置问题。')
+    parser.add_argument('--mode', choices=['composite', 'stepwise', 'pruned', 'both', 'all'], default='both', help='回放的流程；both 为 stepwise + composite，all 再加上 pruned。')
+    parser.add_argument('--recursion-limit', type=int, default=50, help='单个问题的图步数上限。')
+    parser.add_argument('--output', help='将结果以 JSON 写入该文件。')
+    args = parser.parse_args()
+
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, "r", encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    modes = {'both': ['stepwise', 'composite'], 'all': ['stepwise', 'composite', 'pruned']}.get(args.mode, [args.mode])
+    reports = {mode: replay(mode, questions, args.recursion_limit) for mode in modes}
+
+    print("\n回放结果：")
+    for mode, report in reports.items():
+        print(f"[{mode}]")
+        for key, value in report.items():
+            print(f"  {key:<20} {value:.2f}" if isinstance(value, float) else f"  {key:<20} {value}")
+    if 'stepwise' in reports and reports['stepwise']['median_turns']:
+        before = reports['stepwise']['median_turns']
+        for mode in ('composite', 'pruned'):
+            if mode in reports:
+                after = reports[mode]['median_turns']
+                print(f"\n[{mode}] 中位 LLM 轮次 {before} -> {after}（{(before - after) / before:.0%} 减少）")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+token 计数服务基准。
+
+生成一批模拟对话消息（含大量重复的系统提示与记忆注入），分别统计：
+冷启动（首次加载 tokenizer）、批量计数、以及重复计数命中缓存时的耗时。
+
+用法：
+    python -m benchmarks.token_count --messages 10000
+"""
+import argparse
+import random
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from common.token_counter import TokenCounter
+
+QUESTIONS = [
+    "data_test表中有多少订单是超期的？",
+    "各个超期类别分别有多少订单？",
+    "申请奖学金需要满足什么条件？",
+    "帮我统计各部门的订单完成率",
+]
+
+
+def build_messages(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    messages = []
+    for idx in range(n):
+        kind = idx % 4
+        if kind == 0:
+            messages.append(HumanMessage(content=f"{rng.choice(QUESTIONS)}（第 {idx // 4} 轮）"))
+        elif kind == 1:
+            messages.append(SystemMessage(content="相关长期记忆（命名空间：supervisor_memories/u1）：\n- 以后报表默认按周汇总"))
+        elif kind == 2:
+            rows = "\n".join(f"{i},order_{rng.randint(0, 99999)},{rng.random():.4f}" for i in range(20))
+            messages.append(ToolMessage(content=rows, tool_call_id=f"call_{idx}"))
+        else:
+            messages.append(AIMessage(content=f"共有 {rng.randint(0, 500)} 条订单超期，主要集中在华东区。"))
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="token 计数服务基准。")
+    parser.add_argument('--messages', type=int, default=10000, help='消息数量。')
+    parser.add_argument('--model', default=None, help='模型名，决定使用的 tokenizer，默认读取 OPENAI_LLM_MODEL。')
+    args = parser.parse_args()
+
+    messages = build_messages(args.messages)
+    counter = TokenCounter(args.model)
+
+    start = time.perf_counter()
+    _ = counter.tokenizer
+    load_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    total = counter.count_messages(messages)
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    counter.count_messages(messages)
+    warm_ms = (time.perf_counter() - start) * 1000
+
+    print(f"tokenizer           {counter.stats()['tokenizer']}（加载 {load_ms:.1f} ms）")
+    print(f"messages            {len(messages)}，共 {total} tokens")
+    print(f"首次批量计数        {cold_ms:.1f} ms")
+    print(f"重复计数（缓存）    {warm_ms:.1f} ms")
+    print(f"缓存命中率          {counter.stats()['hit_rate']:.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+读取 common.tracing 写出的 span 文件，打印耗时分解与单个请求的火焰图式调用树。
+
+用法：
+    python -m benchmarks.trace_report                       # 最近一个请求的调用树 + 全部请求的耗时分解
+    python -m benchmarks.trace_report --last 20 breakdown   # 最近 20 个请求的耗时分解
+    python -m benchmarks.trace_report --trace <trace_id> tree
+"""
+import argparse
+import json
+import os
+import statistics
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+from common.tracing import DEFAULT_TRACE_PATH
+
+BAR_WIDTH = 40
+
+
+def load_spans(path: Path) -> List[dict]:
+    """按时间顺序读取当前文件及其轮转备份（spans.jsonl.N 越大越旧）"""
+    files = sorted(
+        path.parent.glob(path.name + ".*"),
+        key=lambda p: int(p.suffix[1:]) if p.suffix[1:].isdigit() else 0,
+        reverse=True,
+    )
+    if path.exists():
+        files.append(path)
+    spans: List[dict] = []
+    for file in files:
+        with open(file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        spans.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue  # 轮转时被截断的行
+    return spans
+
+
+def group_traces(spans: List[dict]) -> Dict[str, List[dict]]:
+    traces: Dict[str, List[dict]] = defaultdict(list)
+    for span in spans:
+        traces[span["trace_id"]].append(span)
+    return traces
+
+
+def print_breakdown(traces: Dict[str, List[dict]]) -> None:
+    """按 (类型, 名称) 汇总：调用次数、总耗时、p50/p95、token 与错误数"""
+    rows: Dict[tuple, dict] = defaultdict(lambda: {"durations": [], "tokens_in": 0, "tokens_out": 0, "errors": 0})
+    for spans in traces.values():
+        for span in spans:
+            if span["kind"] == "graph":
+                continue
+            row = rows[(span["kind"], span["name"])]
+            row["durations"].append(span["duration_ms"])
+            row["tokens_in"] += span.get("tokens_in") or 0
+            row["tokens_out"] += span.get("tokens_out") or 0
+            row["errors"] += 1 if span.get("error") else 0
+
+    roots = [s["duration_ms"] for spans in traces.values() for s in spans if s["parent_id"] is None]
+    print(f"\n耗时分解（{len(traces)} 个请求，请求耗时 p50 {_pct(roots, 50):.0f} ms / p95 {_pct(roots, 95):.0f} ms）")
+    print(f"{'类型':<6}{'名称':<32}{'次数':>6}{'总耗时ms':>12}{'p50':>10}{'p95':>10}{'tok_in':>10}{'tok_out':>9}{'错误':>6}")
+    for (kind, name), row in sorted(rows.items(), key=lambda kv: -sum(kv[1]["durations"])):
+        durations = row["durations"]
+        print(
+            f"{kind:<6}{name[:31]:<32}{len(durations):>6}{sum(durations):>12.1f}"
+            f"{_pct(durations, 50):>10.1f}{_pct(durations, 95):>10.1f}"
+            f"{row['tokens_in']:>10}{row['tokens_out']:>9}{row['errors']:>6}"
+        )
+
+
+def print_tree(trace_id: str, spans: List[dict]) -> None:
+    """按父子关系缩进打印，条形长度与相对请求起点的时间区间成比例"""
+    children: Dict[str, List[dict]] = defaultdict(list)
+    by_id = {span["span_id"]: span for span in spans}
+    roots = []
+    for span in spans:
+        parent = span.get("parent_id")
+        if parent and parent in by_id:
+            children[parent].append(span)
+        else:
+            roots.append(span)
+    t0 = min(span["start"] for span in spans)
+    total_ms = max((span["start"] - t0) * 1000 + span["duration_ms"] for span in spans) or 1.0
+
+    print(f"\n请求 {trace_id}（{total_ms:.0f} ms）")
+
+    def walk(span: dict, depth: int) -> None:
+        offset = int((span["start"] - t0) * 1000 / total_ms * BAR_WIDTH)
+        width = max(1, int(span["duration_ms"] / total_ms * BAR_WIDTH))
+        bar = " " * offset + "█" * min(width, BAR_WIDTH - offset)
+        label = f"{'  ' * depth}{span['kind']}:{span['name']}"
+        extra = []
+        if span.get("tokens_in") or span.get("tokens_out"):
+            extra.append(f"tok {span.get('tokens_in', 0)}/{span.get('tokens_out', 0)}")
+        extra.append(f"{(span.get('bytes_in') or 0) + (span.get('bytes_out') or 0)} B")
+        if span.get("error"):
+            extra.append(f"ERROR {span['error'][:60]}")
+        print(f"{label[:48]:<48} |{bar:<{BAR_WIDTH}}| {span['duration_ms']:>9.1f} ms  {'  '.join(extra)}")
+        for child in sorted(children.get(span["span_id"], []), key=lambda s: s["start"]):
+            walk(child, depth + 1)
+
+    for root in sorted(roots, key=lambda s: s["start"]):
+        walk(root, 0)
+
+
+def _pct(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查看本地链路追踪结果。")
+    parser.add_argument('view', nargs='?', choices=['tree', 'breakdown', 'all'], default='all', help='输出内容。')
+    parser.add_argument('--path', default=os.getenv("AGENT_TRACE_PATH", DEFAULT_TRACE_PATH), help='span 文件路径。')
+    parser.add_argument('--trace', help='指定请求的 trace_id，默认最近一个请求。')
+    parser.add_argument('--last', type=int, default=0, help='只统计最近 N 个请求，0 表示全部。')
+    args = parser.parse_args()
+
+    traces = group_traces(load_spans(Path(args.path)))
+    if not traces:
+        print(f"未找到 span，请确认已设置 AGENT_TRACING=true 且文件 {args.path} 存在。")
+        return
+
+    # 以根 span 的开始时间排序请求
+    ordered = sorted(traces, key=lambda tid: min(s["start"] for s in traces[tid]))
+    if args.last:
+        ordered = ordered[-args.last:]
+
+    if args.view in ('tree', 'all'):
+        trace_id = args.trace or ordered[-1]
+        if trace_id not in traces:
+            print(f"未找到请求 {trace_id}")
+        else:
+            print_tree(trace_id, traces[trace_id])
+    if args.view in ('breakdown', 'all'):
+        print_breakdown({tid: traces[tid] for tid in ordered})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""
+vector_search 结果处理的正确性检查与微基准。
+
+对比两条检索路径：
+    direct     驱动直接执行 Cypher，各部分作为独立列返回（custom_tools.neo4j_tools.structured_result）
+    langchain  Neo4jVector 把结果序列化成 page_content 字符串，再用正则解析（parse_page_content）
+
+离线部分不需要 Neo4j：用含大量中英文引号、换行、反斜杠的中文文本构造检索结果，
+检查两条路径是否原样保留每一段文本（直连路径分别直接整理结果行、经 GraphVectorRetriever 与假驱动走一遍），
+并比较结果处理本身的 CPU 耗时。
+加 --live 时再对真实库按问题集分别跑两条路径，比较端到端耗时与结果差异；
+加 --mixed N 时在真实库上用 N 个随机数量上限组合的请求，对比参数化模板与把数值拼进查询文本（每种组合各编译一次计划）的 p50 / p99；
+加 --batch N 时对比 N 个子问题逐个 vector_search 与一次 batch_vector_search（一次批量编码、一次 Cypher 往返）的耗时，并核对两者结果一致；
+加 --context 时对比遍历展开上下文与读取实体上物化的上下文（common.entity_context）的耗时与结果；
+加 --replica 时对比 Neo4j 向量索引与进程内向量副本（common.embedding_replica）选出的候选实体：top-k 重合率与选取耗时；
+加 --explain 时在真实库上对所有已注册的 Cypher 模板（含 .batch / .cached 版本）执行 EXPLAIN，任一模板编译失败即以非零状态退出。
+
+用法：
+    python -m benchmarks.vector_search_bench
+    python -m benchmarks.vector_search_bench --iterations 20000 --live
+    python -m benchmarks.vector_search_bench --mixed 500
+    python -m benchmarks.vector_search_bench --batch 8
+    python -m benchmarks.vector_search_bench --context --rounds 20
+    python -m benchmarks.vector_search_bench --replica --rounds 20
+    python -m benchmarks.vector_search_bench --explain
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+from langchain_community.vectorstores.neo4j_vector import dict_to_yaml_str
+
+from common.cypher_templates import warm_templates
+from custom_tools.neo4j_tools import (
+    HYBRID_REPLICA_TEMPLATE,
+    HYBRID_SEARCH_TEMPLATE,
+    VECTOR_REPLICA_TEMPLATE,
+    VECTOR_SEARCH_TEMPLATE,
+    GraphVectorRetriever,
+    _clean_chunk,
+    _vector_search,
+    batch_retrieve,
+    _vector_search_langchain,
+    get_vector_retriever,
+    parse_page_content,
+    structured_result,
+)
+
+QUOTE_HEAVY_TEXTS = [
+    "学生须在'学年综合测评'中排名前10%，方可申请'国家奖学金'。",
+    "他说：\"申请材料请于9月30日前提交\"，逾期不予受理。",
+    "《奖学金评定办法》第三条：'品学兼优'者优先；'家庭经济困难'者另设助学金。",
+    "引用规定原文：'获奖学生须满足：\n1. 无违纪记录；\n2. 成绩排名前 20%。'",
+    "路径示例 C:\\\\data\\\\'奖学金'\\\\名单.xlsx，注意反斜杠与单引号",
+    "「一等奖学金」与“二等奖学金”不可兼得，'三等'可与助学金同时申请",
+    "It's the student's responsibility — 学生本人对'申请信息'的真实性负责。",
+    "'",
+    "'text': '伪造的字段' 出现在正文中时不应被当作新的文本块",
+]
+
+QUESTIONS = [
+    "国家奖学金的申请条件是什么？",
+    "奖学金评定时对违纪记录有什么要求？",
+    "一等奖学金能和助学金同时申请吗？",
+]
+
+
+def build_record(rng: random.Random, chunks: int = 3, items: int = 10) -> Dict[str, Any]:
+    """模拟 STRUCTURED_RETRIEVAL_QUERY 的一行结果"""
+    pick = lambda: rng.choice(QUOTE_HEAVY_TEXTS)
+    return {
+        "chunks": [pick() for _ in range(chunks)],
+        "reports": [pick() for _ in range(3)],
+        "relationships": [pick() for _ in range(items)],
+        "entities": [pick() for _ in range(items)],
+    }
+
+
+def as_page_content(record: Dict[str, Any]) -> str:
+    """同一结果经 VECTOR_RETRIEVAL_QUERY 返回后，Neo4jVector 生成的 page_content"""
+    return dict_to_yaml_str({
+        "Chunks": [{"id": f"chunk-{i}", "text": text} for i, text in enumerate(record["chunks"])],
+        "Reports": record["reports"],
+        "Relationships": record["relationships"],
+        "Entities": record["entities"],
+    })
+
+
+def expected_result(record: Dict[str, Any]) -> Dict[str, List[str]]:
+    """由原始文本直接得到的期望结果：文本块只做 _clean_chunk 的空白整理，其余各段原样保留"""
+    return {
+        key: [_clean_chunk(v) if key == "chunks" else v.strip() for v in values if v.strip()]
+        for key, values in record.items()
+    }
+
+
+class _FakeRecord(dict):
+    def data(self) -> Dict[str, Any]:
+        return dict(self)
+
+
+class _FakeDriver:
+    """按调用顺序返回预先构造的结果行，模拟 driver.execute_query"""
+
+    def __init__(self) -> None:
+        self.rows: List[Dict[str, Any]] = []
+
+    def execute_query(self, query: str, parameters_: Dict[str, Any]):
+        return [_FakeRecord(self.rows.pop(0))], None, None
+
+
+class _FakeEmbedding:
+    def embed_query(self, text: str) -> List[float]:
+        return [0.0]
+
+
+def _driver_retriever() -> GraphVectorRetriever:
+    """不连接 Neo4j 的检索器：结果行经假驱动返回，走与真实检索相同的 query -> structured_result 流程"""
+    retriever = GraphVectorRetriever.__new__(GraphVectorRetriever)
+    retriever.index_name = "vector"
+    retriever.template = VECTOR_SEARCH_TEMPLATE
+    retriever.replica = None
+    retriever.context_cache = False
+    retriever.context_stats = {"hits": 0, "misses": 0}
+    retriever.embedding = _FakeEmbedding()
+    retriever.driver = _FakeDriver()
+    return retriever
+
+
+def check(records: List[Dict[str, Any]]) -> int:
+    """两条路径的结果与原始文本逐段比对，返回直连路径（直接整理与经驱动检索）出错的结果数"""
+    direct_failures, legacy_failures = 0, 0
+    retriever = _driver_retriever()
+    for idx, record in enumerate(records):
+        expected = expected_result(record)
+        retriever.driver.rows.append(record)
+        for path, result in (("direct", structured_result(record)), ("driver", retriever.search(QUESTIONS[0], 10))):
+            diffs = [key for key in expected if result[key] != expected[key]]
+            if diffs:
+                direct_failures += 1
+                if direct_failures <= 3:
+                    key = diffs[0]
+                    print(f"  #{idx} {path} {key} 不一致：\n    期望 {expected[key]}\n    实际 {result[key]}")
+        legacy = parse_page_content(as_page_content(record))
+        diffs = [key for key in expected if legacy[key] != expected[key]]
+        if diffs:
+            legacy_failures += 1
+            if legacy_failures <= 3:
+                key = diffs[0]
+                print(f"  #{idx} {key} 不一致：\n    期望 {expected[key]}\n    旧流程 {legacy[key]}")
+    print(f"direct     出错 {direct_failures}/{len(records) * 2}（直接整理与经驱动检索各 {len(records)} 条）")
+    print(f"langchain  出错 {legacy_failures}/{len(records)}")
+    return direct_failures
+
+
+def microbench(records: List[Dict[str, Any]], iterations: int) -> None:
+    """只比较结果处理：旧流程包含序列化成字符串与正则解析，新流程直接整理列表"""
+    pages = [as_page_content(r) for r in records]
+    n = len(records)
+
+    started = time.perf_counter()
+    for i in range(iterations):
+        structured_result(records[i % n])
+    direct_us = (time.perf_counter() - started) / iterations * 1e6
+
+    started = time.perf_counter()
+    for i in range(iterations):
+        parse_page_content(as_page_content(records[i % n]))
+    legacy_us = (time.perf_counter() - started) / iterations * 1e6
+
+    started = time.perf_counter()
+    for i in range(iterations):
+        parse_page_content(pages[i % n])
+    parse_us = (time.perf_counter() - started) / iterations * 1e6
+
+    print(f"direct     {direct_us:8.1f} us/次")
+    print(f"langchain  {legacy_us:8.1f} us/次（其中正则解析 {parse_us:.1f} us）")
+
+
+def live(rounds: int) -> None:
+    defaults = ("vector", 10, 3, 3, 10, 10)
+    for name, search in (("direct", _vector_search), ("langchain", _vector_search_langchain)):
+        search(QUESTIONS[0], *defaults)  # 预热连接与模型
+        latencies = []
+        for _ in range(rounds):
+            for question in QUESTIONS:
+                started = time.perf_counter()
+                search(question, *defaults)
+                latencies.append((time.perf_counter() - started) * 1000)
+        print(f"{name:<10} 中位 {statistics.median(latencies):.1f} ms，均值 {statistics.mean(latencies):.1f} ms")
+
+    for question in QUESTIONS:
+        direct = _vector_search(question, *defaults)
+        legacy = _vector_search_langchain(question, *defaults)
+        lost = {key: len(direct[key]) - len(legacy[key]) for key in direct if direct[key] != legacy[key]}
+        if lost:
+            print(f"  {question} 两条路径结果不同（direct 比 langchain 多出的条数）：{lost}")
+
+
+def mixed(requests: int, seed: int = 0) -> None:
+    """混合参数负载：同样的请求序列分别以参数化模板和拼接数值的查询文本执行"""
+    retriever = get_vector_retriever("vector", VECTOR_SEARCH_TEMPLATE)
+    vectors = [retriever.embedding.embed_query(q) for q in QUESTIONS]
+    rng = random.Random(seed)
+    workload = [
+        (rng.randrange(len(QUESTIONS)), {
+            "k": rng.randint(5, 20), "topChunks": rng.randint(1, 6), "topCommunities": rng.randint(1, 6),
+            "topOutsideRels": rng.randint(5, 20), "topInsideRels": rng.randint(5, 20),
+        })
+        for _ in range(requests)
+    ]
+
+    def inline(limits):
+        query = retriever.retrieval_query
+        # 长参数名先替换，避免 $k 误伤其他参数名的前缀
+        for key in sorted(limits, key=len, reverse=True):
+            query = query.replace(f"${key}", str(limits[key]))
+        return query
+
+    for name, build in (("parameterized", lambda limits: (retriever.retrieval_query, limits)),
+                        ("inlined", lambda limits: (inline(limits), {}))):
+        latencies = []
+        for qi, limits in workload:
+            query, params = build(limits)
+            started = time.perf_counter()
+            retriever.driver.execute_query(
+                query, parameters_={"index": retriever.index_name, "embedding": vectors[qi], **params},
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+        cuts = statistics.quantiles(latencies, n=100)
+        print(f"{name:<14} p50 {cuts[49]:.1f} ms，p99 {cuts[98]:.1f} ms")
+
+
+def batch(size: int, rounds: int) -> None:
+    """N 个子问题：逐个检索（N 次编码 + N 次往返）对比批量检索（1 次批量编码 + 1 次往返）"""
+    defaults = ("vector", 10, 3, 3, 10, 10)
+    questions = [QUESTIONS[i % len(QUESTIONS)] + ("" if i < len(QUESTIONS) else f"（{i}）") for i in range(size)]
+    _vector_search(questions[0], *defaults)  # 预热连接与模型
+    runs = {
+        "sequential": lambda: [_vector_search(q, *defaults) for q in questions],
+        "batch": lambda: batch_retrieve(questions, *defaults),
+    }
+    results = {}
+    for name, run in runs.items():
+        latencies = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            results[name] = run()
+            latencies.append((time.perf_counter() - started) * 1000)
+        print(f"{name:<10} {size} 个问题 中位 {statistics.median(latencies):.1f} ms")
+    mismatched = [q for q, a, b in zip(questions, results["sequential"], results["batch"]) if a != b]
+    if mismatched:
+        print(f"  {len(mismatched)} 个问题逐个与批量结果不同，如：{mismatched[0]}")
+
+
+def context(rounds: int) -> None:
+    """同一组问题分别走遍历查询与物化上下文，比较中位耗时与结果差异"""
+    limits = {"topChunks": 3, "topCommunities": 3, "topOutsideRels": 10, "topInsideRels": 10}
+    retrievers = {
+        "traversal": GraphVectorRetriever("vector", VECTOR_SEARCH_TEMPLATE, context_cache=False),
+        "cached": GraphVectorRetriever("vector", VECTOR_SEARCH_TEMPLATE, context_cache=True),
+    }
+    results = {}
+    for name, retriever in retrievers.items():
+        retriever.search(QUESTIONS[0], 10, **limits)  # 预热连接与模型
+        latencies = []
+        for _ in range(rounds):
+            for question in QUESTIONS:
+                started = time.perf_counter()
+                results[(name, question)] = retriever.search(question, 10, **limits)
+                latencies.append((time.perf_counter() - started) * 1000)
+        print(f"{name:<10} 中位 {statistics.median(latencies):.1f} ms")
+    print(f"  物化上下文命中 {retrievers['cached'].context_stats}")
+    for question in QUESTIONS:
+        traversal, cached = results[("traversal", question)], results[("cached", question)]
+        # 同权重关系的先后顺序不固定，按集合比较
+        diffs = [key for key in traversal if sorted(traversal[key]) != sorted(cached[key])]
+        if diffs:
+            print(f"  {question} 结果不同：{diffs}")
+
+
+def replica(rounds: int, k: int = 10) -> None:
+    """同一问题向量分别由 Neo4j 向量索引与本地副本选出前 k 个实体，比较重合率与耗时（不含上下文扩展）"""
+    from common.embedding_replica import EmbeddingReplica
+    local = EmbeddingReplica(check_interval=0)
+    if not local.load():
+        print("  没有可用的向量快照，先运行 python -m database.neo4j_setup.graph.indexing.embedding_snapshot")
+        return
+    retriever = get_vector_retriever("vector", VECTOR_SEARCH_TEMPLATE)
+    vectors = [retriever.embedding.embed_query(q) for q in QUESTIONS]
+    query = "CALL db.index.vector.queryNodes($index, $k, $embedding) YIELD node, score RETURN node.id AS id"
+
+    neo4j_ms, local_ms, overlaps = [], [], []
+    for _ in range(rounds):
+        for vector in vectors:
+            started = time.perf_counter()
+            records, _, _ = retriever.driver.execute_query(
+                query, parameters_={"index": "vector", "k": k, "embedding": vector},
+            )
+            neo4j_ms.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            hits = local.search("__Entity__", vector, k) or []
+            local_ms.append((time.perf_counter() - started) * 1000)
+            expected = {record["id"] for record in records}
+            overlaps.append(len(expected & {node_id for node_id, _ in hits}) / max(1, len(expected)))
+    print(f"neo4j      中位 {statistics.median(neo4j_ms):.2f} ms")
+    print(f"replica    中位 {statistics.median(local_ms):.2f} ms（快照 {local.snapshot}）")
+    print(f"top-{k} 重合率 {statistics.mean(overlaps):.3f}")
+
+
+# 每种检索的四个模板：遍历、物化上下文，以及两者的多问题版本（batch_vector_search 与上下文缺失时的批量回退）
+RETRIEVAL_VARIANTS = ("", ".cached", ".batch", ".cached.batch")
+
+
+def explain() -> int:
+    """对所有已注册的 Cypher 模板执行 EXPLAIN，返回编译失败或缺失的模板数"""
+    import agents.search.mapReduce  # noqa: F401  注册 map_reduce.* 模板
+    results = warm_templates(force=True)
+    for template in (VECTOR_SEARCH_TEMPLATE, HYBRID_SEARCH_TEMPLATE, VECTOR_REPLICA_TEMPLATE, HYBRID_REPLICA_TEMPLATE):
+        for suffix in RETRIEVAL_VARIANTS:
+            results.setdefault(template + suffix, "未注册")
+    for name, error in sorted(results.items()):
+        print(f"{'ok  ' if error is None else 'FAIL'} {name}" + (f": {error}" if error else ""))
+    return sum(error is not None for error in results.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="vector_search 结果处理的正确性检查与微基准。")
+    parser.add_argument('--records', type=int, default=200, help='构造的检索结果数。')
+    parser.add_argument('--iterations', type=int, default=5000, help='微基准的处理次数。')
+    parser.add_argument('--live', action='store_true', help='同时对真实 Neo4j 库比较两条检索路径。')
+    parser.add_argument('--rounds', type=int, default=5, help='--live 时每个问题的重复次数。')
+    parser.add_argument('--mixed', type=int, default=0, help='在真实库上执行的混合参数请求数，0 表示不执行。')
+    parser.add_argument('--batch', type=int, default=0, help='在真实库上对比逐个与批量检索的子问题数，0 表示不执行。')
+    parser.add_argument('--context', action='store_true', help='在真实库上对比遍历查询与物化的实体上下文。')
+    parser.add_argument('--replica', action='store_true', help='对比 Neo4j 向量索引与进程内向量副本的候选实体。')
+    parser.add_argument('--explain', action='store_true', help='在真实库上 EXPLAIN 所有已注册的 Cypher 模板，失败时以非零状态退出。')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    records = [build_record(rng) for _ in range(args.records)]
+    print("正确性检查：")
+    failures = check(records)
+    if args.explain:
+        print("\nCypher 模板编译检查：")
+        failures += explain()
+    print("\n结果处理耗时：")
+    microbench(records, args.iterations)
+    if args.live:
+        print("\n真实库端到端：")
+        live(args.rounds)
+    if args.mixed:
+        print("\n混合参数负载（只计 Cypher 往返）：")
+        mixed(args.mixed)
+    if args.batch:
+        print("\n逐个检索 vs 批量检索：")
+        batch(args.batch, args.rounds)
+    if args.context:
+        print("\n遍历查询 vs 物化上下文：")
+        context(args.rounds)
+    if args.replica:
+        print("\nNeo4j 向量索引 vs 进程内向量副本：")
+        replica(args.rounds)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
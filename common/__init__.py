@@ -3,6 +3,8 @@ from .mysqldb import get_db_manager as get_mysql_db_manager
 from .get_models import get_embeddings_model, get_llm_model
 from .prompt import *
 from .memory_state import *
+# 导入即注册追踪回调，设置 AGENT_TRACING=true 后所有图运行自动记录 span
+from . import tracing
 
 __all__ = [
     "get_neo4j_db_manager",
@@ -0,0 +1,638 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_CHECKPOINT_PATH = "./cache/checkpoints.sqlite"
+
+# 通道值的存储方式
+_KIND_EMPTY = "empty"
+_KIND_BLOB = "blob"   # 整个值序列化为一个 blob
+_KIND_LIST = "list"   # 列表按元素拆分，每个元素一个 blob，元素哈希按块组织成清单
+
+# 列表清单按固定大小分块，每块本身也是按内容寻址的 blob：
+# 追加元素时前面的满块哈希不变，每个版本只新增最后一块，避免清单大小随对话长度平方增长
+_CHUNK_SIZE = 64
+_CHUNK_TYPE = "__chunk__"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    versions TEXT,
+    created_at REAL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS channel_values (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    ref TEXT,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    type TEXT,
+    data BLOB
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    data BLOB,
+    task_path TEXT,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+def _hash(type_: str, data: bytes) -> str:
+    digest = hashlib.sha256(type_.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class SQLiteDeltaSaver(BaseCheckpointSaver):
+    """
+    本地 SQLite checkpointer，只保存每一步的状态增量。
+
+    - 每个检查点只写入本步发生变化的通道（new_versions），未变化的通道沿用之前版本；
+    - 列表类通道（如 messages）按元素拆分存储，追加一条消息只新增一个元素 blob；
+    - 所有 blob 以内容哈希去重并 zlib 压缩，CSV 元数据、工具输出等大对象在多个检查点间只存一份；
+    - 后台线程定期为每个会话只保留最近 keep_last 个检查点，并清理不再被引用的 blob；
+      清理使用独立连接，逐个会话、逐批删除，只在每批删除时短暂持有写入锁，不阻塞正在进行的对话。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        keep_last: Optional[int] = None,
+        prune_interval: Optional[float] = None,
+        compress_level: int = 1,
+        blob_cache_size: int = 4096,
+        serde: Any = None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.path = Path(path or os.getenv("AGENT_CHECKPOINT_PATH", DEFAULT_CHECKPOINT_PATH))
+        self.keep_last = int(keep_last if keep_last is not None else os.getenv("AGENT_CHECKPOINT_KEEP", "20"))
+        self.prune_interval = float(
+            prune_interval if prune_interval is not None else os.getenv("AGENT_CHECKPOINT_PRUNE_INTERVAL", "300")
+        )
+        self.compress_level = compress_level
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # 已确认写入的 blob 哈希，避免重复压缩与写入；解码后的 blob 缓存，加快恢复
+        self._known_blobs: "OrderedDict[str, None]" = OrderedDict()
+        self._blob_cache: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._blob_cache_size = blob_cache_size
+        self._item_hashes: "OrderedDict[int, Tuple[Any, str]]" = OrderedDict()
+        self._pruner: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # 清理专用连接；清理期间写入引用过的 blob 哈希，扫描之后被重新引用的 blob 不会被删除
+        self._prune_lock = threading.Lock()
+        self._prune_conn: Optional[sqlite3.Connection] = None
+        self._touched: Optional[set] = None
+
+    # ------------------------------
+    # 连接与后台清理
+    # ------------------------------
+    def _open(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = self._open()
+            if self.prune_interval > 0:
+                self._pruner = threading.Thread(target=self._prune_loop, name="checkpoint-pruner", daemon=True)
+                self._pruner.start()
+        return self._conn
+
+    def _prune_loop(self) -> None:
+        while not self._stop.wait(self.prune_interval):
+            try:
+                self.prune()
+            except Exception as e:
+                print(f"[Checkpointer] 清理旧检查点失败: {e}")
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._prune_lock:
+            if self._prune_conn is not None:
+                self._prune_conn.close()
+                self._prune_conn = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ------------------------------
+    # blob 编解码
+    # ------------------------------
+    def _put_blob(self, conn: sqlite3.Connection, type_: str, data: bytes) -> str:
+        key = _hash(type_, data)
+        if self._touched is not None:
+            self._touched.add(key)
+        if key in self._known_blobs:
+            self._known_blobs.move_to_end(key)
+            return key
+        conn.execute(
+            "INSERT OR IGNORE INTO blobs (hash, type, data) VALUES (?, ?, ?)",
+            (key, type_, zlib.compress(data, self.compress_level)),
+        )
+        self._known_blobs[key] = None
+        while len(self._known_blobs) > self._blob_cache_size * 4:
+            self._known_blobs.popitem(last=False)
+        return key
+
+    def _load_blobs(self, conn: sqlite3.Connection, hashes: Sequence[str]) -> Dict[str, Tuple[str, bytes]]:
+        found: Dict[str, Tuple[str, bytes]] = {}
+        missing = []
+        for key in hashes:
+            cached = self._blob_cache.get(key)
+            if cached is not None:
+                self._blob_cache.move_to_end(key)
+                found[key] = cached
+            else:
+                missing.append(key)
+        # SQLite 单条语句的参数个数有限，分批查询
+        for offset in range(0, len(missing), 500):
+            batch = missing[offset:offset + 500]
+            placeholders = ",".join("?" * len(batch))
+            for key, type_, data in conn.execute(
+                f"SELECT hash, type, data FROM blobs WHERE hash IN ({placeholders})", batch
+            ):
+                found[key] = (type_, zlib.decompress(data))
+                self._blob_cache[key] = found[key]
+        while len(self._blob_cache) > self._blob_cache_size:
+            self._blob_cache.popitem(last=False)
+        return found
+
+    def _item_hash(self, conn: sqlite3.Connection, item: Any) -> str:
+        # 状态中的消息对象在各步之间是同一个实例，按对象身份缓存其 blob 哈希，避免每步重复序列化整段历史；
+        # 缓存同时持有对象引用，保证 id() 不会被复用
+        cached = self._item_hashes.get(id(item))
+        if cached is not None and cached[0] is item:
+            self._item_hashes.move_to_end(id(item))
+            if self._touched is not None:
+                self._touched.add(cached[1])
+            return cached[1]
+        key = self._put_blob(conn, *self.serde.dumps_typed(item))
+        self._remember_item(item, key)
+        return key
+
+    def _remember_item(self, item: Any, key: str) -> Any:
+        # 恢复出的元素登记到身份缓存，下一步写入同一列表时无需重新序列化
+        self._item_hashes[id(item)] = (item, key)
+        while len(self._item_hashes) > self._blob_cache_size * 4:
+            self._item_hashes.popitem(last=False)
+        return item
+
+    def _dump_value(self, conn: sqlite3.Connection, value: Any) -> Tuple[str, str]:
+        if isinstance(value, list) and len(value) > 1:
+            hashes = [self._item_hash(conn, item) for item in value]
+            chunks = [
+                self._put_blob(conn, _CHUNK_TYPE, json.dumps(hashes[i:i + _CHUNK_SIZE]).encode("utf-8"))
+                for i in range(0, len(hashes), _CHUNK_SIZE)
+            ]
+            return _KIND_LIST, json.dumps(chunks)
+        return _KIND_BLOB, self._put_blob(conn, *self.serde.dumps_typed(value))
+
+    def _load_channel_values(
+        self, conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str, versions: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        if not versions:
+            return {}
+        refs: Dict[str, Tuple[str, str]] = {}
+        for channel, version in versions.items():
+            row = conn.execute(
+                "SELECT kind, ref FROM channel_values "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row and row[0] != _KIND_EMPTY:
+                refs[channel] = row
+
+        # 先展开列表清单，再一次性取回所有元素 blob
+        chunk_refs = [h for kind, ref in refs.values() if kind == _KIND_LIST for h in json.loads(ref)]
+        chunks = self._load_blobs(conn, chunk_refs)
+        items: Dict[str, List[str]] = {}
+        needed: List[str] = []
+        for channel, (kind, ref) in refs.items():
+            if kind == _KIND_LIST:
+                items[channel] = [h for chunk in json.loads(ref) for h in json.loads(chunks[chunk][1])]
+                needed.extend(items[channel])
+            else:
+                needed.append(ref)
+        blobs = self._load_blobs(conn, needed)
+
+        values: Dict[str, Any] = {}
+        for channel, (kind, ref) in refs.items():
+            if kind == _KIND_LIST:
+                values[channel] = [self._remember_item(self.serde.loads_typed(blobs[h]), h) for h in items[channel]]
+            else:
+                values[channel] = self.serde.loads_typed(blobs[ref])
+        return values
+
+    def _pack(self, value: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        return type_, zlib.compress(data, self.compress_level)
+
+    def _unpack(self, type_: str, data: bytes) -> Any:
+        return self.serde.loads_typed((type_, zlib.decompress(data)))
+
+    # ------------------------------
+    # BaseCheckpointSaver 接口
+    # ------------------------------
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_copy = checkpoint.copy()
+        values: Dict[str, Any] = checkpoint_copy.pop("channel_values")  # type: ignore[misc]
+        type_, packed = self._pack(checkpoint_copy)
+        meta_type, meta_packed = self._pack(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            conn = self._connect()
+            for channel, version in new_versions.items():
+                if channel in values:
+                    kind, ref = self._dump_value(conn, values[channel])
+                else:
+                    kind, ref = _KIND_EMPTY, None
+                conn.execute(
+                    "INSERT OR REPLACE INTO channel_values "
+                    "(thread_id, checkpoint_ns, channel, version, kind, ref) VALUES (?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, channel, str(version), kind, ref),
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                "metadata_type, metadata, versions, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    configurable.get("checkpoint_id"),
+                    type_,
+                    packed,
+                    meta_type,
+                    meta_packed,
+                    json.dumps({k: str(v) for k, v in checkpoint["channel_versions"].items()}),
+                    time.time(),
+                ),
+            )
+            conn.commit()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_id = configurable["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, packed = self._pack(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel, type_, packed, task_path))
+        # 特殊通道（错误、中断等）允许覆盖，普通写入已存在时保持不变
+        replace = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                f"{verb} INTO writes "
+                "(thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, data, task_path) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+
+    def _row_to_tuple(self, conn: sqlite3.Connection, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, packed, meta_type, metadata = row
+        checkpoint = self._unpack(type_, packed)
+        writes = conn.execute(
+            "SELECT task_id, channel, type, data FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_channel_values(
+                    conn, thread_id, checkpoint_ns, checkpoint["channel_versions"]
+                ),
+            },
+            metadata=self._unpack(meta_type, metadata),
+            pending_writes=[(task_id, channel, self._unpack(t, d)) for task_id, channel, t, d in writes],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+        )
+
+    _SELECT = (
+        "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+        "FROM checkpoints"
+    )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        with self._lock:
+            conn = self._connect()
+            if checkpoint_id:
+                row = conn.execute(
+                    f"{self._SELECT} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    f"{self._SELECT} WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._row_to_tuple(conn, row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        clauses, params = [], []
+        if config:
+            configurable = config["configurable"]
+            clauses.append("thread_id = ?")
+            params.append(configurable["thread_id"])
+            if "checkpoint_ns" in configurable:
+                clauses.append("checkpoint_ns = ?")
+                params.append(configurable["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(f"{self._SELECT}{where} ORDER BY checkpoint_id DESC", params).fetchall()
+            count = 0
+            results = []
+            for row in rows:
+                item = self._row_to_tuple(conn, row)
+                if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                results.append(item)
+                count += 1
+                if limit is not None and count >= limit:
+                    break
+        yield from results
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            for table in ("checkpoints", "channel_values", "writes"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            conn.commit()
+
+    # 同步的 SQLite 读写放到线程中执行，避免清理或磁盘抖动时阻塞事件循环
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[int], channel: Any = None) -> int:
+        if current is None:
+            return 1
+        return int(current) + 1
+
+    # ------------------------------
+    # 清理
+    # ------------------------------
+    def prune(self, keep_last: Optional[int] = None) -> Dict[str, int]:
+        """每个 (会话, 命名空间) 只保留最近 keep_last 个检查点，并清理不再被引用的通道值与 blob"""
+        keep_last = keep_last if keep_last is not None else self.keep_last
+        stats = {"checkpoints": 0, "channel_values": 0, "blobs": 0}
+        with self._prune_lock:
+            if self._prune_conn is None:
+                self._prune_conn = self._open()
+            conn = self._prune_conn
+            groups = conn.execute(
+                "SELECT thread_id, checkpoint_ns FROM checkpoints GROUP BY thread_id, checkpoint_ns HAVING COUNT(*) > ?",
+                (keep_last,),
+            ).fetchall()
+            for thread_id, checkpoint_ns in groups:
+                # 每个会话一个写事务：期间其他写入在 SQLite 层短暂等待，读取不受影响；
+                # 引用的版本与通道值在同一事务中读取，不会误删并发写入的新版本
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    deleted, orphan = self._prune_thread(conn, thread_id, checkpoint_ns, keep_last)
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+                stats["checkpoints"] += deleted
+                stats["channel_values"] += orphan
+
+            if stats["channel_values"]:
+                stats["blobs"] = self._sweep_blobs(conn)
+        return stats
+
+    @staticmethod
+    def _prune_thread(conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str, keep_last: int) -> Tuple[int, int]:
+        ids = [
+            row[0] for row in conn.execute(
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC",
+                (thread_id, checkpoint_ns),
+            )
+        ]
+        stale = ids[keep_last:]
+        for offset in range(0, len(stale), 500):
+            batch = stale[offset:offset + 500]
+            placeholders = ",".join("?" * len(batch))
+            for table in ("checkpoints", "writes"):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? "
+                    f"AND checkpoint_id IN ({placeholders})",
+                    (thread_id, checkpoint_ns, *batch),
+                )
+
+        referenced = set()
+        for (versions,) in conn.execute(
+            "SELECT versions FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?",
+            (thread_id, checkpoint_ns),
+        ):
+            referenced.update(json.loads(versions).items())
+        rows = conn.execute(
+            "SELECT channel, version FROM channel_values WHERE thread_id = ? AND checkpoint_ns = ?",
+            (thread_id, checkpoint_ns),
+        ).fetchall()
+        orphan = [row for row in rows if tuple(row) not in referenced]
+        conn.executemany(
+            "DELETE FROM channel_values WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+            [(thread_id, checkpoint_ns, channel, version) for channel, version in orphan],
+        )
+        return len(stale), len(orphan)
+
+    def _sweep_blobs(self, conn: sqlite3.Connection) -> int:
+        # 从此刻起写入引用的 blob 都记入 _touched；扫描在之后开始的读快照上进行，
+        # 因此快照之外的新引用全部在 _touched 中，删除前剔除即可
+        with self._lock:
+            self._touched = set()
+        try:
+            conn.execute("BEGIN")
+            try:
+                referenced = set()
+                chunk_refs = []
+                for kind, ref in conn.execute("SELECT kind, ref FROM channel_values WHERE ref IS NOT NULL"):
+                    if kind == _KIND_LIST:
+                        chunk_refs.extend(json.loads(ref))
+                    else:
+                        referenced.add(ref)
+                referenced.update(chunk_refs)
+                for offset in range(0, len(chunk_refs), 500):
+                    batch = list(set(chunk_refs[offset:offset + 500]))
+                    placeholders = ",".join("?" * len(batch))
+                    for (data,) in conn.execute(f"SELECT data FROM blobs WHERE hash IN ({placeholders})", batch):
+                        referenced.update(json.loads(zlib.decompress(data)))
+                orphan = [h for (h,) in conn.execute("SELECT hash FROM blobs") if h not in referenced]
+            finally:
+                conn.commit()
+
+            removed = 0
+            for offset in range(0, len(orphan), 500):
+                # 每批在写入锁内删除并同步内存缓存，写入方只在批与批之间等待
+                with self._lock:
+                    batch = [h for h in orphan[offset:offset + 500] if h not in self._touched]
+                    if not batch:
+                        continue
+                    conn.executemany("DELETE FROM blobs WHERE hash = ?", [(h,) for h in batch])
+                    conn.commit()
+                    for key in batch:
+                        self._known_blobs.pop(key, None)
+                        self._blob_cache.pop(key, None)
+                    # 被清理的 blob 可能仍在身份缓存中，直接清空，之后按需重新写入
+                    self._item_hashes.clear()
+                    removed += len(batch)
+        finally:
+            with self._lock:
+                self._touched = None
+        return removed
+
+def get_checkpointer(path: Optional[str] = None) -> SQLiteDeltaSaver:
+    """获取进程内共享的 checkpointer，同一数据库文件只打开一次"""
+    from common.get_models import _registry_key, model_registry
+    path = path or os.getenv("AGENT_CHECKPOINT_PATH", DEFAULT_CHECKPOINT_PATH)
+    return model_registry.get_or_create(
+        _registry_key("checkpointer", str(Path(path).resolve())),
+        lambda: SQLiteDeltaSaver(path=path),
+    )
@@ -0,0 +1,89 @@
+import asyncio
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+
+class LLMConcurrencyLimiter(AsyncCallbackHandler):
+    """
+    限制同一事件循环内同时在途的 LLM 调用数量。
+
+    作为回调挂在图运行的 config 上，会随 config 传递到所有子图与子智能体：
+    LangChain 在发起请求前 await on_chat_model_start，在此处获取许可即可形成背压；
+    请求结束或出错时释放许可。
+
+    调用所在的任务被取消时（并行分支中另一分支失败、客户端断开），agenerate 不会触发 on_llm_end / on_llm_error，
+    因此许可同时绑定到获取它的 asyncio 任务上，任务结束时仍未释放的许可一并释放，避免许可泄漏后所有会话卡死。
+    """
+
+    # 在调用方任务内直接 await 回调，而不是放进 asyncio.gather 新建的任务中，
+    # 这样 asyncio.current_task() 才是发起 LLM 调用的任务
+    run_inline = True
+
+    def __init__(self, max_in_flight: int = 8) -> None:
+        self.max_in_flight = max_in_flight
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # run_id -> (获取许可的任务, 任务结束时的释放回调)
+        self._holders: Dict[UUID, Tuple[Optional[asyncio.Task], Optional[Callable[[asyncio.Task], None]]]] = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_calls = 0
+        self.waited_calls = 0
+
+    def _get_semaphore(self) -> Optional[asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._loop = loop
+        # 同步节点里的 LLM 调用会在临时事件循环中触发回调，这类调用不做限流
+        return self._semaphore if loop is self._loop else None
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        await self._acquire(run_id)
+
+    async def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        await self._acquire(run_id)
+
+    async def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._release(run_id)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._release(run_id)
+
+    async def _acquire(self, run_id: UUID) -> None:
+        semaphore = self._get_semaphore()
+        if semaphore is None:
+            return
+        if semaphore.locked():
+            self.waited_calls += 1
+        await semaphore.acquire()
+        task = asyncio.current_task()
+        on_done = None
+        if task is not None:
+            on_done = lambda _task: self._release(run_id)
+            task.add_done_callback(on_done)
+        self._holders[run_id] = (task, on_done)
+        self.total_calls += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _release(self, run_id: UUID) -> None:
+        holder = self._holders.pop(run_id, None)
+        if holder is None:
+            return
+        task, on_done = holder
+        if task is not None and on_done is not None and not task.done():
+            task.remove_done_callback(on_done)
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "total_calls": self.total_calls,
+            "waited_calls": self.waited_calls,
+        }
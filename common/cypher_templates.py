@@ -0,0 +1,86 @@
+"""
+检索用 Cypher 模板注册表。
+
+所有检索查询的数量上限、层级等都以参数传入，查询文本固定，Neo4j 对同一文本只编译一次执行计划并缓存复用；
+把数值直接拼进查询文本会让每种参数组合各编译一次计划，混合参数负载下重规划耗时会反映在尾延迟上。
+
+模板在模块导入时注册，启动时 warm_templates() 对每个模板执行一次 EXPLAIN，
+只做规划不执行查询，提前把执行计划放入 Neo4j 的查询缓存。
+"""
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+@dataclass(frozen=True)
+class CypherTemplate:
+    name: str
+    query: str
+    # EXPLAIN 预热时使用的参数，只需类型正确
+    warm_params: Dict[str, Any] = field(default_factory=dict)
+
+
+_templates: Dict[str, CypherTemplate] = {}
+_lock = threading.Lock()
+
+
+def register_template(name: str, query: str, warm_params: Optional[Dict[str, Any]] = None) -> CypherTemplate:
+    """注册模板；同名重复注册时查询文本必须一致，避免同一名称对应多个执行计划"""
+    template = CypherTemplate(name, query, dict(warm_params or {}))
+    with _lock:
+        existing = _templates.get(name)
+        if existing is not None and existing.query != query:
+            raise ValueError(f"Cypher 模板 {name} 已注册为不同的查询文本")
+        _templates[name] = template
+    return template
+
+
+def get_template(name: str) -> CypherTemplate:
+    try:
+        return _templates[name]
+    except KeyError:
+        raise KeyError(f"未注册的 Cypher 模板: {name}") from None
+
+
+def list_templates() -> List[str]:
+    return sorted(_templates)
+
+
+def run_template(name: str, **params: Any) -> List[Dict[str, Any]]:
+    """以参数执行已注册的模板，返回每行的字典"""
+    from common.neo4jdb import get_db_manager
+    records, _, _ = get_db_manager().driver.execute_query(get_template(name).query, parameters_=params)
+    return [record.data() for record in records]
+
+
+def warm_templates(names: Optional[Sequence[str]] = None, force: bool = False) -> Dict[str, Optional[str]]:
+    """
+    对模板执行 EXPLAIN 预热执行计划缓存，同时检查模板能否通过编译。
+
+    参数:
+        force: 忽略 CYPHER_TEMPLATE_WARMUP，供检查脚本使用
+    返回:
+        模板名 -> None（成功）或错误信息；设置 CYPHER_TEMPLATE_WARMUP=false 且未指定 force 时不做任何事
+    """
+    if not force and os.getenv("CYPHER_TEMPLATE_WARMUP", "true").lower() != "true":
+        return {}
+    from common.neo4jdb import get_db_manager
+    driver = get_db_manager().driver
+    results: Dict[str, Optional[str]] = {}
+    for name in names or list_templates():
+        template = get_template(name)
+        try:
+            driver.execute_query("EXPLAIN " + template.query, parameters_=template.warm_params)
+            results[name] = None
+        except Exception as e:
+            results[name] = str(e)
+            print(f"Cypher 模板 {name} 预热失败: {e}")
+    failed = [name for name, error in results.items() if error is not None]
+    if failed:
+        print(f"{len(failed)}/{len(results)} 个 Cypher 模板预热失败，这些模板在检索时同样会报错: {', '.join(failed)}")
+    return results
@@ -0,0 +1,176 @@
+"""
+图谱 embedding 的进程内只读副本。
+
+建索引后把 __Entity__、__Chunk__ 的 id 与归一化后的 embedding 导出为快照目录（每个标签一个 .npy 与一个 id 列表），
+增量更新只把 last_embedded 晚于上次导出的向量合并进新快照，目录下的 CURRENT 文件指向最新快照。
+检索进程用 numpy.load(mmap_mode="r") 映射快照，top-k 候选在本地用 NumPy 计算，
+Neo4j 只负责按实体 id 做上下文扩展；多个 API worker 共享操作系统的页缓存，向量打分不再占用数据库。
+
+快照不存在、或与问题向量维度不一致时不启用，检索退回 Neo4j 向量索引。
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_REPLICA_DIR = "./cache/embedding_replica"
+LABELS = ("__Entity__", "__Chunk__")
+SNAPSHOT_FORMAT = 1
+# 保留的旧快照数量；仍在映射旧快照的进程在下次检查时切换到新快照
+KEEP_SNAPSHOTS = 2
+
+
+def replica_dir(directory: Optional[str] = None) -> Path:
+    return Path(directory or os.getenv("EMBEDDING_REPLICA_DIR", DEFAULT_REPLICA_DIR))
+
+
+def _stem(label: str) -> str:
+    return label.strip("_").lower()
+
+
+def normalize_rows(vectors: Any):
+    import numpy as np
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def write_snapshot(
+    tables: Dict[str, Tuple[List[str], Any]],
+    exported_at: str,
+    directory: Optional[str] = None,
+) -> Path:
+    """
+    写入新快照并切换 CURRENT。
+
+    参数:
+        tables: 标签 -> (id 列表, 与之一一对应的向量矩阵，已归一化)
+        exported_at: 导出开始时 Neo4j 的 datetime()，下次增量刷新从这一时刻起读取变更
+    """
+    import numpy as np
+    root = replica_dir(directory)
+    root.mkdir(parents=True, exist_ok=True)
+    name = f"snap-{time.strftime('%Y%m%d%H%M%S')}{int(time.time() * 1000) % 1000:03d}-{os.getpid()}"
+    path = root / name
+    path.mkdir()
+
+    manifest = {"format": SNAPSHOT_FORMAT, "exported_at": exported_at, "labels": {}}
+    for label, (ids, vectors) in tables.items():
+        stem = _stem(label)
+        matrix = np.asarray(vectors, dtype=np.float32)
+        np.save(path / f"{stem}.npy", matrix)
+        (path / f"{stem}.ids.json").write_text(json.dumps(list(ids), ensure_ascii=False), encoding="utf-8")
+        manifest["labels"][label] = {"file": stem, "count": len(ids), "dim": int(matrix.shape[1]) if len(ids) else 0}
+    (path / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    pointer = root / "CURRENT.tmp"
+    pointer.write_text(name, encoding="utf-8")
+    os.replace(pointer, root / "CURRENT")
+
+    snapshots = sorted(p for p in root.glob("snap-*") if p.is_dir() and p.name != name)
+    for old in snapshots[:max(0, len(snapshots) - KEEP_SNAPSHOTS + 1)]:
+        shutil.rmtree(old, ignore_errors=True)
+    return path
+
+
+class EmbeddingReplica:
+    """
+    只读映射最新快照并做本地 top-k 检索。
+
+    每次检索前至多每 EMBEDDING_REPLICA_CHECK 秒检查一次 CURRENT，指向新快照时重新映射。
+    """
+
+    def __init__(self, directory: Optional[str] = None, check_interval: Optional[float] = None) -> None:
+        self.root = replica_dir(directory)
+        self.check_interval = float(
+            check_interval if check_interval is not None else os.getenv("EMBEDDING_REPLICA_CHECK", "30")
+        )
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self.snapshot: Optional[str] = None
+        self.manifest: Dict[str, Any] = {}
+        self._tables: Dict[str, Tuple[List[str], Any]] = {}
+
+    def _current(self) -> Optional[str]:
+        try:
+            return (self.root / "CURRENT").read_text(encoding="utf-8").strip() or None
+        except OSError:
+            return None
+
+    def load(self, force: bool = False) -> bool:
+        """映射 CURRENT 指向的快照；返回是否有可用快照"""
+        import numpy as np
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked_at < self.check_interval:
+                return bool(self._tables)
+            self._checked_at = now
+            name = self._current()
+            if name is None or name == self.snapshot:
+                return bool(self._tables)
+            path = self.root / name
+            try:
+                manifest = json.loads((path / "manifest.json").read_text(encoding="utf-8"))
+                tables = {}
+                for label, meta in manifest["labels"].items():
+                    ids = json.loads((path / f"{meta['file']}.ids.json").read_text(encoding="utf-8"))
+                    tables[label] = (ids, np.load(path / f"{meta['file']}.npy", mmap_mode="r"))
+            except (OSError, ValueError, KeyError) as e:
+                # 快照正在被清理或写入不完整，保留当前映射，下次检查时重试
+                print(f"向量快照 {name} 加载失败: {e}")
+                return bool(self._tables)
+            self._tables, self.manifest, self.snapshot = tables, manifest, name
+            return True
+
+    @property
+    def ready(self) -> bool:
+        return self.load()
+
+    def table(self, label: str) -> Tuple[List[str], Any]:
+        self.load()
+        return self._tables.get(label, ([], None))
+
+    def batch_search(self, label: str, vectors: Sequence[Sequence[float]], k: int) -> Optional[List[List[Tuple[str, float]]]]:
+        """
+        返回每个问题向量的前 k 个 (id, 余弦相似度)，按相似度降序。
+        快照不可用或维度不一致时返回 None。
+        """
+        import numpy as np
+        ids, matrix = self.table(label)
+        if matrix is None or not len(ids):
+            return None
+        queries = normalize_rows(vectors)
+        if queries.shape[1] != matrix.shape[1]:
+            return None
+        scores = matrix @ queries.T  # (实体数, 问题数)
+        k = min(int(k), len(ids))
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+        results = []
+        for column in scores.T:
+            top = np.argpartition(-column, k - 1)[:k] if k < len(ids) else np.arange(len(ids))
+            top = top[np.argsort(-column[top], kind="stable")]
+            results.append([(ids[i], float(column[i])) for i in top])
+        return results
+
+    def search(self, label: str, vector: Sequence[float], k: int) -> Optional[List[Tuple[str, float]]]:
+        results = self.batch_search(label, [vector], k)
+        return results[0] if results is not None else None
+
+
+def get_embedding_replica() -> Optional[EmbeddingReplica]:
+    """获取进程内共享的向量副本；设置 EMBEDDING_REPLICA=false 时返回 None"""
+    if os.getenv("EMBEDDING_REPLICA", "true").lower() != "true":
+        return None
+    from common.get_models import _registry_key, model_registry
+    directory = str(replica_dir())
+    return model_registry.get_or_create(_registry_key("embedding_replica", directory), lambda: EmbeddingReplica(directory))
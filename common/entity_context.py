@@ -0,0 +1,163 @@
+"""
+实体邻域上下文的物化缓存。
+
+vector_search 命中实体后要对每个实体展开 MENTIONS 文本块、IN_COMMUNITY 社区摘要、内外部关系与描述，
+这些结果只随图谱变化。建索引时把每个实体的邻域预先整理好存在实体上，检索时随向量命中一起读出（一次索引读取），
+在进程内按与 custom_tools.neo4j_tools._CONTEXT_QUERY 相同的规则合并，不再做多跳遍历：
+    context            JSON：实体描述、所属社区摘要、按权重取前 ENTITY_CONTEXT_LIMIT 条关系及关系总数
+    context_chunk_ids  提及该实体的全部文本块 id（不存正文）；检索时在 Cypher 中按提及次数选出前 $topChunks 个，只读取这几个文本块的正文
+
+关系只保存前 ENTITY_CONTEXT_LIMIT 条，而命中集合内外的关系要分别取前若干条；
+某个命中实体的关系被截断、且截断部分可能进入结果时，merge_contexts 返回 None，检索退回遍历查询，因此合并结果与遍历一致。
+上下文由 database/neo4j_setup/graph/indexing/context_cache.py 构建，并由增量更新流程增量刷新；
+格式变化时提升 CONTEXT_VERSION，旧版本的上下文视为缺失，检索时退回遍历查询。
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CONTEXT_VERSION = 1
+
+# 社区与关系按与检索相同的排序取前 $limit 条（Cypher 降序时空值在前）；文本块只保存 id
+BUILD_CONTEXT_QUERY = """
+UNWIND $ids AS entityId
+MATCH (e:`__Entity__` {id: entityId})
+WITH e, {
+    v: $version,
+    description: e.description,
+    communities: collect {
+        MATCH (e)-[:IN_COMMUNITY]->(c:`__Community__`)
+        WITH DISTINCT c
+        ORDER BY c.community_rank, c.weight DESC
+        LIMIT $limit
+        RETURN {id: c.id, summary: c.summary, rank: c.community_rank, weight: c.weight}
+    },
+    rels: collect {
+        MATCH (e)-[r]-(m:`__Entity__`)
+        WITH r, m
+        ORDER BY r.weight DESC
+        LIMIT $limit
+        RETURN {other: m.id, description: r.description, weight: r.weight}
+    },
+    relCount: COUNT { (e)-[]-(:`__Entity__`) }
+} AS context,
+collect {
+    MATCH (e)<-[:MENTIONS]-(c:`__Chunk__`)
+    WHERE c.id IS NOT NULL
+    RETURN DISTINCT c.id
+} AS chunkIds
+SET e.context = apoc.convert.toJson(context),
+    e.context_chunk_ids = chunkIds,
+    e.context_rel_count = context.relCount,
+    e.context_version = $version,
+    e.context_updated_at = datetime()
+RETURN count(e) AS updated
+"""
+
+# 上下文缺失、版本不符，或实体、关系、文本块在上下文生成之后有更新的实体；
+# 删除不会留下时间戳，因此还要比较文本块数与关系数（文件删除、实体合并、一致性修复等）
+STALE_CONTEXT_QUERY = """
+MATCH (e:`__Entity__`)
+WHERE e.context IS NULL
+   OR e.context_version IS NULL OR e.context_version <> $version
+   OR e.last_updated > e.context_updated_at
+   OR e.updated_at > e.context_updated_at
+   OR EXISTS {
+       MATCH (e)-[r]-(:`__Entity__`)
+       WHERE r.last_updated > e.context_updated_at OR r.updated_at > e.context_updated_at
+   }
+   OR EXISTS {
+       MATCH (e)<-[:MENTIONS]-(c:`__Chunk__`)
+       WHERE c.last_updated > e.context_updated_at
+   }
+   OR e.context_rel_count IS NULL OR e.context_rel_count <> COUNT { (e)-[]-(:`__Entity__`) }
+   OR size(coalesce(e.context_chunk_ids, [])) <> COUNT {
+       MATCH (e)<-[:MENTIONS]-(c:`__Chunk__`)
+       WHERE c.id IS NOT NULL
+       RETURN DISTINCT c.id
+   }
+RETURN e.id AS id
+"""
+
+
+def context_limit() -> int:
+    return int(os.getenv("ENTITY_CONTEXT_LIMIT", "20"))
+
+
+def load_context(raw: Optional[str]) -> Optional[Dict[str, Any]]:
+    """解析实体的 context 属性；缺失、损坏或版本不符时返回 None"""
+    if not raw:
+        return None
+    try:
+        context = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(context, dict) or context.get("v") != CONTEXT_VERSION:
+        return None
+    return context
+
+
+def _weight_key(weight: Any) -> Tuple[bool, float]:
+    """与 Cypher ORDER BY weight DESC 相同：按 key 降序时空值在前，其余按权重降序"""
+    return weight is None, weight or 0.0
+
+
+def merge_contexts(
+    entity_ids: Sequence[str],
+    contexts: Sequence[Dict[str, Any]],
+    chunks: Sequence[Any],
+    topCommunities: int,
+    topOutsideRels: int,
+    topInsideRels: int,
+) -> Optional[Dict[str, Any]]:
+    """
+    合并命中实体的上下文，结果与 _CONTEXT_QUERY + _STRUCTURED_RETURN 的一行相同：
+        chunks          被最多命中实体提及的文本块，已由 .cached 模板按 context_chunk_ids 选出
+        reports         按社区排名升序、权重降序的社区摘要
+        relationships   指向命中集合之外实体的关系在前，集合内部关系在后，各自按权重降序
+        entities        命中实体的描述
+    命中实体的关系被截断、且截断部分可能进入结果时返回 None，由调用方改走遍历查询。
+    """
+    members = set(entity_ids)
+
+    communities: Dict[Any, Dict[str, Any]] = {}
+    outside, inside = [], []
+    floors = []  # 关系被截断的实体中，未保存关系的权重上界
+    for context in contexts:
+        for community in context.get("communities") or []:
+            communities.setdefault(community["id"], community)
+        rels = context.get("rels") or []
+        for rel in rels:
+            (inside if rel.get("other") in members else outside).append(rel)
+        if (context.get("relCount") or 0) > len(rels):
+            floors.append(_weight_key(rels[-1].get("weight")) if rels else (False, float("-inf")))
+
+    def by_weight(rels: List[Dict[str, Any]], limit: int) -> Optional[List[Any]]:
+        ranked = sorted(rels, key=lambda rel: _weight_key(rel.get("weight")), reverse=True)[:limit]
+        # 截断部分的权重不超过 floor；结果已取满且最后一条不低于 floor 时，截断部分不会进入结果
+        for floor in floors:
+            if limit > 0 and (len(ranked) < limit or _weight_key(ranked[-1].get("weight")) < floor):
+                return None
+        return [rel.get("description") for rel in ranked]
+
+    outside_rels = by_weight(outside, topOutsideRels)
+    inside_rels = by_weight(inside, topInsideRels)
+    if outside_rels is None or inside_rels is None:
+        return None
+
+    reports = sorted(
+        communities.values(),
+        # 排名升序时空值在后；权重降序时空值在前
+        key=lambda c: (c.get("rank") is None, c.get("rank") or 0, c.get("weight") is not None, -(c.get("weight") or 0.0)),
+    )
+    return {
+        "chunks": list(chunks),
+        "reports": [c.get("summary") for c in reports[:topCommunities]],
+        "relationships": outside_rels + inside_rels,
+        "entities": [context.get("description") for context in contexts],
+        "entity_ids": list(entity_ids),
+    }
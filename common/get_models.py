@@ -1,32 +1,175 @@
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_openai import ChatOpenAI
-from langchain.callbacks.streaming_aiter import AsyncIteratorCallbackHandler
-from langchain.callbacks.manager import AsyncCallbackManager
+# langchain_huggingface（会拉起 sentence_transformers/torch）与 langchain_openai 导入开销较大，
+# 统一在真正创建模型时再导入，避免 `import common` 拖慢冷启动
+from langchain_core.embeddings import Embeddings
 
+import json
 import os
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def get_embeddings_model():
-    return HuggingFaceEmbeddings(
-        model_name=os.getenv("EMBEDDING_MODEL"),
-        model_kwargs={'device': 'cpu'},  # 或 'cpu'
-        encode_kwargs={'normalize_embeddings': True}
+
+class ModelRegistry:
+    """
+    进程级模型注册表，保证同一组 (模型, 设备, 参数) 只实例化一次。
+
+    每个 key 持有独立的锁：同一模型的并发请求只加载一次，不同模型的加载互不阻塞。
+    """
+
+    def __init__(self) -> None:
+        self._instances: Dict[Hashable, Any] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        instance = self._instances.get(key)
+        if instance is not None:
+            return instance
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._instances:
+                self._instances[key] = factory()
+            return self._instances[key]
+
+    def is_loaded(self, key: Hashable) -> bool:
+        return key in self._instances
+
+    def clear(self) -> None:
+        with self._lock:
+            self._instances.clear()
+            self._key_locks.clear()
+
+
+model_registry = ModelRegistry()
+
+
+def _registry_key(kind: str, name: Optional[str], **kwargs: Any) -> tuple:
+    return (kind, name, json.dumps(kwargs, sort_keys=True, default=str))
+
+
+class LazyEmbeddings(Embeddings):
+    """延迟加载的 embedding 代理：首次调用 embed_* 时才从注册表取出（或加载）真实模型"""
+
+    def __init__(self, loader: Callable[[], Embeddings]) -> None:
+        self._loader = loader
+
+    @property
+    def model(self) -> Embeddings:
+        return self._loader()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.model.embed_query(text)
+
+
+def get_embeddings_model(
+    model_name: Optional[str] = None,
+    device: str = 'cpu',
+    model_kwargs: Optional[Dict[str, Any]] = None,
+    encode_kwargs: Optional[Dict[str, Any]] = None,
+    lazy: bool = False,
+):
+    """
+    获取共享的 embedding 模型实例。
+
+    参数:
+        model_name: 模型名称或本地路径，默认读取环境变量 EMBEDDING_MODEL
+        device: 推理设备
+        model_kwargs: 额外的模型参数
+        encode_kwargs: 编码参数，默认对向量做归一化
+        lazy: 为 True 时返回延迟加载代理，首次编码时才加载模型
+    """
+    model_name = model_name or os.getenv("EMBEDDING_MODEL")
+    model_kwargs = {'device': device, **(model_kwargs or {})}
+    encode_kwargs = encode_kwargs if encode_kwargs is not None else {'normalize_embeddings': True}
+    key = _registry_key("embeddings", model_name, model_kwargs=model_kwargs, encode_kwargs=encode_kwargs)
+
+    def create():
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs=model_kwargs,
+            encode_kwargs=encode_kwargs,
+        )
+
+    def load():
+        return model_registry.get_or_create(key, create)
+
+    if lazy and not model_registry.is_loaded(key):
+        return LazyEmbeddings(load)
+    return load()
+
+
+def get_response_cache(semantic: bool = False):
+    """获取共享的本地 LLM 响应缓存（精确层，semantic=True 时附带语义层）"""
+    from common.llm_cache import LocalResponseCache
+    return model_registry.get_or_create(
+        _registry_key("llm_response_cache", None, semantic=semantic),
+        lambda: LocalResponseCache(semantic=semantic),
     )
 
 
-def get_llm_model():
+def _resolve_response_cache(temperature: Any, cache_responses: Optional[bool], semantic_cache: bool):
+    """只为确定性调用挂缓存：temperature 为 0，或调用方显式标记 cache_responses=True"""
+    from common.llm_cache import is_deterministic
+    if cache_responses is None:
+        cache_responses = is_deterministic(temperature)
+    return get_response_cache(semantic=semantic_cache) if cache_responses else None
+
+
+def get_chat_model(
+    temperature: float = 0.0,
+    cache_responses: Optional[bool] = None,
+    semantic_cache: Optional[bool] = None,
+    **kwargs: Any,
+):
+    """
+    init_chat_model 的封装，按需挂载本地响应缓存。
+
+    参数:
+        temperature: 采样温度
+        cache_responses: 是否缓存响应；默认仅在 temperature 为 0 时缓存
+        semantic_cache: 是否额外启用近似问题的语义缓存，默认读取环境变量 LLM_SEMANTIC_CACHE
+    """
+    from langchain.chat_models import init_chat_model
+    if semantic_cache is None:
+        semantic_cache = os.getenv("LLM_SEMANTIC_CACHE", "false").lower() == "true"
+    cache = _resolve_response_cache(temperature, cache_responses, semantic_cache)
+    if cache is not None:
+        kwargs["cache"] = cache
+    return init_chat_model(
+        model=os.getenv("OPENAI_LLM_MODEL"),
+        api_key=os.getenv("OPENAI_API_KEY"),
+        base_url=os.getenv("OPENAI_BASE_URL"),
+        temperature=temperature,
+        **kwargs,
+    )
+
+
+def get_llm_model(cache_responses: Optional[bool] = None):
+    from langchain_openai import ChatOpenAI
+    temperature = os.getenv('TEMPERATURE')
+    cache = _resolve_response_cache(temperature, cache_responses, semantic_cache=False)
     model = ChatOpenAI(
         model=os.getenv('OPENAI_LLM_MODEL'),
-        temperature=os.getenv('TEMPERATURE'),
+        temperature=temperature,
         max_tokens=os.getenv('MAX_TOKENS'),
         api_key=os.getenv('OPENAI_API_KEY'),
         base_url=os.getenv('OPENAI_BASE_URL'),
+        **({"cache": cache} if cache is not None else {}),
     )
     return model
 
 def get_stream_llm_model():
+    from langchain_openai import ChatOpenAI
+    from langchain.callbacks.streaming_aiter import AsyncIteratorCallbackHandler
+    from langchain.callbacks.manager import AsyncCallbackManager
+
     callback_handler = AsyncIteratorCallbackHandler()
     # 将回调handler放进AsyncCallbackManager中
     manager = AsyncCallbackManager(handlers=[callback_handler])
@@ -43,34 +186,11 @@ def get_stream_llm_model():
     return model
 
 def count_tokens(text):
-    """简单通用的token计数"""
+    """简单通用的token计数，tokenizer 与计数结果均在进程内缓存"""
     if not text:
         return 0
-    
-    model_name = os.getenv('OPENAI_LLM_MODEL', '').lower()
-    
-    # 如果是deepseek，使用transformers
-    if 'deepseek' in model_name:
-        try:
-            from transformers import AutoTokenizer
-            tokenizer = AutoTokenizer.from_pretrained("deepseek-ai/DeepSeek-V3")
-            return len(tokenizer.encode(text))
-        except:
-            pass
-    
-    # 如果是gpt，使用tiktoken
-    if 'gpt' in model_name:
-        try:
-            import tiktoken
-            encoding = tiktoken.get_encoding("cl100k_base")
-            return len(encoding.encode(text))
-        except:
-            pass
-    
-    # 备用方案：简单计算
-    chinese = len([c for c in text if '\u4e00' <= c <= '\u9fff'])
-    english = len(text) - chinese
-    return chinese + english // 4
+    from common.token_counter import get_token_counter
+    return get_token_counter().count(text)
 
 if __name__ == '__main__':
     # 测试llm
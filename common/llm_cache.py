@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_CACHE_PATH = "./cache/llm_response_cache.sqlite"
+
+
+def _sha256(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _split_prompt(prompt: str) -> Tuple[str, str]:
+    """
+    将 LangChain 序列化后的消息列表拆成 (上下文, 最后一条用户消息)。
+
+    语义层只对最后一条用户消息做相似度匹配，其余消息必须完全一致。
+    """
+    try:
+        messages = json.loads(prompt)
+    except (json.JSONDecodeError, TypeError):
+        return prompt, ""
+    if not isinstance(messages, list):
+        return prompt, ""
+    for idx in range(len(messages) - 1, -1, -1):
+        message = messages[idx]
+        if not isinstance(message, dict):
+            continue
+        msg_type = (message.get("id") or [""])[-1]
+        if msg_type == "HumanMessage":
+            content = message.get("kwargs", {}).get("content", "")
+            if isinstance(content, str):
+                rest = messages[:idx] + messages[idx + 1:]
+                return json.dumps(rest, sort_keys=True, ensure_ascii=False), content
+    return prompt, ""
+
+
+class LocalResponseCache(BaseCache):
+    """
+    本地磁盘上的 LLM 响应缓存，作为 LangChain chat model 的 `cache` 参数使用。
+
+    - 精确层：以 (模型参数串, 消息序列化结果) 的哈希为键，模型参数串包含模型名与 temperature；
+    - 语义层（可选）：其余消息完全一致时，对最后一条用户消息做向量相似度匹配，命中阈值即复用；
+    - 两层共用 TTL 与条目上限，超出上限时按最近访问时间淘汰。
+
+    缓存只应挂在确定性调用上（temperature 为 0 或显式标记的节点），由 get_chat_model 负责判断。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        semantic: bool = False,
+        similarity_threshold: Optional[float] = None,
+        embeddings: Any = None,
+        semantic_scan_limit: int = 500,
+    ) -> None:
+        self.path = Path(path or os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH))
+        self.ttl_seconds = int(ttl_seconds if ttl_seconds is not None else os.getenv("LLM_CACHE_TTL", "86400"))
+        self.max_entries = int(max_entries if max_entries is not None else os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+        self.semantic = semantic
+        self.similarity_threshold = float(
+            similarity_threshold
+            if similarity_threshold is not None
+            else os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0.95")
+        )
+        self.semantic_scan_limit = semantic_scan_limit
+        self._embeddings = embeddings
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    # ------------------------------
+    # 存储
+    # ------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, scope TEXT, question TEXT, embedding TEXT, "
+                "response TEXT, created_at REAL, last_access REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_scope ON responses(scope, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+            self._conn = conn
+        return self._conn
+
+    def _get_embedder(self):
+        if self._embeddings is None:
+            from common.get_models import get_embeddings_model
+            self._embeddings = get_embeddings_model()
+        return self._embeddings
+
+    def _embed(self, text: str) -> Optional[List[float]]:
+        if not text:
+            return None
+        try:
+            return self._get_embedder().embed_query(text)
+        except Exception:
+            return None
+
+    # ------------------------------
+    # BaseCache 接口
+    # ------------------------------
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        now = time.time()
+        key = _sha256(llm_string, prompt)
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] <= self.ttl_seconds:
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self.hits += 1
+                return loads(row[0])
+
+        if self.semantic:
+            cached = self._semantic_lookup(prompt, llm_string, now)
+            if cached is not None:
+                self.semantic_hits += 1
+                return cached
+
+        self.misses += 1
+        return None
+
+    def _semantic_lookup(self, prompt: str, llm_string: str, now: float) -> Optional[RETURN_VAL_TYPE]:
+        context, question = _split_prompt(prompt)
+        query_vec = self._embed(question)
+        if query_vec is None:
+            return None
+        scope = _sha256(llm_string, context)
+
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT key, embedding, response FROM responses "
+                "WHERE scope = ? AND embedding IS NOT NULL AND created_at >= ? "
+                "ORDER BY created_at DESC LIMIT ?",
+                (scope, now - self.ttl_seconds, self.semantic_scan_limit),
+            ).fetchall()
+
+        best_key, best_response, best_score = None, None, self.similarity_threshold
+        for key, embedding, response in rows:
+            vec = json.loads(embedding)
+            # embedding 已归一化，点积即余弦相似度
+            score = sum(x * y for x, y in zip(query_vec, vec))
+            if score >= best_score:
+                best_key, best_response, best_score = key, response, score
+        if best_key is None:
+            return None
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, best_key))
+            conn.commit()
+        return loads(best_response)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        now = time.time()
+        key = _sha256(llm_string, prompt)
+        scope, question, embedding = None, None, None
+        if self.semantic:
+            context, question = _split_prompt(prompt)
+            vec = self._embed(question)
+            if vec is not None:
+                scope = _sha256(llm_string, context)
+                embedding = json.dumps(vec)
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, scope, question, embedding, response, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, scope, question, embedding, dumps(list(return_val)), now, now),
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            # 一次多淘汰 10%，避免每次写入都触发淘汰
+            overflow += self.max_entries // 10
+            conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.semantic_hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.semantic_hits) / total if total else 0.0,
+        }
+
+
+def is_deterministic(temperature: Any) -> bool:
+    """temperature 显式为 0 时视为确定性调用"""
+    try:
+        return float(temperature) == 0.0
+    except (TypeError, ValueError):
+        return False
@@ -1,4 +1,6 @@
+import asyncio
 import os
+import threading
 import time
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -25,7 +27,11 @@ except Exception:
 
 
 class MemoryBackend:
-	"""Abstract memory backend interface."""
+	"""Abstract memory backend interface.
+
+	Async variants default to running the sync implementation in a worker thread,
+	so embedding inference and network I/O never block the event loop.
+	"""
 
 	def search(self, namespace: str, query: str, top_k: int = 5, min_score: float = 0.3) -> List[Dict[str, Any]]:
 		raise NotImplementedError
@@ -39,6 +45,18 @@ class MemoryBackend:
 	def delete(self, namespace: str, item_id: Optional[str] = None, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
 		raise NotImplementedError
 
+	async def asearch(self, namespace: str, query: str, top_k: int = 5, min_score: float = 0.3) -> List[Dict[str, Any]]:
+		return await asyncio.to_thread(self.search, namespace, query, top_k, min_score)
+
+	async def awrite(self, namespace: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+		return await asyncio.to_thread(self.write, namespace, content, metadata)
+
+	async def aupdate(self, namespace: str, item_id: str, content: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+		return await asyncio.to_thread(self.update, namespace, item_id, content, metadata)
+
+	async def adelete(self, namespace: str, item_id: Optional[str] = None, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+		return await asyncio.to_thread(self.delete, namespace, item_id, filters)
+
 
 class InMemoryBackend(MemoryBackend):
 	"""Simple in-process backend; suitable as a safe fallback."""
@@ -46,20 +64,22 @@ class InMemoryBackend(MemoryBackend):
 	def __init__(self) -> None:
 		self._store: Dict[str, Dict[str, Dict[str, Any]]] = {}
 		self._id_counter: int = 0
+		# async 接口会在线程池中并发调用，计数器与命名空间字典需加锁
+		self._lock = threading.Lock()
 		self._embedding = self._init_embedder()
 
 	def _init_embedder(self):
 		if not _HAS_EMBED:
 			return None
 		try:
-			return get_embeddings_model()
+			# 共享实例，首次写入/检索时才加载
+			return get_embeddings_model(lazy=True)
 		except Exception:
 			return None
 
 	def _ensure_ns(self, namespace: str) -> Dict[str, Dict[str, Any]]:
-		if namespace not in self._store:
-			self._store[namespace] = {}
-		return self._store[namespace]
+		with self._lock:
+			return self._store.setdefault(namespace, {})
 
 	def _embed(self, text: str) -> Optional[List[float]]:
 		if self._embedding is None:
@@ -75,7 +95,7 @@ class InMemoryBackend(MemoryBackend):
 		ns = self._ensure_ns(namespace)
 		query_vec = self._embed(query)
 		results: List[Tuple[str, Dict[str, Any], float]] = []
-		for item_id, item in ns.items():
+		for item_id, item in list(ns.items()):
 			score = 0.0
 			if query_vec is not None and "embedding" in item and item["embedding"] is not None:
 				# cosine similarity
@@ -99,8 +119,9 @@ class InMemoryBackend(MemoryBackend):
 
 	def write(self, namespace: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
 		ns = self._ensure_ns(namespace)
-		self._id_counter += 1
-		item_id = f"{int(time.time())}_{self._id_counter}"
+		with self._lock:
+			self._id_counter += 1
+			item_id = f"{int(time.time())}_{self._id_counter}"
 		item = {
 			"id": item_id,
 			"content": content,
@@ -0,0 +1,157 @@
+import json
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from common.get_models import get_embeddings_model
+    _HAS_EMBED = True
+except Exception:
+    _HAS_EMBED = False
+    get_embeddings_model = None  # type: ignore
+
+# memory_route 工具与本地预分类器共用的关键词
+MEMORY_WRITE_KEYWORDS = ["记住", "默认", "以后都", "偏好", "习惯"]
+MEMORY_READ_KEYWORDS = ["以前", "之前", "上次", "你知道我", "我的偏好"]
+
+# 预分类结果
+GATE_WRITE = "write"
+GATE_SKIP = "skip"
+GATE_AMBIGUOUS = "ambiguous"
+
+# 内置的少量标注样本，可通过 load_labelled_turns 载入更多样本覆盖
+DEFAULT_LABELLED_TURNS: List[Tuple[str, bool]] = [
+    ("记住我叫王磊，以后都用中文回答我", True),
+    ("我负责华东区的订单分析，以后优先看华东的数据", True),
+    ("我的习惯是先看汇总再看明细", True),
+    ("以后报表默认按周汇总", True),
+    ("我是财务部的，主要关注回款周期", True),
+    ("请记住我们公司的财年从四月开始", True),
+    ("我偏好用表格展示结果，不要长段落", True),
+    ("超期的定义以后都按实际完成时间晚于计划时间来算", True),
+    ("我是研二的学生，正在准备申请国家奖学金", True),
+    ("以后金额都保留两位小数", True),
+    ("查一下上个月的超期订单", False),
+    ("data_test表里有多少行数据", False),
+    ("帮我统计各个类别的订单数量", False),
+    ("申请奖学金需要提供什么材料", False),
+    ("show me overdue orders", False),
+    ("计算一下平均处理时长", False),
+    ("生成一份奖学金评选的分析报告", False),
+    ("你好", False),
+    ("谢谢，没有其他问题了", False),
+    ("把这次的查询结果保存成csv", False),
+    ("数据库里都有哪些表", False),
+    ("各部门的订单完成率是多少", False),
+]
+
+
+def load_labelled_turns(path: str) -> List[Tuple[str, bool]]:
+    """从 jsonl 文件载入标注样本，每行格式：{"text": "...", "should_write": true}"""
+    turns: List[Tuple[str, bool]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            turns.append((str(record["text"]), bool(record["should_write"])))
+    return turns
+
+
+def match_keywords(text: str, keywords: Sequence[str]) -> List[str]:
+    lowered = text.lower()
+    return [kw for kw in keywords if kw in lowered]
+
+
+class MemoryWriteGate:
+    """
+    记忆写入的本地预分类器。
+
+    结合 memory_route 的关键词规则与基于标注样本的 embedding 近邻打分：
+    两类信号一致时直接给出 write/skip，只有信号冲突或不确定的对话才交给 LLM 判断。
+    """
+
+    def __init__(
+        self,
+        labelled_turns: Optional[Iterable[Tuple[str, bool]]] = None,
+        embeddings: Any = None,
+        neighbours: int = 3,
+        write_margin: float = 0.08,
+        skip_margin: float = 0.05,
+    ) -> None:
+        self.labelled_turns = list(labelled_turns or DEFAULT_LABELLED_TURNS)
+        self.neighbours = neighbours
+        self.write_margin = write_margin
+        self.skip_margin = skip_margin
+        self._embeddings = embeddings
+        self._positives: Optional[List[List[float]]] = None
+        self._negatives: Optional[List[List[float]]] = None
+        self._fit_lock = threading.Lock()
+
+    def _get_embedder(self):
+        if self._embeddings is None and _HAS_EMBED:
+            try:
+                self._embeddings = get_embeddings_model()
+            except Exception:
+                self._embeddings = None
+        return self._embeddings
+
+    def _fit(self) -> bool:
+        """首次使用时对标注样本做向量化；embedding 不可用时返回 False"""
+        if self._positives is not None:
+            return True
+        with self._fit_lock:
+            if self._positives is not None:
+                return True
+            embedder = self._get_embedder()
+            if embedder is None:
+                return False
+            try:
+                vectors = embedder.embed_documents([text for text, _ in self.labelled_turns])
+            except Exception:
+                return False
+            self._negatives = [v for v, (_, label) in zip(vectors, self.labelled_turns) if not label]
+            self._positives = [v for v, (_, label) in zip(vectors, self.labelled_turns) if label]
+        return True
+
+    def _knn_score(self, vec: List[float], examples: List[List[float]]) -> float:
+        # embedding 已归一化，点积即余弦相似度
+        sims = sorted((sum(x * y for x, y in zip(vec, ex)) for ex in examples), reverse=True)
+        top = sims[: self.neighbours]
+        return sum(top) / len(top) if top else 0.0
+
+    def margins(self, texts: List[str]) -> List[Optional[float]]:
+        """返回每条文本的 正样本相似度 - 负样本相似度；embedding 不可用时为 None"""
+        if not texts or not self._fit():
+            return [None] * len(texts)
+        try:
+            vectors = self._embeddings.embed_documents(texts)
+        except Exception:
+            return [None] * len(texts)
+        return [
+            self._knn_score(vec, self._positives) - self._knn_score(vec, self._negatives)
+            for vec in vectors
+        ]
+
+    def classify_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """批量预分类，返回 [{"label": write/skip/ambiguous, "reason": ..., "margin": ...}]"""
+        results: List[Dict[str, Any]] = []
+        for text, margin in zip(texts, self.margins(texts)):
+            hits = match_keywords(text, MEMORY_WRITE_KEYWORDS)
+            if margin is None:
+                label = GATE_AMBIGUOUS
+                reason = "embedding 不可用，交由 LLM 判断"
+            elif hits and margin >= self.write_margin:
+                label = GATE_WRITE
+                reason = f"本地预分类器判定需要写入（关键词：{'、'.join(hits)}；相似度差：{margin:.2f}）"
+            elif not hits and margin <= -self.skip_margin:
+                label = GATE_SKIP
+                reason = f"本地预分类器判定无需写入（相似度差：{margin:.2f}）"
+            else:
+                label = GATE_AMBIGUOUS
+                reason = "关键词与相似度信号不一致，交由 LLM 判断"
+            results.append({"label": label, "reason": reason, "margin": margin})
+        return results
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        return self.classify_batch([text])[0]
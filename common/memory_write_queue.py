@@ -0,0 +1,255 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from common.memory_backend import MemoryBackend
+from common.memory_gate import GATE_AMBIGUOUS, GATE_WRITE, MemoryWriteGate
+from common.prompt import memory_write_decision_prompt
+from common.utils import parse_json_from_text
+
+
+@dataclass
+class MemoryWriteJob:
+    """一轮对话结束后待判断的记忆写入任务"""
+    namespace: str
+    query: str
+    answer: str
+    context: List[str] = field(default_factory=list)  # 已检索到的相关记忆
+    enqueued_at: float = field(default_factory=time.time)
+
+
+def build_memory_entry(job: MemoryWriteJob, decision: Dict[str, Any]) -> str:
+    """将一轮问答及写入判断整理成长期记忆条目"""
+    summary = str(decision.get("memory_summary", "") or "").strip()
+    reason = str(decision.get("reason", "") or "").strip()
+
+    sections: List[str] = []
+    if summary:
+        sections.append(f"【记忆要点】\n{summary}")
+    if reason:
+        sections.append(f"【判断依据】\n{reason}")
+    sections.append(f"【用户问题】\n{job.query}")
+    sections.append(f"【最终回答】\n{job.answer}")
+    return "\n\n".join(sections)
+
+
+class MemoryWriteQueue:
+    """
+    后台记忆写入队列。
+
+    主管智能体在给出答案后只负责入队，不再等待写入判断；后台线程把多轮、多用户的
+    任务攒成一批，先经本地预分类器过滤，只把不确定的对话合并成一次 LLM 调用判断，
+    再把需要保存的条目写入记忆后端。队列满时直接丢弃新任务，保证回答路径永不阻塞。
+    """
+
+    def __init__(
+        self,
+        llm: Any,
+        backend: MemoryBackend,
+        gate: Optional[MemoryWriteGate] = None,
+        max_queue_size: int = 1000,
+        batch_size: int = 16,
+        flush_interval: float = 2.0,
+    ) -> None:
+        self.llm = llm
+        self.backend = backend
+        self.gate = gate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[MemoryWriteJob]" = queue.Queue(maxsize=max_queue_size)
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, float] = {
+            "enqueued": 0,
+            "dropped": 0,
+            "processed": 0,
+            "written": 0,
+            "failed": 0,
+            "batches": 0,
+            "llm_calls": 0,
+            "llm_routed": 0,
+            "gated_write": 0,
+            "gated_skip": 0,
+            "last_lag_seconds": 0.0,
+            "max_lag_seconds": 0.0,
+            "total_lag_seconds": 0.0,
+        }
+
+    # ------------------------------
+    # 生产者接口
+    # ------------------------------
+    def submit(self, job: MemoryWriteJob) -> bool:
+        """非阻塞入队；队列已满时丢弃并返回 False"""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._incr("dropped")
+            return False
+        self._incr("enqueued")
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待队列中已有任务全部处理完成（用于测试与进程退出前）"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def metrics(self) -> Dict[str, float]:
+        """返回队列深度、延迟与丢弃计数等指标"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        total_lag = stats.pop("total_lag_seconds")
+        stats["avg_lag_seconds"] = total_lag / stats["processed"] if stats["processed"] else 0.0
+        stats["queue_depth"] = self._queue.qsize()
+        stats["oldest_pending_seconds"] = self._oldest_pending_age()
+        return stats
+
+    # ------------------------------
+    # 后台消费者
+    # ------------------------------
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="memory-write-queue", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                self._process_batch(batch)
+            except Exception:
+                self._incr("failed", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _next_batch(self) -> List[MemoryWriteJob]:
+        """阻塞等待第一个任务，之后在 flush_interval 内尽量凑满一批"""
+        batch = [self._queue.get()]
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _process_batch(self, batch: List[MemoryWriteJob]) -> None:
+        decisions = self._gate_batch(batch)
+        ambiguous = [idx for idx in range(len(batch)) if idx not in decisions]
+        if ambiguous:
+            self._incr("llm_routed", len(ambiguous))
+            llm_decisions = self._decide_batch([batch[idx] for idx in ambiguous])
+            for local_idx, idx in enumerate(ambiguous):
+                if local_idx in llm_decisions:
+                    decisions[idx] = llm_decisions[local_idx]
+        self._incr("batches")
+        for idx, job in enumerate(batch):
+            decision = decisions.get(idx)
+            if decision is None:
+                self._incr("failed")
+            elif decision.get("should_write"):
+                try:
+                    self.backend.write(
+                        job.namespace,
+                        build_memory_entry(job, decision),
+                        metadata={"source": "supervisor"},
+                    )
+                    self._incr("written")
+                except Exception:
+                    self._incr("failed")
+            self._record_lag(time.time() - job.enqueued_at)
+
+    def _gate_batch(self, batch: List[MemoryWriteJob]) -> Dict[int, Dict[str, Any]]:
+        """本地预分类：返回已能确定的判断，不确定的对话不出现在结果中"""
+        if self.gate is None:
+            return {}
+        decisions: Dict[int, Dict[str, Any]] = {}
+        for idx, verdict in enumerate(self.gate.classify_batch([job.query for job in batch])):
+            if verdict["label"] == GATE_AMBIGUOUS:
+                continue
+            should_write = verdict["label"] == GATE_WRITE
+            self._incr("gated_write" if should_write else "gated_skip")
+            decisions[idx] = {
+                "should_write": should_write,
+                "memory_summary": "",
+                "reason": verdict["reason"],
+            }
+        return decisions
+
+    def _decide_batch(self, batch: List[MemoryWriteJob]) -> Dict[int, Dict[str, Any]]:
+        """一次 LLM 调用完成整批写入判断，返回 {对话编号: 判断结果}"""
+        blocks: List[str] = []
+        for idx, job in enumerate(batch):
+            context_lines = "\n".join(f"- {item}" for item in job.context[:3]) or "（无相关记忆）"
+            blocks.append(
+                f"### 对话 {idx}\n"
+                f"用户消息：\n{job.query.strip()}\n"
+                f"已存在的相关记忆：\n{context_lines}"
+            )
+
+        llm_messages = [
+            SystemMessage(content=memory_write_decision_prompt),
+            HumanMessage(content="\n\n".join(blocks)),
+        ]
+        self._incr("llm_calls")
+        try:
+            response = self.llm.invoke(llm_messages)
+        except Exception:
+            return {}
+
+        parsed = parse_json_from_text(str(getattr(response, "content", "") or ""))
+        if not parsed or not isinstance(parsed.get("decisions"), list):
+            return {}
+
+        decisions: Dict[int, Dict[str, Any]] = {}
+        for item in parsed["decisions"]:
+            if not isinstance(item, dict):
+                continue
+            try:
+                idx = int(item.get("id"))
+            except (TypeError, ValueError):
+                continue
+            if 0 <= idx < len(batch):
+                decisions[idx] = {
+                    "should_write": bool(item.get("should_write", False)),
+                    "memory_summary": str(item.get("memory_summary", "") or "").strip(),
+                    "reason": str(item.get("reason", "") or "").strip(),
+                }
+        return decisions
+
+    # ------------------------------
+    # 指标
+    # ------------------------------
+    def _incr(self, key: str, value: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += value
+
+    def _record_lag(self, lag: float) -> None:
+        with self._stats_lock:
+            self._stats["processed"] += 1
+            self._stats["last_lag_seconds"] = lag
+            self._stats["max_lag_seconds"] = max(self._stats["max_lag_seconds"], lag)
+            self._stats["total_lag_seconds"] += lag
+
+    def _oldest_pending_age(self) -> float:
+        with self._queue.mutex:
+            oldest = self._queue.queue[0] if self._queue.queue else None
+        return time.time() - oldest.enqueued_at if oldest else 0.0
@@ -0,0 +1,287 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+
+from common.token_counter import MESSAGE_OVERHEAD_TOKENS, get_token_counter
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# memory_router 注入的 SystemMessage 在 additional_kwargs 中带此标记，值为注入类型
+MEMORY_INJECTION_KEY = "memory_injection"
+MEMORY_INJECTION_CONTEXT = "context"
+MEMORY_INJECTION_WRITE_REMINDER = "write_reminder"
+
+# 旧版本未打标记的注入消息按前缀识别
+_LEGACY_INJECTION_PREFIXES = {
+    "相关长期记忆（命名空间：": MEMORY_INJECTION_CONTEXT,
+    "未在长期记忆中检索到相关内容": MEMORY_INJECTION_CONTEXT,
+    "请评估当前对话是否包含值得写入长期记忆": MEMORY_INJECTION_WRITE_REMINDER,
+}
+
+_SUMMARY_PROMPT = (
+    "请将以下内容压缩为不超过 {max_tokens} 个 token 的要点摘要，"
+    "保留数值、表名、字段名、文件路径等后续步骤可能用到的关键信息，不要添加原文没有的内容：\n\n{content}"
+)
+
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(
+            block.get("text", "") if isinstance(block, dict) else str(block) for block in content
+        )
+    return str(content)
+
+
+def memory_injection_kind(message: BaseMessage) -> Optional[str]:
+    """返回记忆注入消息的类型，非注入消息返回 None"""
+    if not isinstance(message, SystemMessage):
+        return None
+    kind = message.additional_kwargs.get(MEMORY_INJECTION_KEY)
+    if kind:
+        return kind
+    text = _message_text(message)
+    for prefix, legacy_kind in _LEGACY_INJECTION_PREFIXES.items():
+        if text.startswith(prefix):
+            return legacy_kind
+    return None
+
+
+class MessageCompactor:
+    """
+    按 token 预算压缩送入 LLM 的消息历史，不修改图状态本身。
+
+    压缩依次进行，预算满足即停止：
+    1. 重复的记忆注入消息只保留每种类型的最新一条；
+    2. 最近窗口之外、超过长度上限的工具输出替换为摘要；
+    3. 仍超预算时，从最早的消息组（AI 工具调用及其工具结果视为一组）开始丢弃，
+       并以一条摘要消息代替被丢弃的内容；记忆注入消息与最后一条用户消息始终保留。
+    最近 keep_recent 条消息不做压缩，因此预算对最近窗口是软约束。
+    摘要按原文哈希缓存，同一段内容只摘要一次。
+    """
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        keep_recent: int = 6,
+        tool_output_max_tokens: int = 300,
+        summarizer: Any = None,
+        use_llm_summary: Optional[bool] = None,
+        token_counter: Optional[Callable[[str], int]] = None,
+        cache_size: int = 512,
+    ) -> None:
+        self.token_budget = int(token_budget or os.getenv("MESSAGE_TOKEN_BUDGET", "8000"))
+        self.keep_recent = keep_recent
+        self.tool_output_max_tokens = tool_output_max_tokens
+        if use_llm_summary is None:
+            use_llm_summary = os.getenv("MESSAGE_COMPACTION_LLM_SUMMARY", "false").lower() == "true"
+        self.use_llm_summary = use_llm_summary
+        self._summarizer = summarizer
+        self._token_counter = token_counter
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "calls": 0,
+            "compacted_calls": 0,
+            "tokens_before": 0,
+            "tokens_after": 0,
+            "summary_cache_hits": 0,
+            "summaries": 0,
+        }
+
+    # ------------------------------
+    # token 计数与摘要
+    # ------------------------------
+    def _count_text(self, text: str) -> int:
+        if self._token_counter is None:
+            return get_token_counter().count(text)
+        return self._token_counter(text)
+
+    def count_message(self, message: BaseMessage) -> int:
+        tokens = MESSAGE_OVERHEAD_TOKENS + self._count_text(_message_text(message))
+        if isinstance(message, AIMessage) and message.tool_calls:
+            tokens += sum(self._count_text(str(call.get("args", ""))) for call in message.tool_calls)
+        return tokens
+
+    def count_messages(self, messages: Sequence[BaseMessage]) -> int:
+        if self._token_counter is None:
+            # 共享计数服务：整批消息一次批量计数，重复内容直接命中缓存
+            return get_token_counter().count_messages(messages)
+        return sum(self.count_message(m) for m in messages)
+
+    def _get_summarizer(self):
+        if self._summarizer is None:
+            from common.get_models import get_chat_model
+            # 摘要是确定性任务，temperature=0 同时可命中本地响应缓存
+            self._summarizer = get_chat_model(temperature=0)
+        return self._summarizer
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        # 按字符粗略截断，再用 tokenizer 校正
+        limit = max(1, max_tokens * 2)
+        head = text[:limit]
+        while len(head) > 1 and self._count_text(head) > max_tokens:
+            head = head[: int(len(head) * 0.8)]
+        return head
+
+    def summarize(self, text: str, max_tokens: int) -> str:
+        if self._count_text(text) <= max_tokens:
+            return text
+        key = hashlib.sha256(f"{max_tokens}\x00{text}".encode("utf-8")).hexdigest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats["summary_cache_hits"] += 1
+                return cached
+
+        summary = None
+        if self.use_llm_summary:
+            try:
+                response = self._get_summarizer().invoke(
+                    _SUMMARY_PROMPT.format(max_tokens=max_tokens, content=text)
+                )
+                summary = _message_text(response).strip() or None
+            except Exception:
+                summary = None
+        if summary is None:
+            total = self._count_text(text)
+            summary = f"{self._truncate(text, max_tokens)}\n……（原文约 {total} tokens，已截断）"
+
+        with self._lock:
+            self._cache[key] = summary
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+            self.stats["summaries"] += 1
+        return summary
+
+    # ------------------------------
+    # 压缩步骤
+    # ------------------------------
+    def _collapse_memory_injections(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        latest: Dict[str, int] = {}
+        for idx, message in enumerate(messages):
+            kind = memory_injection_kind(message)
+            if kind:
+                latest[kind] = idx
+        keep = set(latest.values())
+        return [
+            m for idx, m in enumerate(messages)
+            if memory_injection_kind(m) is None or idx in keep
+        ]
+
+    def _recent_start(self, messages: List[BaseMessage]) -> int:
+        start = max(0, len(messages) - self.keep_recent)
+        # 不拆开工具调用与其结果：窗口起点落在 ToolMessage 上时回退到对应的 AI 消息
+        while start > 0 and isinstance(messages[start], ToolMessage):
+            start -= 1
+        return start
+
+    def _shrink_tool_outputs(self, messages: List[BaseMessage], recent_start: int) -> List[BaseMessage]:
+        shrunk: List[BaseMessage] = []
+        for idx, message in enumerate(messages):
+            if (
+                idx < recent_start
+                and isinstance(message, ToolMessage)
+                and self._count_text(_message_text(message)) > self.tool_output_max_tokens
+            ):
+                message = message.model_copy(
+                    update={"content": self.summarize(_message_text(message), self.tool_output_max_tokens)}
+                )
+            shrunk.append(message)
+        return shrunk
+
+    def _group(self, messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+        groups: List[List[BaseMessage]] = []
+        for message in messages:
+            if isinstance(message, ToolMessage) and groups:
+                groups[-1].append(message)
+            else:
+                groups.append([message])
+        return groups
+
+    def _drop_oldest(self, messages: List[BaseMessage], recent_start: int, total: int) -> List[BaseMessage]:
+        old, recent = messages[:recent_start], messages[recent_start:]
+        # 记忆注入消息与最后一条用户消息不参与丢弃
+        last_human = max((idx for idx, m in enumerate(messages) if m.type == "human"), default=-1)
+        groups = self._group(old)
+        offsets = []
+        offset = 0
+        for group in groups:
+            offsets.append(offset)
+            offset += len(group)
+
+        dropped_groups = set()
+        dropped: List[BaseMessage] = []
+        for gidx, group in enumerate(groups):
+            if total <= self.token_budget:
+                break
+            if memory_injection_kind(group[0]) or offsets[gidx] == last_human:
+                continue
+            dropped_groups.add(gidx)
+            dropped.extend(group)
+            total -= self.count_messages(group)
+        if not dropped:
+            return messages
+
+        kept = [m for gidx, group in enumerate(groups) if gidx not in dropped_groups for m in group]
+        transcript = "\n".join(f"[{m.type}] {_message_text(m)}" for m in dropped if _message_text(m))
+        summary = SystemMessage(
+            content=f"较早的 {len(dropped)} 条对话已压缩，摘要如下：\n"
+            + self.summarize(transcript, self.tool_output_max_tokens)
+        )
+        return [summary, *kept, *recent]
+
+    def compact(self, messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        messages = list(messages)
+        before = self.count_messages(messages)
+        self.stats["calls"] += 1
+        self.stats["tokens_before"] += before
+        if before <= self.token_budget:
+            self.stats["tokens_after"] += before
+            return messages
+
+        compacted = self._collapse_memory_injections(messages)
+        total = self.count_messages(compacted)
+        if total > self.token_budget:
+            recent_start = self._recent_start(compacted)
+            compacted = self._shrink_tool_outputs(compacted, recent_start)
+            total = self.count_messages(compacted)
+            if total > self.token_budget:
+                compacted = self._drop_oldest(compacted, recent_start, total)
+                total = self.count_messages(compacted)
+
+        self.stats["compacted_calls"] += 1
+        self.stats["tokens_after"] += total
+        return compacted
+
+    # ------------------------------
+    # 挂到 create_react_agent 上
+    # ------------------------------
+    def _hook(self, state: Any) -> Dict[str, Any]:
+        messages = state.get("messages", []) if isinstance(state, dict) else getattr(state, "messages", [])
+        # 写入 llm_input_messages 只影响本次 LLM 输入，不改动图状态中的完整历史
+        return {"llm_input_messages": self.compact(messages)}
+
+    async def _ahook(self, state: Any) -> Dict[str, Any]:
+        import asyncio
+        return await asyncio.to_thread(self._hook, state)
+
+    def as_pre_model_hook(self) -> RunnableLambda:
+        """作为 create_react_agent 的 pre_model_hook 使用"""
+        return RunnableLambda(self._hook, afunc=self._ahook, name="message_compaction")
+
+
+def create_compaction_hook(token_budget: Optional[int] = None, **kwargs: Any) -> RunnableLambda:
+    return MessageCompactor(token_budget=token_budget, **kwargs).as_pre_model_hook()
@@ -1,28 +1,39 @@
 import os
-import pandas as pd
-from typing import Dict, Any, List
-from mysql.connector import pooling, Error
+import threading
+from typing import Dict, Any, List, TYPE_CHECKING
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 class MySQLConnectionManager:
-    """MySQL数据库连接管理器，实现单例模式"""
+    """MySQL数据库连接管理器，实现单例模式；连接池在首次获取连接时创建"""
     
     _instance = None
+    # 多个线程同时首次获取单例时，保证只创建、初始化一次
+    _instance_lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(MySQLConnectionManager, cls).__new__(cls)
-            cls._instance._initialized = False
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super(MySQLConnectionManager, cls).__new__(cls)
+                    instance._initialized = False
+                    cls._instance = instance
         return cls._instance
     
     def __init__(self):
         """
         初始化MySQL连接管理器。
-        从环境变量加载配置并创建连接池。
+        从环境变量加载配置，连接池延迟到首次使用时创建。
         """
         if self._initialized:
             return
-            
+        with self._instance_lock:
+            if not self._initialized:
+                self._initialize()
+
+    def _initialize(self):
         load_dotenv()
         
         self.db_config = {
@@ -33,21 +44,35 @@ class MySQLConnectionManager:
             'database': os.getenv('MYSQL_DATABASE'),
         }
 
-        try:
-            self.pool = pooling.MySQLConnectionPool(
-                pool_name="mysql_pool",
-                pool_size=5,
-                **self.db_config
-            )
-            print("MySQL connection pool created successfully.")
-        except Error as e:
-            print(f"Error while creating MySQL connection pool: {e}")
-            self.pool = None
+        self._pool = None
+        self._pool_created = False
+        self._pool_lock = threading.Lock()
 
         self._initialized = True
 
+    @property
+    def pool(self):
+        """MySQL连接池，首次访问时创建；创建失败时为None且不再重试"""
+        if not self._pool_created:
+            with self._pool_lock:
+                if not self._pool_created:
+                    from mysql.connector import pooling, Error
+                    try:
+                        self._pool = pooling.MySQLConnectionPool(
+                            pool_name="mysql_pool",
+                            pool_size=5,
+                            **self.db_config
+                        )
+                        print("MySQL connection pool created successfully.")
+                    except Error as e:
+                        print(f"Error while creating MySQL connection pool: {e}")
+                        self._pool = None
+                    self._pool_created = True
+        return self._pool
+
     def get_connection(self):
         """从连接池获取一个数据库连接"""
+        from mysql.connector import Error
         if self.pool:
             try:
                 return self.pool.get_connection()
@@ -56,7 +81,7 @@ class MySQLConnectionManager:
                 return None
         return None
 
-    def execute_query(self, query: str, params: tuple = None) -> pd.DataFrame:
+    def execute_query(self, query: str, params: tuple = None) -> "pd.DataFrame":
         """
         执行SQL查询并返回结果作为pandas DataFrame。
 
@@ -67,6 +92,9 @@ class MySQLConnectionManager:
         返回:
             pd.DataFrame: 查询结果。
         """
+        import pandas as pd
+        from mysql.connector import Error
+
         conn = self.get_connection()
         if not conn:
             return pd.DataFrame()
@@ -98,6 +126,8 @@ class MySQLConnectionManager:
         返回:
             bool: 操作是否成功。
         """
+        from mysql.connector import Error
+
         conn = self.get_connection()
         if not conn:
             return False
@@ -130,9 +160,6 @@ class MySQLConnectionManager:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
 
-# 提供便捷的全局访问点
-mysql_db_manager = MySQLConnectionManager()
-
 def get_db_manager() -> MySQLConnectionManager:
-    """获取MySQL数据库连接管理器实例"""
-    return mysql_db_manager
\ No newline at end of file
+    """获取MySQL数据库连接管理器实例（单例，连接池在首次使用时创建）"""
+    return MySQLConnectionManager()
\ No newline at end of file
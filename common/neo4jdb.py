@@ -1,27 +1,41 @@
 import os
-from typing import Dict, Any
-import pandas as pd
-from neo4j import GraphDatabase, Result
-from langchain_neo4j import Neo4jGraph
+import threading
+from typing import Dict, Any, TYPE_CHECKING
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 class DBConnectionManager:
-    """数据库连接管理器，实现单例模式"""
+    """
+    数据库连接管理器，实现单例模式
+
+    驱动与 LangChain 图实例都在首次使用时才创建，导入本模块不会建立任何连接。
+    """
     
     _instance = None
+    # 多个线程同时首次获取单例时，保证只创建、初始化一次
+    _instance_lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(DBConnectionManager, cls).__new__(cls)
-            cls._instance._initialized = False
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super(DBConnectionManager, cls).__new__(cls)
+                    instance._initialized = False
+                    cls._instance = instance
         return cls._instance
     
     def __init__(self):
         # 避免重复初始化
         if self._initialized:
             return
-            
+        with self._instance_lock:
+            if not self._initialized:
+                self._initialize()
+
+    def _initialize(self):
         # 加载环境变量
         load_dotenv()
         
@@ -33,19 +47,10 @@ class DBConnectionManager:
         # 测试neo4j连接
         # self._test_connection()
         
-        # 初始化Neo4j驱动
-        self.driver = GraphDatabase.driver(
-            self.neo4j_uri,
-            auth=(self.neo4j_username, self.neo4j_password)
-        )
-        
-        # 初始化LangChain Neo4j图实例
-        self.graph = Neo4jGraph(
-            url=self.neo4j_uri,
-            username=self.neo4j_username,
-            password=self.neo4j_password,
-            refresh_schema=False,
-        )
+        # Neo4j驱动与LangChain图实例延迟创建
+        self._driver = None
+        self._graph = None
+        self._conn_lock = threading.Lock()
         
         # 连接池配置
         self.session_pool = []
@@ -54,6 +59,34 @@ class DBConnectionManager:
         # 标记为已初始化
         self._initialized = True
     
+    @property
+    def driver(self):
+        """Neo4j驱动实例，首次访问时创建"""
+        if self._driver is None:
+            with self._conn_lock:
+                if self._driver is None:
+                    from neo4j import GraphDatabase
+                    self._driver = GraphDatabase.driver(
+                        self.neo4j_uri,
+                        auth=(self.neo4j_username, self.neo4j_password)
+                    )
+        return self._driver
+
+    @property
+    def graph(self):
+        """LangChain Neo4j图实例，首次访问时创建"""
+        if self._graph is None:
+            with self._conn_lock:
+                if self._graph is None:
+                    from langchain_neo4j import Neo4jGraph
+                    self._graph = Neo4jGraph(
+                        url=self.neo4j_uri,
+                        username=self.neo4j_username,
+                        password=self.neo4j_password,
+                        refresh_schema=False,
+                    )
+        return self._graph
+
     def get_driver(self):
         """获取Neo4j驱动实例"""
         return self.driver
@@ -62,7 +95,7 @@ class DBConnectionManager:
         """获取LangChain Neo4j图实例"""
         return self.graph
     
-    def execute_query(self, cypher: str, params: Dict[str, Any] = {}) -> pd.DataFrame:
+    def execute_query(self, cypher: str, params: Dict[str, Any] = {}) -> "pd.DataFrame":
         """
         执行Cypher查询并返回结果
         
@@ -73,6 +106,7 @@ class DBConnectionManager:
         返回:
             pd.DataFrame: 查询结果DataFrame
         """
+        from neo4j import Result
         return self.driver.execute_query(
             cypher,
             parameters_=params,
@@ -118,9 +152,10 @@ class DBConnectionManager:
         # 清空池
         self.session_pool = []
         
-        # 关闭驱动
-        if self.driver:
-            self.driver.close()
+        # 关闭驱动（从未使用过则无需创建后再关闭）
+        if self._driver:
+            self._driver.close()
+            self._driver = None
     
     def __enter__(self):
         """上下文管理器入口"""
@@ -131,6 +166,7 @@ class DBConnectionManager:
         self.close()
 
     def _test_connection(self):
+        from neo4j import GraphDatabase
         try:
             driver = GraphDatabase.driver(self.neo4j_uri, auth=(self.neo4j_username, self.neo4j_password))
             driver.verify_connectivity()  # 验证连接
@@ -139,13 +175,9 @@ class DBConnectionManager:
         except Exception as e:
             print(f"❌ 连接失败：{str(e)}")
 
-# 提供便捷的全局访问点
-db_manager = DBConnectionManager()
-
-
 def get_db_manager() -> DBConnectionManager:
-    """获取数据库连接管理器实例"""
-    return db_manager
+    """获取数据库连接管理器实例（单例，首次调用时创建，连接在首次使用时建立）"""
+    return DBConnectionManager()
 
 # if __name__ == "__main__":
-#     db_manager._test_connection()
+#     get_db_manager()._test_connection()
@@ -0,0 +1,213 @@
+"""
+按轮次的投机预取。
+
+用户输入一进入图（supervisor 的 turn_start 节点），就在后台线程池中并行发起后续智能体大概率会做的查询：
+数据库表清单与表结构、长期记忆检索、Neo4j 向量检索等。结果按轮次缓存，
+随后无论路由到哪个智能体，其前几次工具调用只要参数相同即直接取用（若仍在执行则等待其完成，尚在排队则取消并直接查询）。
+
+预取项由各智能体通过 register() 注册；工具内部通过 take(key, loader) 读取，未命中时照常执行 loader。
+轮次结束（同一会话开始下一轮或超时）时，未被取用的预取项计为浪费。
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PrefetchKey = Tuple[Hashable, ...]
+
+
+class _Entry:
+    __slots__ = ("kind", "future", "used")
+
+    def __init__(self, kind: str, future: Future) -> None:
+        self.kind = kind
+        self.future = future
+        self.used = False
+
+
+class PrefetchTurn:
+    """一轮对话的预取结果；预取函数通过 submit 提交查询，可在执行中继续提交后续查询"""
+
+    def __init__(self, prefetcher: "SpeculativePrefetcher", session_key: str, question: str, namespace: Optional[str]) -> None:
+        self.prefetcher = prefetcher
+        self.session_key = session_key
+        self.question = question
+        self.namespace = namespace
+        self.started = time.monotonic()
+        self.closed = False
+        self.entries: Dict[PrefetchKey, _Entry] = {}
+
+    def submit(self, key: PrefetchKey, loader: Callable[[], Any]) -> None:
+        """后台执行 loader，结果以 key 缓存；key 的第一个元素为查询类型，用于分类统计"""
+        self.prefetcher._submit(self, key, loader)
+
+
+class SpeculativePrefetcher:
+    """进程内共享的投机预取服务"""
+
+    def __init__(self, max_workers: Optional[int] = None, turn_ttl: Optional[float] = None, enabled: Optional[bool] = None) -> None:
+        self.enabled = enabled if enabled is not None else os.getenv("SPECULATIVE_PREFETCH", "true").lower() == "true"
+        self.turn_ttl = float(turn_ttl or os.getenv("PREFETCH_TURN_TTL", "300"))
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(max_workers or os.getenv("PREFETCH_WORKERS", "4")),
+            thread_name_prefix="prefetch",
+        )
+        self._lock = threading.Lock()
+        self._speculators: Dict[str, Callable[[PrefetchTurn], None]] = {}
+        self._turns: Dict[str, PrefetchTurn] = {}
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"issued": 0, "used": 0, "wasted": 0, "errors": 0, "hits": 0, "misses": 0}
+        )
+
+    def register(self, name: str, speculator: Callable[[PrefetchTurn], None]) -> None:
+        """注册预取函数，同名覆盖（智能体重复实例化时不会重复预取）"""
+        with self._lock:
+            self._speculators[name] = speculator
+
+    # ------------------------------
+    # 轮次
+    # ------------------------------
+    def start_turn(self, session_key: str, question: str, namespace: Optional[str] = None) -> Optional[PrefetchTurn]:
+        """新的用户消息到达时调用：结束该会话上一轮，并发起本轮全部预取"""
+        if not self.enabled or not question:
+            return None
+        turn = PrefetchTurn(self, session_key, question, namespace)
+        now = time.monotonic()
+        with self._lock:
+            expired = [t for t in self._turns.values() if now - t.started > self.turn_ttl]
+            previous = self._turns.pop(session_key, None)
+            for old in expired:
+                self._turns.pop(old.session_key, None)
+            self._turns[session_key] = turn
+            speculators = list(self._speculators.items())
+        for old in {id(t): t for t in [previous, *expired] if t is not None}.values():
+            self._close(old)
+        for name, speculator in speculators:
+            try:
+                speculator(turn)
+            except Exception as e:
+                logger.warning("预取 %s 发起失败: %s", name, e)
+        return turn
+
+    def end_turn(self, session_key: str) -> None:
+        with self._lock:
+            turn = self._turns.pop(session_key, None)
+        if turn is not None:
+            self._close(turn)
+
+    def invalidate(self, prefix: PrefetchKey) -> None:
+        """数据被修改后丢弃以 prefix 开头的预取结果（如写入记忆后的记忆检索）"""
+        with self._lock:
+            for turn in self._turns.values():
+                for key in [k for k in turn.entries if k[:len(prefix)] == prefix]:
+                    entry = turn.entries.pop(key)
+                    self._stats[entry.kind]["used" if entry.used else "wasted"] += 1
+                    entry.future.cancel()
+
+    def _submit(self, turn: PrefetchTurn, key: PrefetchKey, loader: Callable[[], Any]) -> None:
+        kind = str(key[0])
+        with self._lock:
+            if turn.closed or key in turn.entries:
+                return
+            future = self._executor.submit(loader)
+            turn.entries[key] = _Entry(kind, future)
+            self._stats[kind]["issued"] += 1
+
+    def _close(self, turn: PrefetchTurn) -> None:
+        with self._lock:
+            turn.closed = True
+            for entry in turn.entries.values():
+                if entry.used:
+                    self._stats[entry.kind]["used"] += 1
+                else:
+                    self._stats[entry.kind]["wasted"] += 1
+                    entry.future.cancel()  # 尚未开始执行的直接取消
+
+    def _lookup(self, key: PrefetchKey) -> Optional[_Entry]:
+        with self._lock:
+            # 最近开始的轮次优先
+            for turn in sorted(self._turns.values(), key=lambda t: t.started, reverse=True):
+                entry = turn.entries.get(key)
+                if entry is not None and not entry.future.cancelled():
+                    entry.used = True
+                    self._stats[entry.kind]["hits"] += 1
+                    return entry
+            self._stats[str(key[0])]["misses"] += 1
+        return None
+
+    def _claim(self, entry: _Entry) -> bool:
+        """
+        命中的预取已在执行或已完成时返回 True。
+        仍在排队时取消它并返回 False，改为直接查询（按未命中计）：
+        线程池由所有会话共享，排在其他会话的预取之后等待反而比直接查询更慢。
+        """
+        if not entry.future.cancel():
+            return True
+        with self._lock:
+            entry.used = False
+            self._stats[entry.kind]["hits"] -= 1
+            self._stats[entry.kind]["misses"] += 1
+        return False
+
+    def _failed(self, entry: _Entry, error: BaseException) -> None:
+        logger.warning("预取结果不可用，改为直接查询: %s", error)
+        with self._lock:
+            self._stats[entry.kind]["hits"] -= 1
+            self._stats[entry.kind]["misses"] += 1
+            self._stats[entry.kind]["errors"] += 1
+
+    # ------------------------------
+    # 读取
+    # ------------------------------
+    def take(self, key: PrefetchKey, loader: Callable[[], Any]) -> Any:
+        """命中预取结果则直接返回（仍在执行时等待完成），未命中或预取尚未开始执行时执行 loader"""
+        entry = self._lookup(key) if self.enabled else None
+        if entry is not None and self._claim(entry):
+            try:
+                return entry.future.result()
+            except Exception as e:
+                self._failed(entry, e)
+        return loader()
+
+    async def atake(self, key: PrefetchKey, aloader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._lookup(key) if self.enabled else None
+        if entry is not None and self._claim(entry):
+            try:
+                return await asyncio.wrap_future(entry.future)
+            except Exception as e:
+                self._failed(entry, e)
+        return await aloader()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        按查询类型统计：
+            hit_rate: 工具查询中由预取结果满足的比例
+            waste_rate: 已结束轮次中预取了却没有被取用的比例
+        """
+        with self._lock:
+            report: Dict[str, Dict[str, Any]] = {}
+            for kind, s in self._stats.items():
+                lookups = s["hits"] + s["misses"]
+                closed = s["used"] + s["wasted"]
+                report[kind] = {
+                    **s,
+                    "hit_rate": s["hits"] / lookups if lookups else 0.0,
+                    "waste_rate": s["wasted"] / closed if closed else 0.0,
+                }
+            return report
+
+
+def get_prefetcher() -> SpeculativePrefetcher:
+    """获取进程内共享的预取服务"""
+    from common.get_models import _registry_key, model_registry
+    return model_registry.get_or_create(_registry_key("prefetcher", None), SpeculativePrefetcher)
@@ -0,0 +1,315 @@
+"""
+数据库表结构的向量索引。
+
+对每张表（表名 + 表注释 + 字段概要）以及每个字段（表名.字段名 + 类型 + 字段注释）各生成一段描述文本并做 embedding，
+按问题检索最相关的表与字段，输出只包含这些表的精简 DDL 与样例行，
+使 Text2SQL 智能体一次工具调用即可拿到生成 SQL 所需的全部上下文。
+
+向量按表结构指纹缓存到磁盘，表结构不变时进程重启无需重新计算；
+反射结果在 SCHEMA_INDEX_TTL 秒内复用，超时后重新反射，表结构变化时自动重建。
+重建时整体替换一份不可变快照（SchemaSnapshot），并发检索各自使用取到的快照，不会读到新旧混合的表与向量。
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_INDEX_DIR = "./cache/schema_index"
+
+# 表分数 = 表描述相似度与最相关字段相似度的加权和；问题中直接出现表名时加分
+TABLE_WEIGHT = 0.5
+NAME_MENTION_BONUS = 0.3
+
+
+@dataclass
+class ColumnInfo:
+    name: str
+    type: str
+    comment: str = ""
+    primary_key: bool = False
+    nullable: bool = True
+    foreign_key: bool = False
+
+
+@dataclass
+class TableInfo:
+    name: str
+    comment: str = ""
+    columns: List[ColumnInfo] = field(default_factory=list)
+
+
+@dataclass
+class TableMatch:
+    table: TableInfo
+    score: float
+    columns: List[ColumnInfo]  # 按相关度筛选、按原表顺序排列
+    omitted: int = 0
+
+
+@dataclass(frozen=True)
+class SchemaSnapshot:
+    """一次构建的结果：表结构、表向量、字段向量及字段向量行 -> (表序号, 字段序号)"""
+    fingerprint: str = ""
+    tables: Tuple[TableInfo, ...] = ()
+    table_vectors: Any = None
+    column_vectors: Any = None
+    column_owner: Tuple[Tuple[int, int], ...] = ()
+
+
+def _table_text(table: TableInfo) -> str:
+    columns = "、".join(f"{c.name}({c.comment})" if c.comment else c.name for c in table.columns)
+    return f"表 {table.name}：{table.comment}。字段：{columns}"
+
+
+def _column_text(table: TableInfo, column: ColumnInfo) -> str:
+    return f"{table.name}.{column.name} {column.type} {column.comment}".strip()
+
+
+class SchemaIndex:
+    """
+    参数:
+        engine: SQLAlchemy Engine（如 SQLDatabase._engine）
+        embeddings: LangChain Embeddings，默认使用共享的 embedding 模型
+        table_names: 只索引这些表，默认全部
+        max_columns: 宽表只输出主键与最相关的前 max_columns 个字段
+    """
+
+    def __init__(
+        self,
+        engine: Any,
+        embeddings: Any = None,
+        table_names: Optional[Sequence[str]] = None,
+        index_dir: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_columns: int = 30,
+    ) -> None:
+        self.engine = engine
+        self._embeddings = embeddings
+        self.table_names = list(table_names) if table_names else None
+        self.index_dir = Path(index_dir or os.getenv("SCHEMA_INDEX_DIR", DEFAULT_INDEX_DIR))
+        self.ttl = float(ttl if ttl is not None else os.getenv("SCHEMA_INDEX_TTL", "600"))
+        self.max_columns = max_columns
+        self._lock = threading.Lock()
+        self._built_at = 0.0
+        self._snapshot = SchemaSnapshot()
+        self._samples_lock = threading.Lock()
+        self._samples: Dict[Tuple[str, Tuple[str, ...], int], List[Tuple]] = {}
+
+    @property
+    def fingerprint(self) -> str:
+        return self._snapshot.fingerprint
+
+    @property
+    def tables(self) -> Tuple[TableInfo, ...]:
+        return self._snapshot.tables
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from common.get_models import get_embeddings_model
+            self._embeddings = get_embeddings_model()
+        return self._embeddings
+
+    # ------------------------------
+    # 构建
+    # ------------------------------
+    def reflect(self) -> List[TableInfo]:
+        from sqlalchemy import inspect
+        inspector = inspect(self.engine)
+        names = self.table_names or sorted(inspector.get_table_names())
+        tables = []
+        for name in names:
+            try:
+                comment = (inspector.get_table_comment(name) or {}).get("text") or ""
+            except NotImplementedError:
+                comment = ""
+            primary = set((inspector.get_pk_constraint(name) or {}).get("constrained_columns") or [])
+            foreign = {col for fk in inspector.get_foreign_keys(name) for col in fk.get("constrained_columns") or []}
+            columns = [
+                ColumnInfo(
+                    name=col["name"],
+                    type=str(col["type"]),
+                    comment=col.get("comment") or "",
+                    primary_key=col["name"] in primary,
+                    nullable=bool(col.get("nullable", True)),
+                    foreign_key=col["name"] in foreign,
+                )
+                for col in inspector.get_columns(name)
+            ]
+            tables.append(TableInfo(name=name, comment=comment, columns=columns))
+        return tables
+
+    def _fingerprint(self, tables: List[TableInfo]) -> str:
+        payload = json.dumps(
+            [[t.name, t.comment, [[c.name, c.type, c.comment, c.primary_key] for c in t.columns]] for t in tables],
+            ensure_ascii=False,
+        )
+        model = str(getattr(self.embeddings, "model_name", type(self.embeddings).__name__))
+        return hashlib.sha1(f"{model}\x00{payload}".encode("utf-8")).hexdigest()[:16]
+
+    def _embed(self, tables: List[TableInfo], fingerprint: str):
+        """计算（或从磁盘缓存读取）表向量与字段向量"""
+        import numpy as np
+        path = self.index_dir / f"{fingerprint}.npz"
+        if path.exists():
+            data = np.load(path)
+            return data["tables"], data["columns"]
+
+        table_docs = [_table_text(t) for t in tables]
+        column_docs = [_column_text(t, c) for t in tables for c in t.columns]
+        vectors = np.asarray(self.embeddings.embed_documents(table_docs + column_docs), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+        table_vectors, column_vectors = vectors[:len(table_docs)], vectors[len(table_docs):]
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(tmp, tables=table_vectors, columns=column_vectors)
+        os.replace(tmp, path)
+        return table_vectors, column_vectors
+
+    def build(self, force: bool = False) -> "SchemaIndex":
+        """反射表结构并加载向量；TTL 内重复调用直接返回"""
+        self.snapshot(force)
+        return self
+
+    def snapshot(self, force: bool = False) -> SchemaSnapshot:
+        """构建（TTL 内直接复用）并返回当前快照；调用方在整个检索过程中只使用这一份"""
+        with self._lock:
+            if not force and self._snapshot.tables and time.monotonic() - self._built_at < self.ttl:
+                return self._snapshot
+            tables = self.reflect()
+            fingerprint = self._fingerprint(tables)
+            if fingerprint != self._snapshot.fingerprint:
+                table_vectors, column_vectors = self._embed(tables, fingerprint)
+                table_vectors.setflags(write=False)
+                column_vectors.setflags(write=False)
+                self._snapshot = SchemaSnapshot(
+                    fingerprint=fingerprint,
+                    tables=tuple(tables),
+                    table_vectors=table_vectors,
+                    column_vectors=column_vectors,
+                    column_owner=tuple((ti, ci) for ti, t in enumerate(tables) for ci in range(len(t.columns))),
+                )
+                with self._samples_lock:
+                    self._samples.clear()
+            self._built_at = time.monotonic()
+            return self._snapshot
+
+    # ------------------------------
+    # 检索
+    # ------------------------------
+    def search(self, question: str, top_k: int = 3) -> List[TableMatch]:
+        import numpy as np
+        snapshot = self.snapshot()
+        if not snapshot.tables:
+            return []
+        query = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        table_sims = snapshot.table_vectors @ query
+        column_sims = snapshot.column_vectors @ query if len(snapshot.column_vectors) else np.zeros(0)
+
+        per_table: List[List[Tuple[float, int]]] = [[] for _ in snapshot.tables]
+        for row, (ti, ci) in enumerate(snapshot.column_owner):
+            per_table[ti].append((float(column_sims[row]), ci))
+
+        lowered = question.lower()
+        matches = []
+        for ti, table in enumerate(snapshot.tables):
+            best_column = max((s for s, _ in per_table[ti]), default=0.0)
+            score = TABLE_WEIGHT * float(table_sims[ti]) + (1 - TABLE_WEIGHT) * best_column
+            # 只按 ASCII 边界判断，中文紧跟表名（如“data_test表”）也算提及
+            if re.search(rf"(?<![a-z0-9_]){re.escape(table.name.lower())}(?![a-z0-9_])", lowered):
+                score += NAME_MENTION_BONUS
+            matches.append((score, ti))
+
+        results = []
+        for score, ti in sorted(matches, reverse=True)[:top_k]:
+            table = snapshot.tables[ti]
+            if len(table.columns) <= self.max_columns:
+                keep = set(range(len(table.columns)))
+            else:
+                keep = {ci for ci, c in enumerate(table.columns) if c.primary_key}
+                for _, ci in sorted(per_table[ti], reverse=True):
+                    if len(keep) >= self.max_columns:
+                        break
+                    keep.add(ci)
+            columns = [c for ci, c in enumerate(table.columns) if ci in keep]
+            results.append(TableMatch(table, round(score, 4), columns, len(table.columns) - len(columns)))
+        return results
+
+    def sample_rows(self, table: str, columns: Sequence[str], limit: int = 3) -> List[Tuple]:
+        """表的前几行样例，在表结构不变期间缓存"""
+        if limit <= 0:
+            return []
+        key = (table, tuple(columns), limit)
+        with self._samples_lock:
+            cached = self._samples.get(key)
+        if cached is not None:
+            return cached
+        from sqlalchemy import text
+        quote = self.engine.dialect.identifier_preparer.quote
+        sql = f"SELECT {', '.join(quote(c) for c in columns)} FROM {quote(table)} LIMIT {int(limit)}"
+        with self.engine.connect() as conn:
+            rows = [tuple(row) for row in conn.execute(text(sql)).fetchall()]
+        with self._samples_lock:
+            self._samples[key] = rows
+        return rows
+
+    def render(self, question: str, top_k: int = 3, sample_rows: int = 3, max_value_chars: int = 40) -> str:
+        """最相关表的精简 DDL（附字段注释）与样例行"""
+        return self.render_matches(self.search(question, top_k=top_k), sample_rows, max_value_chars)
+
+    def render_matches(self, matches: Sequence[TableMatch], sample_rows: int = 3, max_value_chars: int = 40) -> str:
+        blocks = []
+        for match in matches:
+            table = match.table
+            lines = [f"-- 相关度 {match.score}"]
+            lines.append(f"CREATE TABLE {table.name} (" + (f"  -- {table.comment}" if table.comment else ""))
+            for position, column in enumerate(match.columns, 1):
+                definition = f"  {column.name} {column.type}"
+                if column.primary_key:
+                    definition += " PRIMARY KEY"
+                elif not column.nullable:
+                    definition += " NOT NULL"
+                if position < len(match.columns):
+                    definition += ","
+                lines.append(definition + (f"  -- {column.comment}" if column.comment else ""))
+            if match.omitted:
+                lines.append(f"  -- 另有 {match.omitted} 个字段未列出，如需要请用 sql_db_schema 查看")
+            lines.append(");")
+
+            try:
+                rows = self.sample_rows(table.name, [c.name for c in match.columns], sample_rows)
+            except Exception as e:
+                rows = []
+                lines.append(f"/* 样例数据读取失败: {e} */")
+            if rows:
+                def cell(value: Any) -> str:
+                    text = "NULL" if value is None else str(value).replace("\n", " ")
+                    return text if len(text) <= max_value_chars else text[:max_value_chars] + "…"
+                lines.append(f"/* {len(rows)} rows from {table.name}:")
+                lines.append("\t".join(c.name for c in match.columns))
+                lines.extend("\t".join(cell(v) for v in row) for row in rows)
+                lines.append("*/")
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks)
+
+
+def get_schema_index(engine: Any, table_names: Optional[Sequence[str]] = None) -> SchemaIndex:
+    """获取进程内共享的表结构索引，同一数据库只建一次"""
+    from common.get_models import _registry_key, model_registry
+    url = engine.url.render_as_string(hide_password=True)
+    return model_registry.get_or_create(
+        _registry_key("schema_index", url, tables=sorted(table_names or [])),
+        lambda: SchemaIndex(engine, table_names=table_names),
+    )
@@ -0,0 +1,271 @@
+"""
+基于 SIC（Schema Item Classifier，model_trainer/text2sql/preprocess/*/sic_utils.py::MyClassifier）的表结构裁剪。
+
+训练好的分类器在进程内只加载一次（CPU），对每个问题给实时 MySQL 表结构中的每张表、每个字段打相关概率，
+Text2SQL 提示词中只注入前 SIC_TOPK_TABLES 张表、每表前 SIC_TOPK_COLUMNS 个字段（主键、外键始终保留），
+而不是把全部表结构交给 LLM。
+
+表结构的反射与 DDL 渲染复用 common.schema_index.SchemaIndex，其表结构指纹即表结构版本；
+裁剪结果按 (表结构版本, 问题) 精确缓存，并按问题 embedding 做近似复用，表结构变化后旧缓存自然失效。
+未配置 SIC_MODEL_PATH 时不启用。
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+from argparse import Namespace
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+from common.schema_index import ColumnInfo, SchemaIndex, TableInfo, TableMatch, get_schema_index
+
+load_dotenv()
+
+TEXT2SQL_ROOT = Path(__file__).resolve().parent.parent / "model_trainer" / "text2sql"
+
+# 与 preprocess/scripts/train_sic/*.sh 的训练参数一致；检查点目录下的 sic_args.json 可覆盖
+DEFAULT_SIC_ARGS = {
+    "plm_name": "roberta-large",
+    "max_input_len": 512,
+    "plm_hidden_state_dim": 1024,
+    "pooling_function": "attention",
+    "truncation": True,
+    "add_comment": True,
+    "use_comment_enhanced": True,
+    "use_column_enhanced": True,
+    "use_contents": True,
+    "add_fk_info": True,
+}
+
+
+def _normalize(name: str) -> str:
+    """与训练数据中的 table_name / column_names 一致：小写、下划线换成空格"""
+    return name.replace("_", " ").strip().lower()
+
+
+class SchemaItemClassifier:
+    """
+    加载 SIC 检查点并给表、字段打分。
+
+    参数:
+        model_path: train_sic 保存的目录（dense_classifier.pt、config 与 tokenizer）
+        variant: 使用 preprocess 下哪套代码（cosql / sparc），两者模型结构相同
+    """
+
+    def __init__(self, model_path: str, variant: str = "cosql") -> None:
+        import torch
+
+        if str(TEXT2SQL_ROOT) not in sys.path:
+            # 训练代码以 model_trainer/text2sql 为根导入 preprocess.* 与 utils.*，追加到末尾避免遮蔽项目模块
+            sys.path.append(str(TEXT2SQL_ROOT))
+        import importlib
+        sic_utils = importlib.import_module(f"preprocess.{variant}.sic_utils")
+        self._inference = importlib.import_module(f"preprocess.{variant}.inference_sic")
+
+        options = dict(DEFAULT_SIC_ARGS)
+        args_file = Path(model_path) / "sic_args.json"
+        if args_file.exists():
+            options.update(json.loads(args_file.read_text(encoding="utf-8")))
+        options.update(mode="test", model_name_or_path=model_path, original_model_name_or_path=model_path)
+        self.args = Namespace(**options)
+
+        from transformers import AutoTokenizer
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path, add_prefix_space=True)
+        self.model = sic_utils.MyClassifier(self.args, vocab_size=len(self.tokenizer))
+        self.model.load_state_dict(torch.load(Path(model_path) / "dense_classifier.pt", map_location="cpu"))
+        self.model.eval()
+        self._torch = torch
+        self._lock = threading.Lock()
+
+    def _column_info(self, column: ColumnInfo) -> str:
+        name = _normalize(column.name)
+        if self.args.add_fk_info and column.foreign_key:
+            return f"{name} ( [FK] ) "
+        return name
+
+    def _score_once(self, question: str, tables: Sequence[TableInfo]) -> Tuple[List[float], List[List[float]]]:
+        """
+        单次前向。输入超过 max_input_len 时末尾的表/字段会被截掉，
+        返回的表概率、字段概率只覆盖未被截掉的部分。
+        """
+        torch = self._torch
+        column_infos = [[self._column_info(c) for c in t.columns] for t in tables]
+        batch = [(
+            question,
+            [_normalize(t.name) for t in tables],
+            [0] * len(tables),
+            column_infos,
+            [0] * sum(len(cols) for cols in column_infos),
+            # 注释不能为空，缺省时用名称代替
+            [t.comment or _normalize(t.name) for t in tables],
+            [[c.comment or _normalize(c.name) for c in t.columns] for t in tables],
+            0,
+        )]
+        # 训练代码会打印输入 token，并在有 GPU 时把张量放到 GPU 上；这里统一留在 CPU
+        with contextlib.redirect_stdout(io.StringIO()):
+            input_dict = self._inference.prepare_batch_inputs_and_labels(self.args, batch, self.tokenizer, {})
+        for key in ("encoder_input_ids", "encoder_input_attention_mask"):
+            input_dict[key] = input_dict[key].cpu()
+        for key in ("batch_column_labels", "batch_table_labels"):
+            input_dict[key] = [t.cpu() for t in input_dict[key]]
+
+        with torch.no_grad():
+            outputs = self.model(input_dict)
+        table_probs = torch.softmax(outputs["batch_table_name_cls_logits"][0], dim=1)[:, 1].tolist()
+        flat = torch.softmax(outputs["batch_column_info_cls_logits"][0], dim=1)[:, 1].tolist()
+        column_probs, start = [], 0
+        for count in input_dict["batch_column_number_in_each_table"][0]:
+            column_probs.append(flat[start:start + count])
+            start += count
+        return table_probs, column_probs
+
+    def score(self, question: str, tables: Sequence[TableInfo]) -> Tuple[List[float], List[List[float]]]:
+        """
+        返回每张表的相关概率与每个字段的相关概率（与 tables 一一对应）。
+        被截断的表与 inference_sic.filter_post_process 一样另起一轮重新打分。
+        """
+        table_probs: List[float] = [-1.0] * len(tables)
+        column_probs: List[List[float]] = [[-1.0] * len(t.columns) for t in tables]
+        pending = list(range(len(tables)))
+        with self._lock:
+            while pending:
+                part_tables, part_columns = self._score_once(question, [tables[i] for i in pending])
+                finished = 0
+                for offset, ti in enumerate(pending[:len(part_columns)]):
+                    scores = part_columns[offset]
+                    if len(scores) < len(tables[ti].columns) and finished:
+                        break  # 字段被截断，下一轮从这张表开始
+                    table_probs[ti] = part_tables[offset]
+                    column_probs[ti][:len(scores)] = scores
+                    finished += 1
+                if not finished:
+                    # 单张表就超出输入长度，剩余字段无法打分，保持 -1
+                    finished = 1
+                pending = pending[finished:]
+        return table_probs, column_probs
+
+
+class SchemaPruner:
+    """
+    按问题裁剪表结构。
+
+    参数:
+        index: 提供表结构反射、表结构指纹、问题 embedding 与 DDL 渲染的 SchemaIndex
+        classifier: SchemaItemClassifier
+        top_tables / top_columns: 保留的表数、每张表保留的字段数
+    """
+
+    def __init__(
+        self,
+        index: SchemaIndex,
+        classifier: SchemaItemClassifier,
+        top_tables: Optional[int] = None,
+        top_columns: Optional[int] = None,
+        cache_size: Optional[int] = None,
+        similarity: Optional[float] = None,
+    ) -> None:
+        self.index = index
+        self.classifier = classifier
+        self.top_tables = int(top_tables or os.getenv("SIC_TOPK_TABLES", "4"))
+        self.top_columns = int(top_columns or os.getenv("SIC_TOPK_COLUMNS", "5"))
+        self.cache_size = int(cache_size or os.getenv("SIC_CACHE_SIZE", "512"))
+        self.similarity = float(similarity if similarity is not None else os.getenv("SIC_CACHE_SIMILARITY", "0.97"))
+        self._lock = threading.Lock()
+        self._exact: "OrderedDict[Tuple[str, str], List[TableMatch]]" = OrderedDict()
+        self._semantic: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()  # 同键 -> 问题向量
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0}
+
+    def _embed(self, question: str):
+        import numpy as np
+        vector = np.asarray(self.index.embeddings.embed_query(question), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _lookup(self, version: str, question: str) -> Tuple[Optional[List[TableMatch]], Any]:
+        with self._lock:
+            key = (version, question)
+            if key in self._exact:
+                self._exact.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._exact[key], None
+        if self.similarity >= 1.0:
+            return None, None
+        vector = self._embed(question)
+        with self._lock:
+            best, best_key = self.similarity, None
+            for key, cached in self._semantic.items():
+                if key[0] != version:
+                    continue
+                sim = float(cached @ vector)
+                if sim >= best:
+                    best, best_key = sim, key
+            if best_key is not None:
+                self._exact.move_to_end(best_key)
+                self.stats["semantic_hits"] += 1
+                return self._exact[best_key], vector
+        return None, vector
+
+    def _store(self, version: str, question: str, vector: Any, matches: List[TableMatch]) -> None:
+        with self._lock:
+            key = (version, question)
+            self._exact[key] = matches
+            if vector is not None:
+                self._semantic[key] = vector
+            while len(self._exact) > self.cache_size:
+                old, _ = self._exact.popitem(last=False)
+                self._semantic.pop(old, None)
+
+    def _select(self, question: str, tables: Sequence[TableInfo]) -> List[TableMatch]:
+        table_probs, column_probs = self.classifier.score(question, tables)
+        ranked = sorted(range(len(tables)), key=lambda ti: table_probs[ti], reverse=True)[:self.top_tables]
+        matches = []
+        for ti in ranked:
+            table = tables[ti]
+            keep = {ci for ci, c in enumerate(table.columns) if c.primary_key or c.foreign_key}
+            by_prob = sorted(range(len(table.columns)), key=lambda ci: column_probs[ti][ci], reverse=True)
+            keep.update(by_prob[:self.top_columns])
+            columns = [c for ci, c in enumerate(table.columns) if ci in keep]
+            matches.append(TableMatch(table, round(table_probs[ti], 4), columns, len(table.columns) - len(columns)))
+        return matches
+
+    def prune(self, question: str) -> List[TableMatch]:
+        """与问题最相关的表及其字段，按表相关概率降序"""
+        question = question.strip()
+        snapshot = self.index.snapshot()
+        version = snapshot.fingerprint
+        tables = snapshot.tables
+        if not tables:
+            return []
+        matches, vector = self._lookup(version, question)
+        if matches is not None:
+            return matches
+        self.stats["misses"] += 1
+        matches = self._select(question, tables)
+        self._store(version, question, vector, matches)
+        return matches
+
+    def render(self, question: str, sample_rows: int = 0) -> str:
+        """裁剪后的精简 DDL，可直接拼进提示词"""
+        return self.index.render_matches(self.prune(question), sample_rows=sample_rows)
+
+
+def get_schema_pruner(engine: Any, table_names: Optional[Sequence[str]] = None) -> Optional[SchemaPruner]:
+    """获取进程内共享的表结构裁剪器；未配置 SIC_MODEL_PATH 时返回 None"""
+    model_path = os.getenv("SIC_MODEL_PATH")
+    if not model_path:
+        return None
+    from common.get_models import _registry_key, model_registry
+    variant = os.getenv("SIC_VARIANT", "cosql")
+    classifier = model_registry.get_or_create(
+        _registry_key("sic_classifier", model_path, variant=variant),
+        lambda: SchemaItemClassifier(model_path, variant=variant),
+    )
+    url = engine.url.render_as_string(hide_password=True)
+    return model_registry.get_or_create(
+        _registry_key("schema_pruner", url, tables=sorted(table_names or []), model=model_path),
+        lambda: SchemaPruner(get_schema_index(engine, table_names), classifier),
+    )
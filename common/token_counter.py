@@ -0,0 +1,272 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 每条消息在对话模板中的固定开销（角色、分隔符等）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def _text_of(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(
+            block.get("text", "") if isinstance(block, dict) else str(block) for block in content
+        )
+    return "" if content is None else str(content)
+
+
+def _heuristic_count(text: str) -> int:
+    chinese = len([c for c in text if '\u4e00' <= c <= '\u9fff'])
+    english = len(text) - chinese
+    return chinese + english // 4
+
+
+def _load_tokenizer(model_name: str):
+    """按模型名选择 tokenizer，返回 (类型, 实例)；都不可用时返回 ("heuristic", None)"""
+    lowered = model_name.lower()
+    if 'deepseek' in lowered:
+        try:
+            from transformers import AutoTokenizer
+            return "hf", AutoTokenizer.from_pretrained(os.getenv("TOKENIZER_MODEL", "deepseek-ai/DeepSeek-V3"))
+        except Exception:
+            pass
+    if 'gpt' in lowered:
+        try:
+            import tiktoken
+            return "tiktoken", tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            pass
+    return "heuristic", None
+
+
+class TokenCounter:
+    """
+    token 计数服务。
+
+    tokenizer 实例经 model_registry 在进程内只加载一次；相同字符串的计数结果按 LRU 缓存；
+    count_batch 对未命中的文本去重后一次性批量编码。
+    """
+
+    def __init__(self, model_name: Optional[str] = None, cache_size: int = 65536) -> None:
+        self.model_name = model_name if model_name is not None else os.getenv('OPENAI_LLM_MODEL', '')
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self._tokenizer = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            from common.get_models import _registry_key, model_registry
+            self._tokenizer = model_registry.get_or_create(
+                _registry_key("tokenizer", self.model_name.lower()),
+                lambda: _load_tokenizer(self.model_name),
+            )
+        return self._tokenizer
+
+    def _encode_batch(self, texts: List[str]) -> List[int]:
+        kind, tokenizer = self.tokenizer
+        if kind == "hf":
+            return [len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]]
+        if kind == "tiktoken":
+            return [len(ids) for ids in tokenizer.encode_batch(texts, disallowed_special=())]
+        return [_heuristic_count(text) for text in texts]
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return self.count_batch([text])[0]
+
+    def count_batch(self, texts: Sequence[str]) -> List[int]:
+        """批量计数，已缓存的直接返回，其余去重后一次编码"""
+        results: List[Optional[int]] = [None] * len(texts)
+        pending: Dict[str, List[int]] = {}
+        with self._lock:
+            for idx, text in enumerate(texts):
+                if not text:
+                    results[idx] = 0
+                    continue
+                cached = self._cache.get(text)
+                if cached is not None:
+                    self._cache.move_to_end(text)
+                    results[idx] = cached
+                    self.hits += 1
+                else:
+                    pending.setdefault(text, []).append(idx)
+
+        if pending:
+            unique = list(pending)
+            counts = self._encode_batch(unique)
+            with self._lock:
+                self.misses += len(unique)
+                for text, value in zip(unique, counts):
+                    self._cache[text] = value
+                    for idx in pending[text]:
+                        results[idx] = value
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return results  # type: ignore[return-value]
+
+    def message_texts(self, message: Any) -> List[str]:
+        """一条消息参与计数的文本：正文以及工具调用参数"""
+        if isinstance(message, BaseMessage):
+            texts = [_text_of(message.content)]
+            for call in getattr(message, "tool_calls", None) or []:
+                texts.append(str(call.get("args", "")))
+            return texts
+        if isinstance(message, dict):
+            return [_text_of(message.get("content"))]
+        return [_text_of(message)]
+
+    def count_messages(self, messages: Iterable[Any]) -> int:
+        return sum(self.count_each_message(messages))
+
+    def count_each_message(self, messages: Iterable[Any]) -> List[int]:
+        """逐条返回消息的 token 数（含固定开销），所有文本合并为一次批量计数"""
+        spans: List[int] = []
+        texts: List[str] = []
+        for message in messages:
+            parts = self.message_texts(message)
+            spans.append(len(parts))
+            texts.extend(parts)
+        counts = self.count_batch(texts)
+        per_message, offset = [], 0
+        for span in spans:
+            per_message.append(MESSAGE_OVERHEAD_TOKENS + sum(counts[offset:offset + span]))
+            offset += span
+        return per_message
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "tokenizer": self.tokenizer[0],
+            "cached_strings": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def get_token_counter(model_name: Optional[str] = None) -> TokenCounter:
+    """获取进程内共享的 token 计数服务"""
+    from common.get_models import _registry_key, model_registry
+    model_name = model_name if model_name is not None else os.getenv('OPENAI_LLM_MODEL', '')
+    return model_registry.get_or_create(
+        _registry_key("token_counter", model_name.lower()),
+        lambda: TokenCounter(model_name),
+    )
+
+
+def node_path(metadata: Optional[Dict[str, Any]]) -> str:
+    """由 LangGraph 回调元数据得到节点路径，如 text2sql_agent/agent"""
+    metadata = metadata or {}
+    checkpoint_ns = metadata.get("langgraph_checkpoint_ns") or metadata.get("checkpoint_ns") or ""
+    parts = [segment.split(":")[0] for segment in str(checkpoint_ns).split("|") if segment]
+    node = metadata.get("langgraph_node")
+    if node and (not parts or parts[-1] != node):
+        parts.append(node)
+    return "/".join(parts) or "unknown"
+
+
+def extract_usage(response: Any, counter: Optional[TokenCounter] = None) -> Tuple[int, int]:
+    """
+    从 LLMResult 中取 (输入 token, 输出 token)。
+
+    优先使用模型返回的用量，缺失输出用量时用本地 tokenizer 估算。
+    """
+    usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+    prompt_tokens = int(usage.get("prompt_tokens") or 0)
+    completion_tokens = int(usage.get("completion_tokens") or 0)
+    texts: List[str] = []
+    for generations in getattr(response, "generations", []) or []:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage_metadata = getattr(message, "usage_metadata", None) or {}
+            if not usage:
+                prompt_tokens += int(usage_metadata.get("input_tokens") or 0)
+                completion_tokens += int(usage_metadata.get("output_tokens") or 0)
+            texts.append(getattr(generation, "text", "") or "")
+    if not completion_tokens:
+        completion_tokens = sum((counter or get_token_counter()).count_batch(texts))
+    return prompt_tokens, completion_tokens
+
+
+class TokenLedger(BaseCallbackHandler):
+    """
+    挂在一次图运行上的 token 账本，按节点路径累计 LLM 调用的输入/输出 token。
+
+    输入 token 在请求发出前用本地 tokenizer 估算；若模型返回了用量信息，同时记录实际值。
+    """
+
+    run_inline = True
+
+    def __init__(self, counter: Optional[TokenCounter] = None) -> None:
+        self.counter = counter or get_token_counter()
+        self._lock = threading.Lock()
+        self._pending: Dict[UUID, str] = {}
+        self.entries: Dict[str, Dict[str, int]] = {}
+
+    def _entry(self, node: str) -> Dict[str, int]:
+        return self.entries.setdefault(
+            node,
+            {"calls": 0, "prompt_tokens_est": 0, "prompt_tokens": 0, "completion_tokens": 0},
+        )
+
+    def _start(self, run_id: UUID, metadata: Optional[Dict[str, Any]], prompt_tokens: int) -> None:
+        node = node_path(metadata)
+        with self._lock:
+            self._pending[run_id] = node
+            entry = self._entry(node)
+            entry["calls"] += 1
+            entry["prompt_tokens_est"] += prompt_tokens
+
+    def on_chat_model_start(
+        self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *, run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None, **kwargs: Any,
+    ) -> None:
+        tokens = sum(self.counter.count_messages(batch) for batch in messages)
+        self._start(run_id, metadata, tokens)
+
+    def on_llm_start(
+        self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None, **kwargs: Any,
+    ) -> None:
+        self._start(run_id, metadata, sum(self.counter.count_batch(prompts)))
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            node = self._pending.pop(run_id, None)
+        if node is None:
+            return
+        prompt_tokens, completion_tokens = extract_usage(response, self.counter)
+        with self._lock:
+            entry = self._entry(node)
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._pending.pop(run_id, None)
+
+    def by_node(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {node: dict(entry) for node, entry in self.entries.items()}
+
+    def totals(self) -> Dict[str, int]:
+        totals = {"calls": 0, "prompt_tokens_est": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        for entry in self.by_node().values():
+            for key in totals:
+                totals[key] += entry[key]
+        return totals
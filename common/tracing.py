@@ -0,0 +1,301 @@
+"""
+智能体图的本地链路追踪。
+
+以回调的形式记录每个图节点、LLM 调用与工具调用的 span（耗时、输入/输出 token、负载字节数、错误），
+写入本地滚动 JSONL 文件，不依赖任何外部服务。设置环境变量 AGENT_TRACING=true 后，
+所有 LangChain/LangGraph 运行都会自动挂上追踪回调，子图与子智能体随 config 一并覆盖；
+也可以调用 enable_tracing() 在当前上下文中开启。
+
+查看结果：python -m benchmarks.trace_report
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_TRACE_PATH = "./cache/traces/spans.jsonl"
+
+SPAN_GRAPH = "graph"
+SPAN_NODE = "node"
+SPAN_LLM = "llm"
+SPAN_TOOL = "tool"
+
+
+def _payload_bytes(payload: Any) -> int:
+    if payload is None:
+        return 0
+    if isinstance(payload, str):
+        return len(payload.encode("utf-8"))
+    try:
+        return len(json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return len(str(payload).encode("utf-8"))
+
+
+class SpanExporter:
+    """把 span 逐行写入滚动 JSONL 文件，单文件超过上限后轮转"""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None, backup_count: Optional[int] = None) -> None:
+        self.path = Path(path or os.getenv("AGENT_TRACE_PATH", DEFAULT_TRACE_PATH))
+        self.max_bytes = int(max_bytes or os.getenv("AGENT_TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+        self.backup_count = int(backup_count or os.getenv("AGENT_TRACE_BACKUPS", "5"))
+        self._logger: Optional[logging.Logger] = None
+        self._lock = threading.Lock()
+
+    def _get_logger(self) -> logging.Logger:
+        if self._logger is None:
+            with self._lock:
+                if self._logger is None:
+                    # 首次写入时才创建目录，导入模块不产生副作用
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    logger = logging.getLogger(f"agent_tracing.{self.path}")
+                    logger.setLevel(logging.INFO)
+                    logger.propagate = False
+                    handler = RotatingFileHandler(
+                        self.path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding="utf-8"
+                    )
+                    handler.setFormatter(logging.Formatter("%(message)s"))
+                    logger.addHandler(handler)
+                    self._logger = logger
+        return self._logger
+
+    def export(self, span: Dict[str, Any]) -> None:
+        self._get_logger().info(json.dumps(span, ensure_ascii=False, default=str))
+
+
+class SpanRecorder:
+    """
+    进程内共享的 span 记录器。
+
+    回调实例可能在不同的子运行中各自创建，父子关系统一记录在这里，
+    因此即使子智能体在工具内部单独发起运行，span 仍能挂到同一条请求链路上。
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter] = None) -> None:
+        self.exporter = exporter or SpanExporter()
+        self._lock = threading.Lock()
+        self._open: Dict[UUID, Dict[str, Any]] = {}
+        # 所有运行（包括不记录 span 的内部运行）的父运行，用于找到最近的已记录祖先
+        self._parents: Dict[UUID, Optional[UUID]] = {}
+        self._recorded: Dict[UUID, UUID] = {}  # 已记录 span 的 run_id -> trace_id
+
+    def _resolve(self, parent_run_id: Optional[UUID]) -> tuple:
+        """返回 (最近的已记录祖先 span, trace_id)"""
+        current = parent_run_id
+        while current is not None:
+            if current in self._recorded:
+                return current, self._recorded[current]
+            current = self._parents.get(current)
+        return None, None
+
+    def link(self, run_id: UUID, parent_run_id: Optional[UUID]) -> None:
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+
+    def start(
+        self,
+        run_id: UUID,
+        parent_run_id: Optional[UUID],
+        kind: str,
+        name: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        tokens_in: int = 0,
+        bytes_in: int = 0,
+    ) -> None:
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            parent_span, trace_id = self._resolve(parent_run_id)
+            trace_id = trace_id or run_id
+            self._recorded[run_id] = trace_id
+            self._open[run_id] = {
+                "trace_id": str(trace_id),
+                "span_id": str(run_id),
+                "parent_id": str(parent_span) if parent_span else None,
+                "kind": kind,
+                "name": name,
+                "node": (metadata or {}).get("langgraph_node"),
+                "start": time.time(),
+                "_t0": time.perf_counter(),
+                "tokens_in": tokens_in,
+                "tokens_out": 0,
+                "bytes_in": bytes_in,
+                "bytes_out": 0,
+                "error": None,
+            }
+
+    def end(
+        self,
+        run_id: UUID,
+        tokens_in: Optional[int] = None,
+        tokens_out: int = 0,
+        bytes_out: int = 0,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        with self._lock:
+            span = self._open.pop(run_id, None)
+            self._parents.pop(run_id, None)
+            if span is None:
+                return
+            # 根 span 结束后整条链路不再有子 span，释放映射
+            if span["parent_id"] is None:
+                trace_id = UUID(span["trace_id"])
+                for key in [k for k, v in self._recorded.items() if v == trace_id]:
+                    self._recorded.pop(key, None)
+        span["duration_ms"] = round((time.perf_counter() - span.pop("_t0")) * 1000, 3)
+        if tokens_in:
+            span["tokens_in"] = tokens_in
+        span["tokens_out"] = tokens_out
+        span["bytes_out"] = bytes_out
+        if error is not None:
+            span["error"] = f"{type(error).__name__}: {error}"
+        self.exporter.export(span)
+
+    def forget(self, run_id: UUID) -> None:
+        with self._lock:
+            self._parents.pop(run_id, None)
+
+
+_recorder: Optional[SpanRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_span_recorder() -> SpanRecorder:
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = SpanRecorder()
+    return _recorder
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    记录图节点、LLM 调用与工具调用 span 的回调。
+
+    只有图本身（根运行）与 LangGraph 节点记为 span，节点内部的 RunnableSequence、
+    ChannelWrite 等中间运行只用于维护父子关系。
+    """
+
+    run_inline = True
+
+    def __init__(self, recorder: Optional[SpanRecorder] = None) -> None:
+        self.recorder = recorder or get_span_recorder()
+
+    # ------------------------------
+    # 图与节点
+    # ------------------------------
+    def on_chain_start(
+        self, serialized: Optional[Dict[str, Any]], inputs: Any, *, run_id: UUID,
+        parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any,
+    ) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "chain"
+        node = (metadata or {}).get("langgraph_node")
+        if parent_run_id is None:
+            self.recorder.start(run_id, None, SPAN_GRAPH, name, metadata)
+        elif node and name == node:
+            self.recorder.start(run_id, parent_run_id, SPAN_NODE, name, metadata)
+        else:
+            self.recorder.link(run_id, parent_run_id)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self.recorder.end(run_id, bytes_out=_payload_bytes(outputs))
+        self.recorder.forget(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.recorder.end(run_id, error=error)
+        self.recorder.forget(run_id)
+
+    # ------------------------------
+    # LLM
+    # ------------------------------
+    def on_chat_model_start(
+        self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID,
+        parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any,
+    ) -> None:
+        from common.token_counter import get_token_counter
+        counter = get_token_counter()
+        tokens = sum(counter.count_messages(batch) for batch in messages)
+        bytes_in = sum(_payload_bytes(text) for batch in messages for m in batch for text in counter.message_texts(m))
+        name = kwargs.get("name") or (serialized or {}).get("name") or "chat_model"
+        self.recorder.start(run_id, parent_run_id, SPAN_LLM, name, metadata, tokens_in=tokens, bytes_in=bytes_in)
+
+    def on_llm_start(
+        self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID,
+        parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any,
+    ) -> None:
+        from common.token_counter import get_token_counter
+        tokens = sum(get_token_counter().count_batch(prompts))
+        name = kwargs.get("name") or (serialized or {}).get("name") or "llm"
+        self.recorder.start(
+            run_id, parent_run_id, SPAN_LLM, name, metadata,
+            tokens_in=tokens, bytes_in=sum(_payload_bytes(p) for p in prompts),
+        )
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        from common.token_counter import extract_usage
+        prompt_tokens, completion_tokens = extract_usage(response)
+        texts = [
+            getattr(generation, "text", "") or ""
+            for generations in getattr(response, "generations", []) or []
+            for generation in generations
+        ]
+        self.recorder.end(
+            run_id,
+            tokens_in=prompt_tokens or None,
+            tokens_out=completion_tokens,
+            bytes_out=sum(_payload_bytes(text) for text in texts),
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.recorder.end(run_id, error=error)
+
+    # ------------------------------
+    # 工具
+    # ------------------------------
+    def on_tool_start(
+        self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID,
+        parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any,
+    ) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+        self.recorder.start(run_id, parent_run_id, SPAN_TOOL, name, metadata, bytes_in=_payload_bytes(input_str))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        content = getattr(output, "content", output)
+        self.recorder.end(run_id, bytes_out=_payload_bytes(content))
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.recorder.end(run_id, error=error)
+
+
+_tracing_callback_var: ContextVar[Optional[TracingCallbackHandler]] = ContextVar(
+    "agent_tracing_callback", default=None
+)
+
+# AGENT_TRACING=true 时，每次运行自动挂上 TracingCallbackHandler，并随 config 传递给子运行
+register_configure_hook(_tracing_callback_var, inheritable=True, handle_class=TracingCallbackHandler, env_var="AGENT_TRACING")
+
+
+def enable_tracing() -> TracingCallbackHandler:
+    """在当前上下文（及其后创建的任务/线程上下文）中开启追踪"""
+    handler = _tracing_callback_var.get()
+    if handler is None:
+        handler = TracingCallbackHandler()
+        _tracing_callback_var.set(handler)
+    return handler
+
+
+def disable_tracing() -> None:
+    _tracing_callback_var.set(None)
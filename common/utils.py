@@ -1,4 +1,7 @@
 from langchain_core.messages import convert_to_messages
+import json
+import re
+from typing import Any, Dict, Optional
 
 
 def pretty_print_message(message, indent=False):
@@ -42,4 +45,31 @@ def pretty_print_messages(update, last_message=False):
 
         for m in messages:
             pretty_print_message(m, indent=is_subgraph)
-        print("\n")
\ No newline at end of file
+        print("\n")
+
+
+def parse_json_from_text(text: str) -> Optional[Dict[str, Any]]:
+    """从 LLM 输出中解析 JSON 对象，兼容 ```json 代码块以及前后夹杂说明文字的情况"""
+    cleaned = text.strip()
+    if not cleaned:
+        return None
+    # Handle fenced code blocks like ```json {...}```
+    if cleaned.startswith("```"):
+        cleaned = re.sub(r"^```(?:json)?", "", cleaned, count=1, flags=re.IGNORECASE).strip()
+        cleaned = re.sub(r"```$", "", cleaned).strip()
+    try:
+        data = json.loads(cleaned)
+        if isinstance(data, dict):
+            return data
+    except json.JSONDecodeError:
+        pass
+
+    match = re.search(r"\{.*\}", cleaned, re.DOTALL)
+    if match:
+        try:
+            data = json.loads(match.group(0))
+            if isinstance(data, dict):
+                return data
+        except json.JSONDecodeError:
+            return None
+    return None
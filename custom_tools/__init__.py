@@ -5,6 +5,7 @@ from .chart_tools import get_mcp_tools
 from .neo4j_tools import get_neo4j_tools
 from .report_tools import get_report_tools
 from .common_tools import get_toos
+from .output_governor import govern_tools, get_artifact_tools
 
 __all__ = [
     "get_csv_tools",
@@ -12,7 +13,9 @@ __all__ = [
     "get_mysql_tools",
     "get_mcp_tools",
     "get_neo4j_tools",
-    "get_report_tools"
+    "get_report_tools",
+    "govern_tools",
+    "get_artifact_tools"
 ]
 
 def get_all_tools():
@@ -25,5 +28,6 @@ def get_all_tools():
     all_tools.extend(get_neo4j_tools())
     all_tools.extend(get_report_tools())
     all_tools.extend(get_toos())
+    all_tools.extend(get_artifact_tools())
     
     return all_tools
\ No newline at end of file
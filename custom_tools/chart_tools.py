@@ -2,7 +2,6 @@
 # mcp项目链接：https://github.com/antvis/mcp-server-chart
 # 从mcp server中获取tools
 
-from langchain_mcp_adapters.client import MultiServerMCPClient
 import asyncio
 import json
 
@@ -61,6 +60,8 @@ async def get_mcp_tools():
     print(
         f"Initializing MultiServerMCPClient with config: {SERVER_CONFIGS}")
     try:
+        # 仅在真正需要MCP工具时才导入适配器，避免拖慢 custom_tools 的导入
+        from langchain_mcp_adapters.client import MultiServerMCPClient
         _mcp_client_instance = MultiServerMCPClient(SERVER_CONFIGS)
 
         print(
@@ -5,6 +5,8 @@ from langchain_core.tools import tool
 from langgraph.prebuilt import InjectedState
 
 from common.memory_backend import MemoryBackend, init_memory_backend
+from common.memory_gate import MEMORY_READ_KEYWORDS, MEMORY_WRITE_KEYWORDS, match_keywords
+from common.prefetch import get_prefetcher
 
 
 def _ns_from_state(default_prefix: str, state: Dict[str, Any]) -> str:
@@ -12,6 +14,11 @@ def _ns_from_state(default_prefix: str, state: Dict[str, Any]) -> str:
 	return f"{default_prefix}/{user_id}"
 
 
+def memory_search_key(namespace: str, query: str, top_k: int = 5, min_score: float = 0.3):
+	"""记忆检索在预取缓存中的 key，memory_router 与 memory_search 工具共用"""
+	return ("memory_search", namespace, query.strip(), top_k, min_score)
+
+
 def create_supervisor_memory_tools(
 	default_namespace_prefix: str = "supervisor_memories",
 	backend: Optional[MemoryBackend] = None,
@@ -28,7 +35,10 @@ def create_supervisor_memory_tools(
 	):
 		"""Search memory items by semantic similarity within a namespace."""
 		ns = namespace or _ns_from_state(default_namespace_prefix, state)
-		results = be.search(ns, query, top_k=top_k, min_score=min_score)
+		results = get_prefetcher().take(
+			memory_search_key(ns, query, top_k, min_score),
+			lambda: be.search(ns, query, top_k=top_k, min_score=min_score),
+		)
 		return {"namespace": ns, "results": results}
 
 	@tool("memory_write", return_direct=False)
@@ -41,6 +51,7 @@ def create_supervisor_memory_tools(
 		"""Write a new memory item with optional metadata into a namespace."""
 		ns = namespace or _ns_from_state(default_namespace_prefix, state)
 		res = be.write(ns, content, metadata or {})
+		get_prefetcher().invalidate(("memory_search", ns))
 		return {"namespace": ns, **res}
 
 	@tool("memory_update", return_direct=False)
@@ -54,6 +65,7 @@ def create_supervisor_memory_tools(
 		"""Update an existing memory item by id; supports content and metadata updates."""
 		ns = namespace or _ns_from_state(default_namespace_prefix, state)
 		res = be.update(ns, item_id, content=content, metadata=metadata)
+		get_prefetcher().invalidate(("memory_search", ns))
 		return {"namespace": ns, **res}
 
 	@tool("memory_delete", return_direct=False)
@@ -66,6 +78,7 @@ def create_supervisor_memory_tools(
 		"""Delete a memory item by id or by filters within a namespace."""
 		ns = namespace or _ns_from_state(default_namespace_prefix, state)
 		res = be.delete(ns, item_id=item_id, filters=filters)
+		get_prefetcher().invalidate(("memory_search", ns))
 		return {"namespace": ns, **res}
 
 	# Minimal routing: simple heuristics
@@ -75,9 +88,8 @@ def create_supervisor_memory_tools(
 		state: Annotated[Dict[str, Any], InjectedState] = {},  # type: ignore[assignment]
 	):
 		"""Heuristically decide whether to read or write memory based on the message."""
-		text = message.lower()
-		should_write = any(x in text for x in ["记住", "默认", "以后都", "偏好", "习惯"])
-		should_read = any(x in text for x in ["以前", "之前", "上次", "你知道我", "我的偏好"])
+		should_write = bool(match_keywords(message, MEMORY_WRITE_KEYWORDS))
+		should_read = bool(match_keywords(message, MEMORY_READ_KEYWORDS))
 		namespaces = [_ns_from_state(default_namespace_prefix, state)]
 		return {"should_read": should_read, "should_write": should_write, "namespaces": namespaces}
 
@@ -11,6 +11,7 @@ from mysql.connector import Error
 from dotenv import load_dotenv
 
 from common.memory_state import CustomState
+from common.prefetch import PrefetchTurn, get_prefetcher
 from .tool_utils import *
 
 load_dotenv()
@@ -44,6 +45,10 @@ def get_mysql_tables() -> Dict[str, List[str]]:
     返回:
         包含表名列表的字典
     """
+    return get_prefetcher().take(("mysql_tables",), _fetch_mysql_tables)
+
+
+def _fetch_mysql_tables() -> Dict[str, Any]:
     query = "SHOW TABLES"
     conn = _connect()
     if not conn:
@@ -74,6 +79,10 @@ def get_table_columns(table_name: str) -> Dict[str, List[str]]:
     返回:
         包含字段名列表的字典
     """
+    return get_prefetcher().take(("mysql_columns", table_name), lambda: _fetch_table_columns(table_name))
+
+
+def _fetch_table_columns(table_name: str) -> Dict[str, Any]:
     query = f"SHOW COLUMNS FROM {table_name}"
     conn = _connect()
     if not conn:
@@ -268,6 +277,21 @@ def execute_sql_query(state: Annotated[CustomState, InjectedState], tool_call_id
         if conn:
             _disconnect(conn)
 
+# ------------------------------
+# 投机预取：用户消息到达时预先加载表清单与各表字段
+# ------------------------------
+def speculate_schema_catalog(turn: PrefetchTurn) -> None:
+    max_tables = int(os.getenv("PREFETCH_MAX_TABLES", "20"))
+
+    def load_tables() -> Dict[str, Any]:
+        result = _fetch_mysql_tables()
+        # 表清单返回后继续预取各表字段，与表清单一样供 get_table_columns 直接取用
+        for table in result.get("tables", [])[:max_tables]:
+            turn.submit(("mysql_columns", table), lambda table=table: _fetch_table_columns(table))
+        return result
+
+    turn.submit(("mysql_tables",), load_tables)
+
 def get_mysql_tools() -> List[BaseTool]:
     return [
         query_data,
@@ -1,13 +1,18 @@
 from langchain_core.tools import tool
 from common import get_neo4j_db_manager, get_embeddings_model
+import os
 import re
-from langchain_community.vectorstores import Neo4jVector
-from typing import List, Callable, Any, Dict, Annotated
+import threading
+from typing import List, Callable, Any, Dict, Annotated, Optional, Sequence, Tuple
 from tqdm import tqdm
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from common.memory_state import MapReduceState
 from langgraph.prebuilt import InjectedState
+from common.prefetch import PrefetchTurn, get_prefetcher
+from common.cypher_templates import get_template, register_template, warm_templates
+from common.entity_context import load_context, merge_contexts
+from common.embedding_replica import get_embedding_replica
 
 @tool
 def vector_search(
@@ -34,92 +39,235 @@ def vector_search(
     返回:
         结构化检索结果，包含chunks、reports、relationships、entities四个key
     """
-    # 1. 获取全局单例DB连接管理器
-    db_manager = get_neo4j_db_manager()
-    embeddings = get_embeddings_model()
-    
-    # 2. 构建Cypher检索模板
-    retrieval_query = f"""
-    WITH collect(node) as nodes
-    WITH
-    collect {{
-        UNWIND nodes as n
-        MATCH (n)<-[:MENTIONS]-(c:__Chunk__)
-        WITH distinct c, count(distinct n) as freq
-        RETURN {{id:c.id, text: c.text}} AS chunkText
-        ORDER BY freq DESC
-        LIMIT {top_chunks}
-    }} AS text_mapping,
-    collect {{
-        UNWIND nodes as n
-        MATCH (n)-[:IN_COMMUNITY]->(c:__Community__)
-        WITH distinct c, c.community_rank as rank, c.weight AS weight
-        RETURN c.summary 
-        ORDER BY rank, weight DESC
-        LIMIT {top_communities}
-    }} AS report_mapping,
-    collect {{
-        UNWIND nodes as n
-        MATCH (n)-[r]-(m:__Entity__) 
-        WHERE NOT m IN nodes
-        RETURN r.description AS descriptionText
-        ORDER BY r.weight DESC 
-        LIMIT {top_outside_rels}
-    }} as outsideRels,
-    collect {{
-        UNWIND nodes as n
-        MATCH (n)-[r]-(m:__Entity__) 
-        WHERE m IN nodes
-        RETURN r.description AS descriptionText
-        ORDER BY r.weight DESC 
-        LIMIT {top_inside_rels}
-    }} as insideRels,
-    collect {{
-        UNWIND nodes as n
-        RETURN n.description AS descriptionText
-    }} as entities
-    RETURN {{
-        Chunks: text_mapping, 
-        Reports: report_mapping, 
-        Relationships: outsideRels + insideRels, 
-        Entities: entities
-    }} AS text, 1.0 AS score, {{}} AS metadata
+    params = (query.strip(), index_name, top_entities, top_chunks, top_communities, top_outside_rels, top_inside_rels)
+    return get_prefetcher().take(("vector_search", *params), lambda: _vector_search(*params))
+
+
+# 向量命中实体后的上下文扩展；数量上限均为查询参数，不同参数组合共用同一个模板和检索器
+_CONTEXT_QUERY = """
+WITH collect(node) as nodes
+WITH nodes,
+collect {
+    UNWIND nodes as n
+    MATCH (n)<-[:MENTIONS]-(c:__Chunk__)
+    WITH distinct c, count(distinct n) as freq
+    RETURN {id:c.id, text: c.text} AS chunkText
+    ORDER BY freq DESC
+    LIMIT $topChunks
+} AS text_mapping,
+collect {
+    UNWIND nodes as n
+    MATCH (n)-[:IN_COMMUNITY]->(c:__Community__)
+    WITH distinct c, c.community_rank as rank, c.weight AS weight
+    RETURN c.summary 
+    ORDER BY rank, weight DESC
+    LIMIT $topCommunities
+} AS report_mapping,
+collect {
+    UNWIND nodes as n
+    MATCH (n)-[r]-(m:__Entity__) 
+    WHERE NOT m IN nodes
+    RETURN r.description AS descriptionText
+    ORDER BY r.weight DESC 
+    LIMIT $topOutsideRels
+} as outsideRels,
+collect {
+    UNWIND nodes as n
+    MATCH (n)-[r]-(m:__Entity__) 
+    WHERE m IN nodes
+    RETURN r.description AS descriptionText
+    ORDER BY r.weight DESC 
+    LIMIT $topInsideRels
+} as insideRels,
+collect {
+    UNWIND nodes as n
+    RETURN n.description AS descriptionText
+} as entities
+"""
+
+# Neo4jVector 的 retrieval_query：结果被 LangChain 序列化成 page_content 字符串，需要再解析
+VECTOR_RETRIEVAL_QUERY = _CONTEXT_QUERY + """RETURN {
+    Chunks: text_mapping, 
+    Reports: report_mapping, 
+    Relationships: outsideRels + insideRels, 
+    Entities: entities
+} AS text, 1.0 AS score, {} AS metadata
+"""
+
+# 直接由驱动执行：各部分作为独立列返回，取值即为 Python 列表与字符串
+_STRUCTURED_RETURN = """RETURN
+    [c IN text_mapping | c.text] AS chunks,
+    report_mapping AS reports,
+    outsideRels + insideRels AS relationships,
+    entities,
+    [n IN nodes | n.id] AS entity_ids
+"""
+
+# 命中实体上物化的上下文（common.entity_context），随向量命中一起读出，在进程内合并；
+# 文本块按命中实体保存的 id 统计提及次数，只读取选中的前 $topChunks 个文本块的正文
+_CACHED_RETURN = """
+WITH collect(node) AS nodes
+RETURN [n IN nodes | n.id] AS entity_ids, [n IN nodes | n.context] AS contexts,
+collect {
+    UNWIND nodes AS n
+    UNWIND coalesce(n.context_chunk_ids, []) AS chunkId
+    WITH chunkId, count(*) AS freq
+    ORDER BY freq DESC
+    LIMIT $topChunks
+    MATCH (c:__Chunk__ {id: chunkId})
+    RETURN c.text AS chunkText
+    ORDER BY freq DESC
+} AS chunks
+"""
+
+_VECTOR_MATCH = """
+CALL db.index.vector.queryNodes($index, $k, $embedding) YIELD node, score
+WITH node, score
+ORDER BY score DESC
+"""
+
+STRUCTURED_RETRIEVAL_QUERY = _VECTOR_MATCH + _CONTEXT_QUERY + _STRUCTURED_RETURN
+
+# 候选实体由进程内向量副本（common.embedding_replica）在本地选出，Neo4j 按 $ids 的顺序只做上下文扩展
+_REPLICA_MATCH = """
+UNWIND range(0, size($ids) - 1) AS i
+MATCH (node:`__Entity__` {id: $ids[i]})
+WITH node, i
+ORDER BY i
+"""
+
+_VECTOR_HITS = """
+    CALL db.index.vector.queryNodes($index, $k, $embedding) YIELD node, score
+    RETURN node ORDER BY score DESC
+"""
+
+_REPLICA_HITS = """
+    UNWIND range(0, size($ids) - 1) AS i
+    MATCH (node:`__Entity__` {id: $ids[i]})
+    RETURN node ORDER BY i
+"""
+
+# 全文检索（CJK 分词）与向量检索各取前 $k，按倒数排名融合（RRF）后取前 $k 个实体，再做同样的上下文扩展，整体一次往返。
+# 全文命中的文本块换算为其提及的实体，名次沿用文本块的名次；同一实体在同一路结果中只取最好名次。
+_HYBRID_MATCH = """
+WITH
+COLLECT {""" + _VECTOR_HITS + """} AS vectorHits,
+COLLECT {
+    CALL db.index.fulltext.queryNodes($fulltextIndex, $fulltextQuery, {limit: $k}) YIELD node, score
+    RETURN node ORDER BY score DESC
+} AS textHits
+WITH COLLECT {
+    UNWIND range(0, size(vectorHits) - 1) AS i
+    RETURN {node: vectorHits[i], source: 'vector', rank: i} AS hit
+    UNION ALL
+    UNWIND range(0, size(textHits) - 1) AS i
+    WITH i, textHits[i] AS m
+    OPTIONAL MATCH (m:__Chunk__)-[:MENTIONS]->(e:__Entity__)
+    WITH i, CASE WHEN m:__Entity__ THEN m ELSE e END AS n
+    WHERE n IS NOT NULL
+    RETURN {node: n, source: 'fulltext', rank: i} AS hit
+} AS hits
+UNWIND hits AS hit
+WITH hit.node AS node, hit.source AS source, min(hit.rank) AS rank
+WITH node, sum(1.0 / ($rrfK + rank + 1)) AS score
+ORDER BY score DESC
+LIMIT $k
+"""
+
+HYBRID_RETRIEVAL_QUERY = _HYBRID_MATCH + _CONTEXT_QUERY + _STRUCTURED_RETURN
+
+_HYBRID_REPLICA_MATCH = _HYBRID_MATCH.replace(_VECTOR_HITS, _REPLICA_HITS)
+
+# Lucene 查询语法中的特殊字符，问题原文中出现时替换为空格
+_LUCENE_SPECIAL = re.compile(r'[+\-&|!(){}\[\]^"~*?:\\/]')
+
+_LIMIT_WARM_PARAMS = {"k": 10, "topChunks": 3, "topCommunities": 3, "topOutsideRels": 10, "topInsideRels": 10}
+
+
+def _register_retrieval(name: str, match: str, per_query: Dict[str, Any], shared: Dict[str, Any]) -> str:
     """
-    
-    # 3. 初始化Neo4jVector
-    vector_store = Neo4jVector.from_existing_index(
-        embedding=embeddings,
-        url=db_manager.neo4j_uri,
-        username=db_manager.neo4j_username,
-        password=db_manager.neo4j_password,
-        index_name=index_name,
-        retrieval_query=retrieval_query
-    )
-    
-    # 4. 执行相似度搜索
-    docs = vector_store.similarity_search(
-        query=query,
-        k=top_entities,
-        params={
-            "topChunks": top_chunks,
-            "topCommunities": top_communities,
-            "topOutsideRels": top_outside_rels,
-            "topInsideRels": top_inside_rels,
-        }
+    以命中实体的查询 match 注册一种检索的全部模板：
+        name            遍历展开上下文
+        name.cached     读取实体上物化的上下文
+    以及两者的多问题版本 name.batch、name.cached.batch。
+
+    多问题模板由单问题模板改写：UNWIND $queries 后对每个问题执行同一段检索，
+    单问题模板中的逐问题参数（$embedding 等）改为读取当前问题 q 的同名字段，其余参数各问题共用。
+    """
+    warm_params = {"index": "vector", **_LIMIT_WARM_PARAMS, **shared}
+    variants = (
+        (name, match + _CONTEXT_QUERY + _STRUCTURED_RETURN, "chunks, reports, relationships, entities, entity_ids"),
+        (f"{name}.cached", match + _CACHED_RETURN, "entity_ids, contexts, chunks"),
     )
-    
-    # 5. 解析结果（处理空结果，返回结构化数据）
-    if not docs:
-        return {
-            "chunks": [],
-            "reports": [],
-            "relationships": [],
-            "entities": []
-        }
-    
-    # 提取原始文本内容
-    content = docs[0].page_content.strip()
-    
+    for variant, query, columns in variants:
+        register_template(variant, query, warm_params={**warm_params, **per_query})
+        body = query
+        for key in per_query:
+            body = body.replace(f"${key}", f"q.{key}")
+        batch = (
+            "UNWIND range(0, size($queries) - 1) AS qi\n"
+            "CALL {\n    WITH qi\n    WITH $queries[qi] AS q\n"
+            + body
+            + f"}}\nRETURN qi, {columns}\nORDER BY qi\n"
+        )
+        register_template(f"{variant}.batch", batch, warm_params={**warm_params, "queries": [per_query]})
+    return name
+
+
+VECTOR_SEARCH_TEMPLATE = _register_retrieval(
+    "vector_search.structured", _VECTOR_MATCH, per_query={"embedding": [0.0]}, shared={},
+)
+
+HYBRID_SEARCH_TEMPLATE = _register_retrieval(
+    "vector_search.hybrid",
+    _HYBRID_MATCH,
+    per_query={"embedding": [0.0], "fulltextQuery": "warmup"},
+    shared={"fulltextIndex": "graph_fulltext", "rrfK": 60},
+)
+
+VECTOR_REPLICA_TEMPLATE = _register_retrieval(
+    "vector_search.replica", _REPLICA_MATCH, per_query={"ids": ["warmup"]}, shared={},
+)
+
+HYBRID_REPLICA_TEMPLATE = _register_retrieval(
+    "vector_search.hybrid_replica",
+    _HYBRID_REPLICA_MATCH,
+    per_query={"ids": ["warmup"], "fulltextQuery": "warmup"},
+    shared={"fulltextIndex": "graph_fulltext", "rrfK": 60},
+)
+
+# 检索模板 -> 候选实体由本地向量副本选出时使用的模板
+_REPLICA_TEMPLATES = {VECTOR_SEARCH_TEMPLATE: VECTOR_REPLICA_TEMPLATE, HYBRID_SEARCH_TEMPLATE: HYBRID_REPLICA_TEMPLATE}
+# 向量索引名 -> 向量副本中的节点标签；检索模板都以实体为起点
+_REPLICA_INDEX_LABELS = {"vector": "__Entity__"}
+
+
+def fulltext_query(text: str) -> str:
+    """问题原文转为安全的 Lucene 查询：去掉语法字符，小写避免 AND/OR/NOT 被当作运算符"""
+    return " ".join(_LUCENE_SPECIAL.sub(" ", text).lower().split())
+
+
+def _clean_chunk(text: str) -> str:
+    return text.replace("\n", " ").replace("  ", " ").strip()
+
+
+def structured_result(record: Dict[str, Any]) -> Dict[str, List[str]]:
+    """把 STRUCTURED_RETRIEVAL_QUERY 的一行结果整理为 vector_search 的返回格式（去除空值）"""
+    def texts(values) -> List[str]:
+        return [str(v).strip() for v in values or [] if v is not None and str(v).strip()]
+
+    return {
+        "chunks": [_clean_chunk(t) for t in texts(record.get("chunks"))],
+        "reports": texts(record.get("reports")),
+        "relationships": texts(record.get("relationships")),
+        "entities": texts(record.get("entities")),
+    }
+
+
+def parse_page_content(content: str) -> Dict[str, List[str]]:
+    """解析 Neo4jVector 返回的 page_content 字符串（旧流程，含单引号的文本会被截断或丢失）"""
+    content = content.strip()
+
     # 定义解析函数：按标题分割内容
     def parse_section(title, content):
         # 用正则匹配标题后的内容（直到下一个标题或结束）
@@ -135,40 +283,364 @@ def vector_search(
         ]
         # 去除每个项的"- "前缀
         return [item[2:].strip() for item in items if item[2:].strip()]
-    
-    # 解析Entities
-    entities = parse_section("Entities", content)
-    
-    # 解析Reports
-    reports = parse_section("Reports", content)
-    
-    # 解析Relationships（过滤None值）
-    relationships = [
-        rel for rel in parse_section("Relationships", content) 
-        if rel != "None"
-    ]
-    
+
     # 解析Chunks（特殊处理：提取text字段）
     chunks = []
     chunks_match = re.search(r"Chunks:\s*(.*?)(?=\n\w+:|$)", content, re.DOTALL)
     if chunks_match:
         # 匹配每个chunk的text字段（处理多行字符串）
         chunk_texts = re.findall(r"'text':\s*'(.*?)'", chunks_match.group(1), re.DOTALL)
-        # 清洗文本（去除换行符和多余空格）
-        chunks = [
-            text.replace("\n", " ").replace("  ", " ").strip() 
-            for text in chunk_texts
-        ]
-    
+        chunks = [_clean_chunk(text) for text in chunk_texts]
+
     return {
         "chunks": chunks,
-        "reports": reports,
-        "relationships": relationships,
-        "entities": entities
+        "reports": parse_section("Reports", content),
+        # 过滤None值
+        "relationships": [rel for rel in parse_section("Relationships", content) if rel != "None"],
+        "entities": parse_section("Entities", content),
+    }
+
+
+class GraphVectorRetriever:
+    """
+    直接用驱动执行向量检索与上下文扩展，返回 Cypher 结果中的列表字段，不经过字符串序列化与正则解析。
+
+    复用 DBConnectionManager 的驱动与共享的 embedding 模型；一次检索 = 一次问题编码 + 一次 Cypher 往返，
+    多个问题时为一次批量编码 + 一次 Cypher 往返。
+    有可用的向量快照（EMBEDDING_REPLICA，默认开启）时，候选实体在进程内用 NumPy 选出，Neo4j 只做上下文扩展。
+    启用实体上下文缓存（ENTITY_CONTEXT_CACHE，默认开启）时先读取命中实体上物化的上下文，
+    有实体缺少上下文时该问题再走一次遍历查询；库中完全没有构建上下文时本进程内不再尝试。
+    """
+
+    def __init__(
+        self, index_name: str = "vector", template: str = VECTOR_SEARCH_TEMPLATE, context_cache: Optional[bool] = None,
+    ) -> None:
+        self.index_name = index_name
+        self.template = template
+        self.retrieval_query = get_template(template).query
+        self.replica_template = _REPLICA_TEMPLATES.get(template)
+        self.replica = get_embedding_replica() \
+            if self.replica_template and index_name in _REPLICA_INDEX_LABELS else None
+        if context_cache is None:
+            context_cache = os.getenv("ENTITY_CONTEXT_CACHE", "true").lower() == "true"
+        self.context_cache = context_cache
+        self.context_stats = {"hits": 0, "misses": 0}
+        self.embedding = get_embeddings_model()
+        self.driver = get_neo4j_db_manager().driver
+
+    def _query_params(self, query: str) -> Dict[str, Any]:
+        """逐问题的参数（不含向量）"""
+        return {}
+
+    def _shared_params(self) -> Dict[str, Any]:
+        """各问题共用的参数"""
+        return {}
+
+    @staticmethod
+    def _limits(k: int, params: Dict[str, Any]) -> Dict[str, int]:
+        # 数量上限统一转为整数，保证参数类型稳定、复用同一执行计划
+        return {"k": int(k), **{key: int(value) for key, value in params.items()}}
+
+    def _candidates(self, vectors: List[List[float]], k: int) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        返回使用的模板与每个问题的命中参数：
+        向量副本可用时为本地选出的候选实体 id（$ids），否则为问题向量（$embedding），由 Neo4j 向量索引检索。
+        """
+        if self.replica is not None:
+            hits = self.replica.batch_search(_REPLICA_INDEX_LABELS[self.index_name], vectors, k)
+            if hits is not None:
+                return self.replica_template, [{"ids": [node_id for node_id, _ in row]} for row in hits]
+        return self.template, [{"embedding": vector} for vector in vectors]
+
+    def _run(self, template: str, parameters: Dict[str, Any]) -> List[Any]:
+        records, _, _ = self.driver.execute_query(get_template(template).query, parameters_=parameters)
+        return records
+
+    def _from_contexts(self, data: Dict[str, Any], limits: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """由命中实体的物化上下文合并出结果行；有实体缺少上下文、或关系截断可能影响结果时返回 None"""
+        raw = data.get("contexts") or []
+        contexts = [load_context(value) for value in raw]
+        if any(context is None for context in contexts):
+            self.context_stats["misses"] += 1
+            if all(context is None for context in contexts):
+                # 上下文尚未构建（见 database/neo4j_setup/graph/indexing/context_cache.py）
+                print(f"实体上下文缓存不可用，{self.index_name} 改用遍历查询")
+                self.context_cache = False
+            return None
+        row = merge_contexts(
+            data.get("entity_ids") or [], contexts, data.get("chunks") or [],
+            **{key: v for key, v in limits.items() if key not in ("k", "topChunks")},
+        )
+        self.context_stats["hits" if row is not None else "misses"] += 1
+        return row
+
+    def query(self, query: str, k: int, **params: Any) -> Dict[str, Any]:
+        """执行检索，返回 Cypher 结果的原始一行（含 entity_ids）"""
+        vector = self.embedding.embed_query(query)
+        limits = self._limits(k, params)
+        template, (hits,) = self._candidates([vector], k)
+        parameters = {
+            "index": self.index_name, **limits, **self._shared_params(), **self._query_params(query), **hits,
+        }
+        if self.context_cache:
+            records = self._run(f"{template}.cached", parameters)
+            row = self._from_contexts(records[0].data() if records else {}, limits)
+            if row is not None:
+                return row
+        records = self._run(template, parameters)
+        return records[0].data() if records else {}
+
+    def batch_query(self, queries: Sequence[str], k: int, **params: Any) -> List[Dict[str, Any]]:
+        """多个问题一次批量编码、一次 Cypher 往返，返回与 queries 一一对应的原始结果行"""
+        if not queries:
+            return []
+        vectors = self.embedding.embed_documents(list(queries))
+        limits = self._limits(k, params)
+        template, hits = self._candidates(vectors, k)
+        items = [{**hit, **self._query_params(q)} for q, hit in zip(queries, hits)]
+        parameters = {"index": self.index_name, **limits, **self._shared_params()}
+        rows: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        if self.context_cache:
+            for record in self._run(f"{template}.cached.batch", {**parameters, "queries": items}):
+                data = record.data()
+                rows[data.pop("qi")] = self._from_contexts(data, limits)
+        # 缺少上下文的问题合成一批再走一次遍历查询
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if missing:
+            for record in self._run(f"{template}.batch", {**parameters, "queries": [items[i] for i in missing]}):
+                data = record.data()
+                rows[missing[data.pop("qi")]] = data
+        return [row or {} for row in rows]
+
+    def search(self, query: str, k: int, **params: Any) -> Dict[str, List[str]]:
+        return structured_result(self.query(query, k, **params))
+
+    def batch_search(self, queries: Sequence[str], k: int, **params: Any) -> List[Dict[str, List[str]]]:
+        return [structured_result(row) for row in self.batch_query(queries, k, **params)]
+
+    def warm(self) -> None:
+        self.driver.verify_connectivity()
+        self.embedding.embed_query("warmup")
+        if self.replica is not None:
+            self.replica.load(force=True)
+
+
+class HybridGraphRetriever(GraphVectorRetriever):
+    """
+    全文 + 向量混合检索：精确的奖学金名称、条款编号等靠全文索引命中，语义相近的表述靠向量索引命中，
+    两路结果在同一条 Cypher 内做倒数排名融合。
+
+    问题中只有 Lucene 语法字符、或全文索引不存在时，退化为纯向量检索。
+    """
+
+    def __init__(self, index_name: str = "vector", fulltext_index: Optional[str] = None, rrf_k: Optional[int] = None) -> None:
+        super().__init__(index_name, HYBRID_SEARCH_TEMPLATE)
+        self.fulltext_index = fulltext_index or os.getenv("GRAPH_FULLTEXT_INDEX", "graph_fulltext")
+        self.rrf_k = int(rrf_k or os.getenv("HYBRID_RRF_K", "60"))
+        self.fallback = GraphVectorRetriever(index_name, VECTOR_SEARCH_TEMPLATE)
+        self._fulltext_ok = True
+
+    def _query_params(self, query: str) -> Dict[str, Any]:
+        return {"fulltextQuery": fulltext_query(query)}
+
+    def _shared_params(self) -> Dict[str, Any]:
+        return {"fulltextIndex": self.fulltext_index, "rrfK": self.rrf_k}
+
+    def _with_fallback(self, run, fallback):
+        try:
+            return run()
+        except Exception as e:
+            from neo4j.exceptions import ClientError
+            if not isinstance(e, ClientError) or self.fulltext_index not in str(e):
+                raise
+            # 全文索引尚未创建（见 EntityIndexManager），本进程内不再尝试
+            print(f"全文索引 {self.fulltext_index} 不可用，改用纯向量检索: {e}")
+            self._fulltext_ok = False
+            return fallback()
+
+    def query(self, query: str, k: int, **params: Any) -> Dict[str, Any]:
+        if not self._fulltext_ok or not fulltext_query(query):
+            return self.fallback.query(query, k, **params)
+        return self._with_fallback(
+            lambda: super(HybridGraphRetriever, self).query(query, k, **params),
+            lambda: self.fallback.query(query, k, **params),
+        )
+
+    def batch_query(self, queries: Sequence[str], k: int, **params: Any) -> List[Dict[str, Any]]:
+        # 任一问题无法构成全文查询时，整批走纯向量检索，保证仍是一次往返
+        if not self._fulltext_ok or not all(fulltext_query(q) for q in queries):
+            return self.fallback.batch_query(queries, k, **params)
+        return self._with_fallback(
+            lambda: super(HybridGraphRetriever, self).batch_query(queries, k, **params),
+            lambda: self.fallback.batch_query(queries, k, **params),
+        )
+
+
+def get_vector_retriever(index_name: str = "vector", template: Optional[str] = None) -> GraphVectorRetriever:
+    """
+    按 (索引名, 检索模板) 获取进程内共享的检索器。
+
+    默认由 HYBRID_SEARCH 决定使用混合检索（默认）还是纯向量检索。
+    """
+    from common.get_models import _registry_key, model_registry
+    if template is None:
+        hybrid = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+        template = HYBRID_SEARCH_TEMPLATE if hybrid else VECTOR_SEARCH_TEMPLATE
+    factory = (lambda: HybridGraphRetriever(index_name)) if template == HYBRID_SEARCH_TEMPLATE \
+        else (lambda: GraphVectorRetriever(index_name, template))
+    return model_registry.get_or_create(_registry_key("graph_vector", index_name, template=template), factory)
+
+
+def get_langchain_vector_store(index_name: str = "vector", retrieval_query: str = VECTOR_RETRIEVAL_QUERY):
+    """
+    按 (索引名, 检索模板) 获取进程内共享的 Neo4jVector（旧流程，保留用于对比评估）。
+
+    复用 DBConnectionManager 的图连接与共享的 embedding 模型，建立连接、探测索引只在首次创建时发生一次。
+    """
+    def create():
+        # langchain_community.vectorstores 导入较重，按需导入
+        from langchain_community.vectorstores import Neo4jVector
+        return Neo4jVector.from_existing_index(
+            embedding=get_embeddings_model(),
+            graph=get_neo4j_db_manager().graph,
+            index_name=index_name,
+            retrieval_query=retrieval_query,
+        )
+
+    import hashlib
+    from common.get_models import _registry_key, model_registry
+    digest = hashlib.sha1(retrieval_query.encode("utf-8")).hexdigest()[:12]
+    return model_registry.get_or_create(_registry_key("neo4j_vector", index_name, template=digest), create)
+
+
+def warm_vector_retrievers(index_names: Sequence[str] = ("vector",), background: bool = True) -> None:
+    """
+    启动时预热检索器：建立驱动连接，加载 embedding 模型做一次编码，并预热已注册 Cypher 模板的执行计划。
+    设置 VECTOR_RETRIEVER_WARMUP=false 可关闭。
+    """
+    if os.getenv("VECTOR_RETRIEVER_WARMUP", "true").lower() != "true":
+        return
+
+    def warm():
+        for index_name in index_names:
+            try:
+                get_vector_retriever(index_name).warm()
+            except Exception as e:
+                print(f"向量检索器 {index_name} 预热失败: {e}")
+        warm_templates()
+
+    if background:
+        threading.Thread(target=warm, name="vector-retriever-warmup", daemon=True).start()
+    else:
+        warm()
+
+
+@tool
+def batch_vector_search(
+    queries: List[str],
+    index_name: str = "vector",
+    top_entities: int = 10,
+    top_chunks: int = 3,
+    top_communities: int = 3,
+    top_outside_rels: int = 10,
+    top_inside_rels: int = 10,
+) -> List[Dict[str, Any]]:
+    """
+    批量向量检索：一次检索多个子问题，耗时与单次 vector_search 接近。问题可拆成多个相互独立的子问题时，优先用本工具代替多次调用 vector_search。
+
+    参数:
+        queries: 子问题列表
+        其余参数与 vector_search 相同，对每个子问题生效
+
+    返回:
+        与 queries 一一对应的列表，每项包含 query 以及 chunks、reports、relationships、entities 四个key
+    """
+    results = batch_retrieve(
+        queries, index_name, top_entities, top_chunks, top_communities, top_outside_rels, top_inside_rels,
+    )
+    return [{"query": query, **result} for query, result in zip(queries, results)]
+
+
+def batch_retrieve(
+    queries: Sequence[str],
+    index_name: str = "vector",
+    top_entities: int = 10,
+    top_chunks: int = 3,
+    top_communities: int = 3,
+    top_outside_rels: int = 10,
+    top_inside_rels: int = 10,
+) -> List[Dict[str, List[str]]]:
+    """多个问题一次批量编码、一次 Cypher 往返完成检索，返回与 queries 一一对应的结构化结果"""
+    return get_vector_retriever(index_name).batch_search(
+        [q.strip() for q in queries],
+        k=top_entities,
+        topChunks=top_chunks,
+        topCommunities=top_communities,
+        topOutsideRels=top_outside_rels,
+        topInsideRels=top_inside_rels,
+    )
+
+
+def _vector_search(
+    query: str,
+    index_name: str,
+    top_entities: int,
+    top_chunks: int,
+    top_communities: int,
+    top_outside_rels: int,
+    top_inside_rels: int,
+) -> Dict[str, Any]:
+    return get_vector_retriever(index_name).search(
+        query,
+        k=top_entities,
+        topChunks=top_chunks,
+        topCommunities=top_communities,
+        topOutsideRels=top_outside_rels,
+        topInsideRels=top_inside_rels,
+    )
+
+
+def _vector_search_langchain(
+    query: str,
+    index_name: str,
+    top_entities: int,
+    top_chunks: int,
+    top_communities: int,
+    top_outside_rels: int,
+    top_inside_rels: int,
+) -> Dict[str, Any]:
+    """旧流程：Neo4jVector 检索后解析 page_content，仅用于对比评估"""
+    docs = get_langchain_vector_store(index_name).similarity_search(
+        query=query,
+        k=top_entities,
+        params={
+            "topChunks": top_chunks,
+            "topCommunities": top_communities,
+            "topOutsideRels": top_outside_rels,
+            "topInsideRels": top_inside_rels,
+        }
+    )
+    if not docs:
+        return {"chunks": [], "reports": [], "relationships": [], "entities": []}
+    return parse_page_content(docs[0].page_content)
+
+
+def speculate_vector_search(turn: PrefetchTurn) -> None:
+    """投机预取：以用户问题原文、默认参数发起一次向量检索"""
+    defaults = {
+        name: field.default
+        for name, field in vector_search.args_schema.model_fields.items()
+        if name != "query"
     }
+    params = (
+        turn.question.strip(), defaults["index_name"], defaults["top_entities"], defaults["top_chunks"],
+        defaults["top_communities"], defaults["top_outside_rels"], defaults["top_inside_rels"],
+    )
+    turn.submit(("vector_search", *params), lambda: _vector_search(*params))
 
 
 def get_neo4j_tools():
     return [
-        vector_search
+        vector_search,
+        batch_vector_search,
     ]
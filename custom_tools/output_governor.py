@@ -0,0 +1,280 @@
+from langchain_core.tools import tool, BaseTool
+
+import functools
+import hashlib
+import json
+import os
+import re
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ------------------------------
+# 工具输出的 artifact 存储（目录在首次写入时创建）
+# ------------------------------
+ARTIFACT_DIR = Path("./cache/tool_artifacts")
+
+# 超过该字节数的工具输出会被落盘，只把预览返回给 LLM
+DEFAULT_MAX_OUTPUT_BYTES = 4000
+PREVIEW_ITEMS = 5
+MAX_PAGE_SIZE = 200
+
+_ARTIFACT_ID_PATTERN = re.compile(r"^[\w\-]+$")
+
+# artifact 清理：超过保留时长或目录总大小超过上限时删除最久未用的文件；两次清理至少间隔 _SWEEP_INTERVAL 秒
+DEFAULT_ARTIFACT_TTL = 86400
+DEFAULT_ARTIFACT_MAX_MB = 512
+_SWEEP_INTERVAL = 60
+_last_sweep = 0.0
+
+
+def _json_size(value: Any) -> int:
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def _to_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            return None
+    return None
+
+
+def summarize_values(values: Sequence[Any]) -> Dict[str, Any]:
+    """列表的概要统计：数值列给出分布，文本列给出取值分布，字典列表给出字段名"""
+    stats: Dict[str, Any] = {"count": len(values)}
+    if not values:
+        return stats
+    if all(isinstance(v, dict) for v in values):
+        keys: Counter = Counter(k for v in values for k in v.keys())
+        stats["keys"] = [k for k, _ in keys.most_common(20)]
+        return stats
+
+    numbers = [n for n in (_to_number(v) for v in values) if n is not None]
+    empty = sum(1 for v in values if v is None or str(v).strip() == "")
+    stats["empty"] = empty
+    if numbers and len(numbers) >= (len(values) - empty) * 0.9:
+        stats.update({
+            "numeric": len(numbers),
+            "min": min(numbers),
+            "max": max(numbers),
+            "mean": round(statistics.fmean(numbers), 4),
+            "median": statistics.median(numbers),
+        })
+        return stats
+
+    counts = Counter(str(v) for v in values)
+    stats["unique"] = len(counts)
+    stats["top_values"] = [{"value": v[:100], "count": c} for v, c in counts.most_common(PREVIEW_ITEMS)]
+    return stats
+
+
+def spill_to_artifact(tool_name: str, field: str, items: List[Any]) -> str:
+    """把完整数据写入 artifact 文件，返回 artifact_id；相同内容只写一次"""
+    payload = json.dumps(items, ensure_ascii=False, default=str)
+    digest = hashlib.sha1(f"{tool_name}\x00{field}\x00{payload}".encode("utf-8")).hexdigest()[:16]
+    artifact_id = re.sub(r"[^\w\-]", "_", f"{tool_name}-{field}-{digest}")
+    path = ARTIFACT_DIR / f"{artifact_id}.json"
+    if not path.exists():
+        ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(
+                {"tool": tool_name, "field": field, "created_at": time.time(), "total": len(items), "items": items},
+                ensure_ascii=False,
+                default=str,
+            ))
+        os.replace(tmp, path)
+        sweep_artifacts(keep=path)
+    else:
+        os.utime(path)
+    return artifact_id
+
+
+def sweep_artifacts(
+    max_age: Optional[float] = None, max_bytes: Optional[int] = None, keep: Optional[Path] = None, force: bool = False,
+) -> int:
+    """删除超过保留时长的 artifact，目录总大小仍超上限时再按最近使用时间从旧到新删除；返回删除的文件数"""
+    global _last_sweep
+    now = time.time()
+    if not force and now - _last_sweep < _SWEEP_INTERVAL:
+        return 0
+    _last_sweep = now
+    max_age = max_age if max_age is not None else float(os.getenv("TOOL_ARTIFACT_TTL", str(DEFAULT_ARTIFACT_TTL)))
+    if max_bytes is None:
+        max_bytes = int(float(os.getenv("TOOL_ARTIFACT_MAX_MB", str(DEFAULT_ARTIFACT_MAX_MB))) * 1024 * 1024)
+
+    files = []
+    for path in ARTIFACT_DIR.glob("*.json"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+
+    removed = 0
+    total = sum(size for _, size, _ in files)
+    for mtime, size, path in files:
+        if path == keep:
+            continue
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def _preview(tool_name: str, field: str, value: Any) -> Dict[str, Any]:
+    items = value.splitlines() if isinstance(value, str) else list(value)
+    artifact_id = spill_to_artifact(tool_name, field, items)
+    return {
+        "artifact_id": artifact_id,
+        "total": len(items),
+        "head": items[:PREVIEW_ITEMS],
+        "tail": items[-PREVIEW_ITEMS:] if len(items) > PREVIEW_ITEMS * 2 else [],
+        "stats": summarize_values(items),
+        "hint": f"完整结果已存入 artifact，如确有需要可调用 read_tool_artifact(artifact_id='{artifact_id}', offset, limit) 分页读取",
+    }
+
+
+def _spillable(value: Any) -> bool:
+    if isinstance(value, (list, tuple)):
+        return len(value) > PREVIEW_ITEMS * 2
+    if isinstance(value, str):
+        return value.count("\n") > PREVIEW_ITEMS * 2
+    return False
+
+
+def govern_output(tool_name: str, result: Any, max_bytes: Optional[int] = None) -> Any:
+    """
+    工具输出超过 max_bytes 时，把其中体积最大的列表/多行文本字段落盘，
+    原位置替换为预览（首尾若干条 + 概要统计 + artifact_id）。
+    """
+    max_bytes = max_bytes or int(os.getenv("TOOL_OUTPUT_MAX_BYTES", str(DEFAULT_MAX_OUTPUT_BYTES)))
+    if _json_size(result) <= max_bytes:
+        return result
+
+    if isinstance(result, dict):
+        governed = dict(result)
+        candidates = sorted(
+            (key for key, value in governed.items() if _spillable(value)),
+            key=lambda key: _json_size(governed[key]),
+            reverse=True,
+        )
+        for key in candidates:
+            governed[key] = _preview(tool_name, key, governed[key])
+            if _json_size(governed) <= max_bytes:
+                break
+        return governed
+    if _spillable(result):
+        return _preview(tool_name, "result", result)
+    return result
+
+
+def _govern_subclass(base_tool: BaseTool, max_bytes: Optional[int]) -> BaseTool:
+    """没有 func/coroutine 的 BaseTool 子类（如 SQLDatabaseToolkit 的工具）：派生子类包装 _run/_arun"""
+    cls = type(base_tool)
+
+    def _run(self, *args, **kwargs):
+        return govern_output(self.name, cls._run(self, *args, **kwargs), max_bytes)
+
+    namespace: Dict[str, Any] = {"_run": _run, "__module__": cls.__module__, "__qualname__": cls.__qualname__}
+    # 未重写 _arun 时 BaseTool 默认在线程中调用 _run，已经受管控，不再重复包装
+    if cls._arun is not BaseTool._arun:
+        async def _arun(self, *args, **kwargs):
+            return govern_output(self.name, await cls._arun(self, *args, **kwargs), max_bytes)
+        namespace["_arun"] = _arun
+
+    governed_cls = type(cls.__name__, (cls,), namespace)
+    return governed_cls.model_construct(
+        _fields_set=base_tool.model_fields_set,
+        **{name: getattr(base_tool, name) for name in cls.model_fields},
+    )
+
+
+def govern_tool(base_tool: BaseTool, max_bytes: Optional[int] = None) -> BaseTool:
+    """返回一个输出受管控的工具副本，原工具不变"""
+    func = getattr(base_tool, "func", None)
+    coroutine = getattr(base_tool, "coroutine", None)
+    if func is None and coroutine is None:
+        return _govern_subclass(base_tool, max_bytes)
+
+    update: Dict[str, Any] = {}
+    if func is not None:
+        @functools.wraps(func)
+        def governed_func(*args, **kwargs):
+            return govern_output(base_tool.name, func(*args, **kwargs), max_bytes)
+        update["func"] = governed_func
+    if coroutine is not None:
+        @functools.wraps(coroutine)
+        async def governed_coroutine(*args, **kwargs):
+            return govern_output(base_tool.name, await coroutine(*args, **kwargs), max_bytes)
+        update["coroutine"] = governed_coroutine
+    return base_tool.model_copy(update=update)
+
+
+def govern_tools(tools: Sequence[BaseTool], max_bytes: Optional[int] = None) -> List[BaseTool]:
+    return [govern_tool(t, max_bytes) for t in tools]
+
+
+# ------------------------------
+# 分页读取 artifact
+# ------------------------------
+@tool
+def read_tool_artifact(artifact_id: str, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+    """
+    分页读取被落盘的大体积工具输出。
+
+    参数:
+        artifact_id: 工具输出预览中给出的 artifact_id
+        offset: 起始位置（从0开始）
+        limit: 本页条数，最多 200
+    """
+    if not _ARTIFACT_ID_PATTERN.match(artifact_id or ""):
+        return {"status": "error", "message": f"非法的 artifact_id：{artifact_id}", "items": []}
+    path = ARTIFACT_DIR / f"{artifact_id}.json"
+    if not path.exists():
+        return {"status": "error", "message": f"artifact 不存在：{artifact_id}", "items": []}
+
+    with open(path, "r", encoding="utf-8") as f:
+        artifact = json.load(f)
+    os.utime(path)
+    items = artifact.get("items", [])
+    offset = max(0, offset)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page = items[offset:offset + limit]
+
+    # 单页同样受字节上限约束，超出时缩短本页
+    max_bytes = int(os.getenv("TOOL_OUTPUT_MAX_BYTES", str(DEFAULT_MAX_OUTPUT_BYTES))) * 2
+    while len(page) > 1 and _json_size(page) > max_bytes:
+        page = page[: len(page) // 2]
+
+    next_offset = offset + len(page)
+    return {
+        "status": "success",
+        "message": f"读取 {artifact.get('tool')} 的 {artifact.get('field')}：第 {offset}~{next_offset - 1} 条，共 {len(items)} 条",
+        "artifact_id": artifact_id,
+        "total": len(items),
+        "offset": offset,
+        "items": page,
+        "next_offset": next_offset if next_offset < len(items) else None,
+    }
+
+
+def get_artifact_tools() -> List[BaseTool]:
+    return [read_tool_artifact]
@@ -4,8 +4,6 @@ from pathlib import Path
 
 # 固定存储目录（建议用绝对路径）
 LOCAL_REPORT_DIR = Path("./cache/local_report_cache")
-# 确保目录存在，不存在则创建
-LOCAL_REPORT_DIR.mkdir(exist_ok=True, parents=True)
 
 @tool
 def save_report(report: str) -> str:
@@ -19,6 +17,8 @@ def save_report(report: str) -> str:
         保存成功的提示信息
     """
     timestamp = time.strftime("%Y%m%d%H%M%S", time.localtime())
+    # 首次保存时才创建目录
+    LOCAL_REPORT_DIR.mkdir(exist_ok=True, parents=True)
     with open(LOCAL_REPORT_DIR / f"analysis_report_{timestamp}.md", "w", encoding="utf-8") as f:
         f.write(report)
     return f"报告已成功保存到 {LOCAL_REPORT_DIR / f'analysis_report_{timestamp}.md'}"
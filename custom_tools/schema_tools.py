@@ -0,0 +1,53 @@
+from langchain_core.tools import tool, BaseTool
+
+from typing import Any, List
+
+from common.prefetch import PrefetchTurn, get_prefetcher
+from common.schema_index import get_schema_index
+
+DEFAULT_TOP_K = 3
+DEFAULT_SAMPLE_ROWS = 3
+
+
+def _schema_key(question: str, top_k: int, sample_rows: int):
+    return ("relevant_schema", question.strip(), top_k, sample_rows)
+
+
+def create_schema_tools(db: Any) -> List[BaseTool]:
+    """
+    基于 SQLDatabase 创建表结构检索工具。
+
+    参数:
+        db: langchain_community 的 SQLDatabase，索引范围与其可用表一致
+    """
+    index = get_schema_index(db._engine, table_names=db.get_usable_table_names())
+
+    @tool
+    def get_relevant_schema(question: str, top_k: int = DEFAULT_TOP_K, sample_rows: int = DEFAULT_SAMPLE_ROWS) -> str:
+        """
+        一次性获取与问题最相关的表的精简 DDL（含字段注释）和样例数据，用于直接编写 SQL。
+
+        参数:
+            question: 用户的自然语言问题
+            top_k: 返回的表数量
+            sample_rows: 每张表的样例行数
+        """
+        return get_prefetcher().take(
+            _schema_key(question, top_k, sample_rows),
+            lambda: index.render(question, top_k=top_k, sample_rows=sample_rows),
+        )
+
+    return [get_relevant_schema]
+
+
+def create_schema_speculator(db: Any):
+    """投机预取：以用户问题原文预先检索相关表结构，同时完成索引的首次构建"""
+    index = get_schema_index(db._engine, table_names=db.get_usable_table_names())
+
+    def speculate(turn: PrefetchTurn) -> None:
+        turn.submit(
+            _schema_key(turn.question, DEFAULT_TOP_K, DEFAULT_SAMPLE_ROWS),
+            lambda: index.render(turn.question, top_k=DEFAULT_TOP_K, sample_rows=DEFAULT_SAMPLE_ROWS),
+        )
+
+    return speculate
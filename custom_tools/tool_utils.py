@@ -30,8 +30,6 @@ def parse_datetime(time_str: str) -> Optional[datetime]:
 # ------------------------------
 # 固定存储目录（建议用绝对路径）
 LOCAL_CSV_DIR = Path("./cache/local_csv_cache")
-# 确保目录存在，不存在则创建
-LOCAL_CSV_DIR.mkdir(exist_ok=True, parents=True)
 
 def generate_csv_filename(table_name: str) -> str:
     """生成时间命名的CSV文件名，格式：表名_YYYYMMDDHHMMSS.csv"""
@@ -39,5 +37,6 @@ def generate_csv_filename(table_name: str) -> str:
     return f"{table_name}_{timestamp}.csv"
 
 def get_absolute_csv_path(filename: str) -> str:
-    """获取CSV文件的绝对路径"""
+    """获取CSV文件的绝对路径（目录在首次写入时创建，而不是导入时）"""
+    LOCAL_CSV_DIR.mkdir(exist_ok=True, parents=True)
     return str(LOCAL_CSV_DIR / filename)
\ No newline at end of file
@@ -9,7 +9,7 @@ from rich.panel import Panel
 from rich.text import Text
 
 from settings import community_algorithm
-from database.neo4j_setup.graph import EntityIndexManager
+from database.neo4j_setup.graph import EntityIndexManager, EntityContextManager
 from database.neo4j_setup.graph import GDSConfig, SimilarEntityDetector
 from database.neo4j_setup.graph import EntityMerger
 from database.neo4j_setup.community import CommunityDetectorFactory
@@ -31,6 +31,7 @@ class IndexCommunityBuilder:
     2. 相似实体的检测和合并
     3. 社区检测
     4. 社区摘要生成
+    5. 实体上下文缓存生成
     """
     
     def __init__(self):
@@ -45,7 +46,8 @@ class IndexCommunityBuilder:
             "相似实体检测": 0,
             "实体合并": 0,
             "社区检测": 0,
-            "社区摘要": 0
+            "社区摘要": 0,
+            "实体上下文": 0
         }
         
         # 添加计时器
@@ -94,6 +96,10 @@ class IndexCommunityBuilder:
                 batch_size=ENTITY_BATCH_SIZE,
                 max_workers=MAX_WORKERS
             )
+            self.context_manager = EntityContextManager(
+                batch_size=ENTITY_BATCH_SIZE,
+                max_workers=MAX_WORKERS
+            )
             
             # 输出使用的参数
             self.console.print(f"[blue]并行处理线程数: {MAX_WORKERS}[/blue]")
@@ -245,6 +251,16 @@ class IndexCommunityBuilder:
                     "耗时": f"{self.performance_stats['社区摘要']:.2f}秒"
                 }
             )
+
+            # 6. 生成实体上下文缓存（依赖社区摘要，须在其后执行）
+            context_start = time.time()
+            self.console.print("[cyan]正在生成实体上下文缓存...[/cyan]")
+
+            context_count = self.context_manager.build_contexts()
+
+            self.performance_stats["实体上下文"] = time.time() - context_start
+            self.console.print(f"[blue]实体上下文生成完成，共 {context_count} 个实体，"
+                               f"耗时: {self.performance_stats['实体上下文']:.2f}秒[/blue]")
             
             self.console.print("[green]索引和社区构建完成[/green]")
             
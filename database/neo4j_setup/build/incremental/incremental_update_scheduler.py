@@ -35,6 +35,8 @@ class IncrementalUpdateScheduler:
             "chunk_embedding_threshold": 1800,  # 30分钟
             "graph_consistency_threshold": 86400,  # 24小时
             "community_detection_threshold": 172800,  # 48小时
+            "entity_context_threshold": 1800,  # 30分钟
+            "embedding_snapshot_threshold": 1800,  # 30分钟
             "manual_edit_check_threshold": 604800  # 7天
         }
         
@@ -168,6 +170,10 @@ class IncrementalUpdateScheduler:
         self.schedule_component("chunk_embedding", processor.update_chunk_embeddings,
                                self.config["chunk_embedding_threshold"])
         
+        # 刷新向量快照
+        self.schedule_component("embedding_snapshot", processor.refresh_embedding_snapshot,
+                               self.config["embedding_snapshot_threshold"])
+        
         # 检查图结构完整性
         self.schedule_component("graph_consistency", processor.verify_graph_consistency,
                                self.config["graph_consistency_threshold"])
@@ -175,7 +181,11 @@ class IncrementalUpdateScheduler:
         # 检查社区检测
         self.schedule_component("community_detection", processor.detect_communities,
                                self.config["community_detection_threshold"])
-        
+
+        # 刷新实体上下文缓存
+        self.schedule_component("entity_context", processor.update_entity_contexts,
+                               self.config["entity_context_threshold"])
+
         # 全量重建（低频率）
         self.schedule_component("full_rebuild", processor.rebuild_if_needed,
                                self.config["full_rebuild_threshold"])
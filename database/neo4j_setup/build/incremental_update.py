@@ -11,6 +11,8 @@ from incremental_graph_builder import IncrementalGraphUpdater
 from database.neo4j_setup.graph.graph_consistency_validator import GraphConsistencyValidator
 from database.neo4j_setup.build.incremental.manual_edit_manager import ManualEditManager
 from database.neo4j_setup.graph.indexing.embedding_manager import EmbeddingManager
+from database.neo4j_setup.graph.indexing.context_cache import EntityContextManager
+from database.neo4j_setup.graph.indexing.embedding_snapshot import EmbeddingSnapshotExporter
 from database.neo4j_setup.community import CommunityDetectorFactory, CommunitySummarizerFactory
 from common.neo4jdb import get_db_manager
 from settings import FILES_DIR, community_algorithm, MAX_WORKERS, BATCH_SIZE
@@ -26,7 +28,9 @@ class IncrementalUpdateManager:
     3. 验证图谱一致性
     4. 处理社区检测和摘要生成
     5. 支持手动编辑同步
-    6. 后台运行和定时调度
+    6. 刷新实体上下文缓存
+    7. 刷新检索进程使用的向量快照
+    8. 后台运行和定时调度
     """
     
     def __init__(self, files_dir: str = FILES_DIR, config=None):
@@ -49,6 +53,8 @@ class IncrementalUpdateManager:
         self.validator = GraphConsistencyValidator()
         self.edit_manager = ManualEditManager()
         self.embedding_manager = EmbeddingManager(batch_size=BATCH_SIZE, max_workers=MAX_WORKERS)
+        self.context_manager = EntityContextManager(batch_size=BATCH_SIZE, max_workers=MAX_WORKERS)
+        self.snapshot_exporter = EmbeddingSnapshotExporter()
         
         # 初始化调度器
         self.scheduler = IncrementalUpdateScheduler(self.config)
@@ -63,6 +69,7 @@ class IncrementalUpdateManager:
             "files_processed": 0,
             "entities_updated": 0,
             "communities_detected": 0,
+            "contexts_updated": 0,
             "errors": 0
         }
     
@@ -170,6 +177,22 @@ class IncrementalUpdateManager:
             self.stats["errors"] += 1
             return 0
     
+    def refresh_embedding_snapshot(self):
+        """
+        把新计算的Embedding合并进向量快照
+        
+        Returns:
+            Dict: 各标签新增或更新的向量数
+        """
+        self.console.print("[bold cyan]刷新向量快照...[/bold cyan]")
+        
+        try:
+            return self.snapshot_exporter.refresh_snapshot()
+        except Exception as e:
+            self.console.print(f"[red]刷新向量快照时出错: {e}[/red]")
+            self.stats["errors"] += 1
+            return {"error": str(e)}
+    
     def verify_graph_consistency(self, repair=True):
         """
         验证图谱一致性
@@ -257,6 +280,9 @@ class IncrementalUpdateManager:
                 summaries = summarizer.process_communities()
                 
                 self.console.print(f"[green]社区摘要生成完成，共生成 {len(summaries) if summaries else 0} 个摘要[/green]")
+
+                # 社区整体重建后所有实体的社区摘要都可能变化，重新生成全部实体上下文
+                self.update_entity_contexts(full=True)
                 
                 return {
                     "status": "success", 
@@ -272,6 +298,32 @@ class IncrementalUpdateManager:
             self.stats["errors"] += 1
             return {"status": "error", "message": str(e)}
     
+    def update_entity_contexts(self, full=False):
+        """
+        刷新实体上下文缓存
+        
+        Args:
+            full: 是否重新生成全部实体的上下文，否则只刷新邻域有变更的实体
+            
+        Returns:
+            int: 更新的实体数量
+        """
+        self.console.print("[bold cyan]刷新实体上下文缓存...[/bold cyan]")
+        
+        try:
+            if full:
+                updated_count = self.context_manager.build_contexts()
+            else:
+                updated_count = self.context_manager.refresh_stale_contexts()
+            
+            self.stats["contexts_updated"] += updated_count
+            return updated_count
+            
+        except Exception as e:
+            self.console.print(f"[red]刷新实体上下文缓存时出错: {e}[/red]")
+            self.stats["errors"] += 1
+            return 0
+    
     def sync_manual_edits(self, changed_files=None):
         """
         同步手动编辑
@@ -382,6 +434,9 @@ class IncrementalUpdateManager:
             consistency_check = self.verify_graph_consistency()
             results["consistency_check"] = consistency_check
             
+            # 4.1 刷新向量快照（放在一致性修复之后，修复中删除的节点一并从快照去掉）
+            results["snapshot_updates"] = self.refresh_embedding_snapshot()
+            
             # 5. 同步手动编辑
             if changes and (changes.get("added") or changes.get("modified")):
                 edit_sync = self.sync_manual_edits(
@@ -395,6 +450,9 @@ class IncrementalUpdateManager:
                 community_detection = self.detect_communities()
                 results["community_detection"] = community_detection
             
+            # 7. 刷新实体上下文缓存（社区检测成功时已全量重建，这里只补齐其余变更）
+            results["context_updates"] = self.update_entity_contexts()
+            
             # 计算总耗时
             end_time = time.time()
             total_time = end_time - start_time
@@ -418,8 +476,10 @@ class IncrementalUpdateManager:
         self.scheduler.schedule_component("file_change", self.detect_file_changes)
         self.scheduler.schedule_component("entity_embedding", self.update_entity_embeddings)
         self.scheduler.schedule_component("chunk_embedding", self.update_chunk_embeddings)
+        self.scheduler.schedule_component("embedding_snapshot", self.refresh_embedding_snapshot)
         self.scheduler.schedule_component("graph_consistency", self.verify_graph_consistency)
         self.scheduler.schedule_component("community_detection", self.detect_communities)
+        self.scheduler.schedule_component("entity_context", self.update_entity_contexts)
         self.scheduler.schedule_component("manual_edit_check", self.check_manual_edits)
         
         # 启动调度器
@@ -449,6 +509,7 @@ class IncrementalUpdateManager:
         self.console.print(f"[blue]处理的文件数: {self.stats['files_processed']}[/blue]")
         self.console.print(f"[blue]更新的实体数: {self.stats['entities_updated']}[/blue]")
         self.console.print(f"[blue]检测的社区数: {self.stats['communities_detected']}[/blue]")
+        self.console.print(f"[blue]刷新的实体上下文数: {self.stats['contexts_updated']}[/blue]")
         self.console.print(f"[blue]错误数: {self.stats['errors']}[/blue]")
         
         if self.running:
@@ -496,6 +557,8 @@ def main():
         "file_change_threshold": args.interval,
         "entity_embedding_threshold": args.interval * 2,
         "chunk_embedding_threshold": args.interval * 2,
+        "entity_context_threshold": args.interval * 2,
+        "embedding_snapshot_threshold": args.interval * 2,
         "graph_consistency_threshold": args.interval * 6,
         "community_detection_threshold": args.community_interval,
         "manual_edit_check_threshold": args.manual_check_interval
@@ -5,6 +5,7 @@ from rich.text import Text
 from build_graph import KnowledgeGraphBuilder
 from build_index_and_community import IndexCommunityBuilder
 from build_chunk_index import ChunkIndexBuilder
+from database.neo4j_setup.graph.indexing.embedding_snapshot import EmbeddingSnapshotExporter
 
 class KnowledgeGraphProcessor:
     """
@@ -35,6 +36,9 @@ class KnowledgeGraphProcessor:
             chunk_index_builder = ChunkIndexBuilder()
             chunk_index_builder.process()
             
+            # 4. 导出向量快照，供检索进程在本地做向量打分
+            EmbeddingSnapshotExporter().export_snapshot()
+            
             # 显示完成面板
             success_text = Text("知识图谱处理流程完成", style="bold green")
             self.console.print(Panel(success_text, border_style="green"))
@@ -3,7 +3,7 @@ from typing import List, Dict
 from langchain_community.graphs import Neo4jGraph
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from common.get_models import get_llm_model
+from common.get_models import get_llm_model, get_embeddings_model
 import concurrent.futures
 import time
 
@@ -83,10 +83,22 @@ class BaseCommunityRanker:
             print(f"备用权重计算也失败: {e}")
 
 class BaseCommunityStorer:
-    """社区信息存储工具"""
+    """社区信息存储工具，同时保存摘要向量，供 MapReduce 检索按问题相关度筛选社区"""
     
-    def __init__(self, graph: Neo4jGraph):
+    def __init__(self, graph: Neo4jGraph, embeddings=None):
         self.graph = graph
+        self.embeddings = embeddings
+    
+    def _with_embeddings(self, summaries: List[Dict]) -> List[Dict]:
+        """为一批摘要计算向量；计算失败时照常存储摘要，向量留待 embed_missing_summaries 补齐"""
+        if self.embeddings is None:
+            return summaries
+        try:
+            vectors = self.embeddings.embed_documents([row.get("summary") or "" for row in summaries])
+        except Exception as e:
+            print(f"计算社区摘要向量时出错: {e}")
+            return summaries
+        return [{**row, "summary_embedding": vector} for row, vector in zip(summaries, vectors)]
     
     def store_summaries(self, summaries: List[Dict]) -> None:
         """存储社区摘要"""
@@ -101,7 +113,7 @@ class BaseCommunityStorer:
         total_batches = (len(summaries) + batch_size - 1) // batch_size
         
         for i in range(0, len(summaries), batch_size):
-            batch = summaries[i:i+batch_size]
+            batch = self._with_embeddings(summaries[i:i+batch_size])
             batch_start = time.time()
             
             try:
@@ -110,6 +122,7 @@ class BaseCommunityStorer:
                 MERGE (c:__Community__ {id:row.community})
                 SET c.summary = row.summary, 
                     c.full_content = row.full_content,
+                    c.summary_embedding = row.summary_embedding,
                     c.summary_created_at = datetime()
                 """, params={"data": batch})
                 
@@ -128,10 +141,40 @@ class BaseCommunityStorer:
                 MERGE (c:__Community__ {id:$community})
                 SET c.summary = $summary, 
                     c.full_content = $full_content,
+                    c.summary_embedding = $summary_embedding,
                     c.summary_created_at = datetime()
-                """, params=summary)
+                """, params={"summary_embedding": None, **summary})
             except Exception as e:
                 print(f"存储单个社区摘要时出错: {e}")
+    
+    def embed_missing_summaries(self, batch_size: int = 100) -> int:
+        """为已有摘要但缺少摘要向量的社区补齐向量（兼容此前生成的社区）"""
+        if self.embeddings is None:
+            return 0
+        rows = self.graph.query("""
+        MATCH (c:`__Community__`)
+        WHERE c.summary IS NOT NULL AND c.summary_embedding IS NULL
+        RETURN c.id AS community, c.summary AS summary
+        """)
+        if not rows:
+            return 0
+        
+        updated = 0
+        for i in range(0, len(rows), batch_size):
+            batch = [row for row in self._with_embeddings(rows[i:i+batch_size]) if "summary_embedding" in row]
+            if not batch:
+                continue
+            try:
+                self.graph.query("""
+                UNWIND $data AS row
+                MATCH (c:__Community__ {id:row.community})
+                SET c.summary_embedding = row.summary_embedding
+                """, params={"data": batch})
+                updated += len(batch)
+            except Exception as e:
+                print(f"存储社区摘要向量时出错: {e}")
+        print(f"补齐了 {updated} 个社区的摘要向量")
+        return updated
 
 class BaseSummarizer(ABC):
     """社区摘要生成器基类"""
@@ -142,7 +185,7 @@ class BaseSummarizer(ABC):
         self.llm = get_llm_model()
         self.describer = BaseCommunityDescriber()
         self.ranker = BaseCommunityRanker(graph)
-        self.storer = BaseCommunityStorer(graph)
+        self.storer = BaseCommunityStorer(graph, get_embeddings_model())
         self._setup_llm_chain()
         
         # 性能监控
@@ -206,6 +249,7 @@ class BaseSummarizer(ABC):
             # 保存摘要
             store_start = time.time()
             self.storer.store_summaries(summaries)
+            self.storer.embed_missing_summaries()
             self.store_time = time.time() - store_start
             
             # 输出性能统计
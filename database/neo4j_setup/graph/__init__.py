@@ -13,7 +13,9 @@ from database.neo4j_setup.graph.core import (
 # Indexing
 from database.neo4j_setup.graph.indexing import (
     ChunkIndexManager,
-    EntityIndexManager
+    EntityIndexManager,
+    EntityContextManager,
+    EmbeddingSnapshotExporter
 )
 
 # Structure
@@ -49,6 +51,8 @@ __all__ = [
     # Indexing
     'ChunkIndexManager',
     'EntityIndexManager',
+    'EntityContextManager',
+    'EmbeddingSnapshotExporter',
     
     # Structure
     'GraphStructureBuilder',
@@ -1,7 +1,11 @@
 from database.neo4j_setup.graph.indexing.chunk_indexer import ChunkIndexManager
 from database.neo4j_setup.graph.indexing.entity_indexer import EntityIndexManager
+from database.neo4j_setup.graph.indexing.context_cache import EntityContextManager
+from database.neo4j_setup.graph.indexing.embedding_snapshot import EmbeddingSnapshotExporter
 
 __all__ = [
     'ChunkIndexManager',
-    'EntityIndexManager'
+    'EntityIndexManager',
+    'EntityContextManager',
+    'EmbeddingSnapshotExporter'
 ]
\ No newline at end of file
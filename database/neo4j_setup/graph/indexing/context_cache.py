@@ -0,0 +1,92 @@
+import time
+from typing import List, Optional
+
+from common.entity_context import BUILD_CONTEXT_QUERY, CONTEXT_VERSION, STALE_CONTEXT_QUERY, context_limit
+from database.neo4j_setup.graph.core import BaseIndexer, connection_manager
+from settings import ENTITY_BATCH_SIZE, MAX_WORKERS as DEFAULT_MAX_WORKERS
+
+class EntityContextManager(BaseIndexer):
+    """
+    实体上下文缓存管理器，把每个实体的邻域（提及它的文本块、所属社区摘要、关系描述、实体描述）
+    预先整理成 JSON 存到实体的 context 属性上，供 vector_search 一次读取，格式见 common.entity_context。
+
+    全量构建在社区摘要生成之后执行；增量更新时只刷新上下文缺失、版本不符或邻域在上下文生成之后有变更的实体。
+    """
+
+    def __init__(self, batch_size: int = 100, max_workers: int = 4):
+        """
+        初始化实体上下文缓存管理器
+
+        Args:
+            batch_size: 批处理大小
+            max_workers: 并行工作线程数
+        """
+        batch_size = batch_size or ENTITY_BATCH_SIZE
+        max_workers = max_workers or DEFAULT_MAX_WORKERS
+
+        super().__init__(batch_size, max_workers)
+
+        self.graph = connection_manager.get_connection()
+        self.limit = context_limit()
+
+        self._create_indexes()
+
+    def _create_indexes(self) -> None:
+        """按实体 id 写回上下文，依赖实体 id 索引"""
+        connection_manager.create_index("CREATE INDEX IF NOT EXISTS FOR (e:`__Entity__`) ON (e.id)")
+
+    def get_stale_entities(self) -> List[str]:
+        """
+        获取上下文需要刷新的实体
+
+        Returns:
+            List[str]: 实体 id 列表
+        """
+        result = self.graph.query(STALE_CONTEXT_QUERY, params={"version": CONTEXT_VERSION})
+        return [row["id"] for row in result or [] if row["id"] is not None]
+
+    def build_contexts(self, entity_ids: Optional[List[str]] = None) -> int:
+        """
+        生成并写回实体上下文
+
+        Args:
+            entity_ids: 要处理的实体 id 列表，为 None 时处理全部实体
+
+        Returns:
+            int: 更新的实体数量
+        """
+        start_time = time.time()
+
+        if entity_ids is None:
+            result = self.graph.query("MATCH (e:`__Entity__`) WHERE e.id IS NOT NULL RETURN e.id AS id")
+            entity_ids = [row["id"] for row in result or []]
+
+        if not entity_ids:
+            print("没有需要生成上下文的实体")
+            return 0
+
+        batch_size = self.get_optimal_batch_size(len(entity_ids))
+        batches = [entity_ids[i:i + batch_size] for i in range(0, len(entity_ids), batch_size)]
+
+        def process_batch(batch):
+            result = self.graph.query(
+                BUILD_CONTEXT_QUERY,
+                params={"ids": batch, "version": CONTEXT_VERSION, "limit": self.limit}
+            )
+            return result[0]["updated"] if result else 0
+
+        updated = sum(self.process_in_parallel(batches, process_batch))
+
+        self.db_time = time.time() - start_time
+        print(f"实体上下文生成完成，更新 {updated} 个实体，耗时: {self.db_time:.2f}秒")
+
+        return updated
+
+    def refresh_stale_contexts(self) -> int:
+        """
+        只刷新需要更新的实体上下文
+
+        Returns:
+            int: 更新的实体数量
+        """
+        return self.build_contexts(self.get_stale_entities())
@@ -0,0 +1,120 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from common.embedding_replica import LABELS, EmbeddingReplica, normalize_rows, write_snapshot
+from common.neo4jdb import get_db_manager
+
+class EmbeddingSnapshotExporter:
+    """
+    向量快照导出器，把 __Entity__、__Chunk__ 的 embedding 导出为检索进程内存映射的快照，格式见 common.embedding_replica。
+
+    全量导出在建索引之后执行；增量刷新以上一快照为基础，合并 last_embedded 晚于上次导出时刻的向量，
+    并去掉已从图谱中删除的节点，只读取变更的向量。
+    """
+
+    def __init__(self, directory: Optional[str] = None, labels: Tuple[str, ...] = LABELS):
+        """
+        初始化向量快照导出器
+
+        Args:
+            directory: 快照目录，默认 EMBEDDING_REPLICA_DIR
+            labels: 导出的节点标签
+        """
+        self.directory = directory
+        self.labels = labels
+        self.driver = get_db_manager().driver
+
+        # 性能监控
+        self.db_time = 0
+
+    def _now(self) -> str:
+        records, _, _ = self.driver.execute_query("RETURN toString(datetime()) AS now")
+        return records[0]["now"]
+
+    def _read(self, label: str, since: Optional[str] = None) -> Tuple[List[str], List[List[float]]]:
+        """流式读取节点 id 与 embedding；给定 since 时只读取之后重新计算过的向量"""
+        query = f"MATCH (n:`{label}`) WHERE n.embedding IS NOT NULL AND n.id IS NOT NULL"
+        if since is not None:
+            query += " AND n.last_embedded >= datetime($since)"
+        query += " RETURN n.id AS id, n.embedding AS embedding"
+
+        start = time.time()
+        ids, vectors = [], []
+        with self.driver.session() as session:
+            for record in session.run(query, since=since):
+                ids.append(record["id"])
+                vectors.append(record["embedding"])
+        self.db_time += time.time() - start
+        return ids, vectors
+
+    def _live_ids(self, label: str) -> set:
+        records, _, _ = self.driver.execute_query(
+            f"MATCH (n:`{label}`) WHERE n.embedding IS NOT NULL AND n.id IS NOT NULL RETURN n.id AS id"
+        )
+        return {record["id"] for record in records}
+
+    def export_snapshot(self) -> Dict[str, int]:
+        """
+        全量导出快照
+
+        Returns:
+            Dict[str, int]: 各标签导出的向量数
+        """
+        exported_at = self._now()
+        tables = {}
+        for label in self.labels:
+            ids, vectors = self._read(label)
+            tables[label] = (ids, normalize_rows(vectors) if ids else np.zeros((0, 0), dtype=np.float32))
+
+        path = write_snapshot(tables, exported_at, self.directory)
+        counts = {label: len(ids) for label, (ids, _) in tables.items()}
+        print(f"向量快照已导出到 {path}: {counts}")
+        return counts
+
+    def refresh_snapshot(self) -> Dict[str, int]:
+        """
+        增量刷新快照，没有快照时全量导出
+
+        Returns:
+            Dict[str, int]: 各标签新增或更新的向量数，无变化时不写入新快照
+        """
+        replica = EmbeddingReplica(self.directory, check_interval=0)
+        if not replica.load() or set(replica.manifest.get("labels", {})) != set(self.labels):
+            return self.export_snapshot()
+
+        since = replica.manifest["exported_at"]
+        exported_at = self._now()
+        tables, changes, dirty = {}, {}, False
+        for label in self.labels:
+            base_ids, base_matrix = replica.table(label)
+            changed_ids, changed_vectors = self._read(label, since)
+            live = self._live_ids(label)
+            changed = set(changed_ids)
+            dims = {len(v) for v in changed_vectors} | ({base_matrix.shape[1]} if base_ids else set())
+            if live - changed - set(base_ids) or len(dims) > 1:
+                # 有未带 last_embedded 的新向量，或 embedding 模型维度变化，增量合并不可靠
+                return self.export_snapshot()
+
+            keep = [i for i, node_id in enumerate(base_ids) if node_id in live and node_id not in changed]
+            ids = [base_ids[i] for i in keep] + changed_ids
+            parts = [np.asarray(base_matrix[keep], dtype=np.float32)] if keep else []
+            if changed_ids:
+                parts.append(normalize_rows(changed_vectors))
+            tables[label] = (ids, np.vstack(parts) if parts else np.zeros((0, 0), dtype=np.float32))
+
+            changes[label] = len(changed_ids)
+            dirty = dirty or bool(changed_ids) or len(keep) != len(base_ids)
+
+        if not dirty:
+            print("向量快照无变化")
+            return changes
+
+        path = write_snapshot(tables, exported_at, self.directory)
+        print(f"向量快照已增量刷新到 {path}: {changes}")
+        return changes
+
+
+if __name__ == "__main__":
+    EmbeddingSnapshotExporter().export_snapshot()
@@ -1,3 +1,4 @@
+import os
 import time
 import concurrent.futures
 from typing import List, Dict, Any, Optional
@@ -39,8 +40,13 @@ class EntityIndexManager(BaseIndexer):
     
     def _create_indexes(self) -> None:
         """创建必要的索引以优化查询性能"""
+        fulltext_index = os.getenv("GRAPH_FULLTEXT_INDEX", "graph_fulltext")
         index_queries = [
-            "CREATE INDEX IF NOT EXISTS FOR (e:`__Entity__`) ON (e.id)"
+            "CREATE INDEX IF NOT EXISTS FOR (e:`__Entity__`) ON (e.id)",
+            # 实体名称、描述与文本块的全文索引（CJK 分词），供 vector_search 的全文 + 向量混合检索使用；写入时自动更新
+            f"CREATE FULLTEXT INDEX {fulltext_index} IF NOT EXISTS "
+            "FOR (n:`__Entity__`|`__Chunk__`) ON EACH [n.id, n.description, n.text] "
+            "OPTIONS {indexConfig: {`fulltext.analyzer`: 'cjk'}}",
         ]
         
         connection_manager.create_multiple_indexes(index_queries)
@@ -1,4 +1,3 @@
-import hanlp
 import re
 from typing import List, Tuple
 
@@ -22,7 +21,15 @@ class ChineseTextChunker:
         self.chunk_size = chunk_size
         self.overlap = overlap
         self.max_text_length = max_text_length
-        self.tokenizer = hanlp.load(hanlp.pretrained.tok.COARSE_ELECTRA_SMALL_ZH)
+        self._tokenizer = None
+
+    @property
+    def tokenizer(self):
+        """HanLP分词器，首次分词时才导入并加载（hanlp导入与模型加载都很耗时）"""
+        if self._tokenizer is None:
+            import hanlp
+            self._tokenizer = hanlp.load(hanlp.pretrained.tok.COARSE_ELECTRA_SMALL_ZH)
+        return self._tokenizer
         
     def process_files(self, file_contents: List[Tuple[str, str]]) -> List[Tuple[str, str, List[List[str]]]]:
         """